@@ -5,6 +5,7 @@ import argparse
 from transformers import BartForConditionalGeneration, BartTokenizer
 import PyPDF2
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 
 model_A='../Model_training/KeyPhrase Detection/fine_tuned_t5_model_kp/'
@@ -87,18 +88,30 @@ def summarize_text(input_text,model_name):
 
     return summary
 
-def summarize_pdf(pdf_path:str, model_name:str, pages:int, start_page:int):
+def extract_page_range(pdf_path:str, start:int, stop:int):
+    # Each worker opens its own reader over the file
     with open(pdf_path, 'rb') as f:
         pdf=PyPDF2.PdfReader(f)
-        text=''
+        return [pdf.pages[page_num].extract_text() for page_num in range(start,stop)]
+
+def extract_pdf_text(pdf_path:str, pages:int, start_page:int, workers:int=None):
+    workers=workers or os.cpu_count() or 1
+    stop=start_page+pages
+    shard=max(1,-(-pages//workers))
+    ranges=[(s,min(s+shard,stop)) for s in range(start_page,stop,shard)]
+    if len(ranges)<=1:
+        return ''.join(extract_page_range(pdf_path,start_page,stop))
+
+    with ProcessPoolExecutor(max_workers=min(workers,len(ranges))) as pool:
+        futures=[pool.submit(extract_page_range,pdf_path,s,e) for s,e in ranges]
+        return ''.join(text for future in futures for text in future.result())
 
-        for page_num in range(start_page,start_page+pages):
-            page=pdf.pages[page_num]
-            text+=page.extract_text()
-        
-        summary= summarize_text(text,model_name)
+def summarize_pdf(pdf_path:str, model_name:str, pages:int, start_page:int):
+    text=extract_pdf_text(pdf_path,pages,start_page)
+
+    summary= summarize_text(text,model_name)
 
-        return summary
+    return summary
 
 def main():
 
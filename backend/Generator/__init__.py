@@ -1,3 +1,13 @@
 # Constructor for questgen
 from __future__ import absolute_import
-from Generator.main import MCQGenerator, BoolQGenerator, ShortQGenerator, AnswerPredictor, GoogleDocsService, FileProcessor, QuestionGenerator
+
+_MAIN_EXPORTS = ("MCQGenerator", "BoolQGenerator", "ShortQGenerator", "AnswerPredictor",
+                 "GoogleDocsService", "FileProcessor", "QuestionGenerator")
+
+
+def __getattr__(name):
+    # Imported on first access, so light submodules (and PDF worker processes) skip torch and transformers
+    if name in _MAIN_EXPORTS:
+        from Generator import main
+        return getattr(main, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
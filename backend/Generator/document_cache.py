@@ -0,0 +1,171 @@
+"""Content-addressed cache for text extracted from uploaded documents.
+
+Entries are keyed by the SHA-256 of the uploaded bytes and hold the
+zlib-compressed text together with the character offset of every page, so a
+page range can be served from a cached full extraction. The cache directory
+is capped in size and evicted least-recently-used first.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+from Generator.pdf_extraction import resolve_page_range
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCUMENT_CACHE_DIR = os.environ.get("DOCUMENT_CACHE_DIR", os.path.join(_BACKEND_DIR, "cache", "documents"))
+DOCUMENT_CACHE_MAX_BYTES = int(os.environ.get("DOCUMENT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+_SUFFIX = ".json.z"
+_KEY_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def content_hash(data):
+    """SHA-256 hex digest of the given bytes; used as the document id."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_range_id(document_id, page_range):
+    """Id of a (first, last) page range of a document, e.g. "<sha256>:3-10" or "<sha256>:5-"."""
+    first, last = page_range
+    return f"{document_id}:{first or ''}-{last or ''}"
+
+
+class ExtractedDocument:
+    """Extracted text plus the starting character offset of each page."""
+
+    def __init__(self, text, page_offsets):
+        self.text = text
+        self.page_offsets = page_offsets
+
+    @classmethod
+    def from_pages(cls, pages):
+        offsets = []
+        position = 0
+        for page in pages:
+            offsets.append(position)
+            position += len(page)
+        return cls("".join(pages), offsets or [0])
+
+    @property
+    def page_count(self):
+        return len(self.page_offsets)
+
+    def page_text(self, page_range=None):
+        """Text of a (first, last) 1-based page range, or of the whole document."""
+        if page_range is None:
+            return self.text
+        start, stop = resolve_page_range(page_range, self.page_count)
+        if start >= stop:
+            return ""
+        begin = self.page_offsets[start]
+        end = self.page_offsets[stop] if stop < self.page_count else len(self.text)
+        return self.text[begin:end]
+
+
+class ExtractedTextCache:
+    """Size-capped LRU cache of ExtractedDocument entries on disk."""
+
+    def __init__(self, cache_dir=DOCUMENT_CACHE_DIR, max_bytes=DOCUMENT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + _SUFFIX)
+
+    def _load_index(self):
+        """Rebuilds LRU order from file modification times."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len(_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """Returns the cached ExtractedDocument for key, or None."""
+        if not _KEY_RE.fullmatch(key):
+            return None
+        path = self._path(key)
+        with self._lock:
+            if key not in self._entries:
+                # Another process sharing the directory may have written it
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    return None
+                self._entries[key] = size
+                self._total_bytes += size
+            self._entries.move_to_end(key)
+        try:
+            with open(path, "rb") as f:
+                payload = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+            os.utime(path)
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning(f"Dropping unreadable document cache entry {key}: {e}")
+            self._discard(key)
+            return None
+        return ExtractedDocument(payload["text"], payload["page_offsets"])
+
+    def put(self, key, document):
+        """Stores an ExtractedDocument under key and evicts old entries beyond max_bytes."""
+        blob = zlib.compress(json.dumps({
+            "text": document.text,
+            "page_offsets": document.page_offsets,
+        }).encode("utf-8"))
+        if len(blob) > self.max_bytes:
+            return document
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write document cache entry {key}: {e}")
+            return document
+
+        with self._lock:
+            self._total_bytes += len(blob) - self._entries.pop(key, 0)
+            self._entries[key] = len(blob)
+            evicted = []
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._remove_file(old_key)
+        return document
+
+    def _discard(self, key):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+        self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
@@ -0,0 +1,160 @@
+"""In-memory store of registered documents and their preprocessing artifacts.
+
+A document is registered once (from an upload, a Google Doc or raw text) and
+gets a doc_id. Sentences, the spaCy parse, the keyword/sentence index and the
+question generator's segments are computed lazily on first use and then
+shared by every endpoint and request that refers to the same doc_id.
+
+The store is an LRU bounded both by a document count and by approximate
+memory: each document counts its text plus an estimate for every artifact
+computed so far, spaCy parses being by far the largest.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from Generator.mcq import tokenize_into_sentences
+from Generator.sentence_index import SentenceIndex
+from Generator.metrics import stage
+
+DOCUMENT_STORE_CAPACITY = int(os.environ.get("DOCUMENT_STORE_CAPACITY", 256))
+# Approximate memory for registered texts and their artifacts, in MB
+DOCUMENT_STORE_MAX_MB = int(os.environ.get("DOCUMENT_STORE_MAX_MB", 512))
+# Rough size of a parsed spaCy token (TokenC struct, tensor row, lexeme references)
+SPACY_TOKEN_BYTES = 600
+
+
+def text_doc_id(text):
+    """Default doc_id: SHA-256 of the UTF-8 encoded text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def approx_bytes(value, text_length):
+    """Rough memory of an artifact; objects of unknown shape are assumed to be about the text's size."""
+    if isinstance(value, str):
+        return len(value)
+    if hasattr(value, "vocab") and hasattr(value, "__len__"):
+        # A spaCy Doc
+        return len(value) * SPACY_TOKEN_BYTES
+    if isinstance(value, (list, tuple)):
+        return sum(approx_bytes(item, 0) for item in value) + 8 * len(value)
+    return text_length
+
+
+class Document:
+    """A registered text and its memoized artifacts."""
+
+    def __init__(self, doc_id, text, on_grow=None):
+        self.doc_id = doc_id
+        self.text = text
+        self.nbytes = len(text)
+        self._on_grow = on_grow
+        self._artifacts = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Locks and artifacts stay behind; the receiving process keeps its own store
+        return _restore_document, (self.doc_id, self.text)
+
+    def artifact(self, name, factory):
+        """Returns the artifact called name, computing it with factory() exactly once."""
+        try:
+            return self._artifacts[name]
+        except KeyError:
+            pass
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name in self._artifacts:
+                return self._artifacts[name]
+            value = self._artifacts[name] = factory()
+        with self._lock:
+            self.nbytes += approx_bytes(value, len(self.text))
+        if self._on_grow is not None:
+            self._on_grow()
+        return value
+
+    @property
+    def sentences(self):
+        return self.artifact("sentences", lambda: tokenize_into_sentences(self.text))
+
+    @property
+    def sentence_index(self):
+        return self.artifact("sentence_index", lambda: SentenceIndex(self.sentences))
+
+    def spacy_doc(self, nlp):
+        """spaCy parse of the joined sentences, as used for keyword selection."""
+        def parse():
+            with stage("spacy"):
+                return nlp(" ".join(self.sentences))
+        return self.artifact("spacy_doc", parse)
+
+
+class DocumentStore:
+    """Thread-safe LRU of Document objects keyed by doc_id, bounded by count and approximate bytes."""
+
+    def __init__(self, capacity=DOCUMENT_STORE_CAPACITY, max_bytes=DOCUMENT_STORE_MAX_MB * 1024 * 1024):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, text, doc_id=None):
+        """Registers text and returns its Document. Registering the same id again returns the
+        existing Document with its artifacts.
+        """
+        doc_id = doc_id or text_doc_id(text)
+        with self._lock:
+            document = self._documents.get(doc_id)
+            if document is None:
+                document = self._documents[doc_id] = Document(doc_id, text, self._evict)
+            self._documents.move_to_end(doc_id)
+            self._evict_locked()
+            return document
+
+    def _evict(self):
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self):
+        # Evicted documents keep working for requests that hold them; they are just no longer shared
+        while len(self._documents) > self.capacity:
+            self._documents.popitem(last=False)
+        if self.max_bytes:
+            total = self._nbytes_locked()
+            while self._documents and total > self.max_bytes:
+                total -= self._documents.popitem(last=False)[1].nbytes
+
+    def _nbytes_locked(self):
+        return sum(document.nbytes for document in self._documents.values())
+
+    def nbytes(self):
+        """Approximate memory of the stored texts and artifacts."""
+        with self._lock:
+            return self._nbytes_locked()
+
+    def get(self, doc_id):
+        with self._lock:
+            document = self._documents.get(doc_id)
+            if document is not None:
+                self._documents.move_to_end(doc_id)
+            return document
+
+    def __len__(self):
+        with self._lock:
+            return len(self._documents)
+
+
+# Store for Documents unpickled in this process, e.g. by an inference worker
+_restored_documents = None
+_restored_lock = threading.Lock()
+
+
+def _restore_document(doc_id, text):
+    global _restored_documents
+    with _restored_lock:
+        if _restored_documents is None:
+            _restored_documents = DocumentStore()
+    return _restored_documents.register(text, doc_id)
@@ -1,5 +1,72 @@
+import os
+
 import torch
-from transformers import T5ForConditionalGeneration,T5Tokenizer
+from Generator.metrics import stage, count_tokens, observe_batch
+from Generator.profiling import operator_profile
+
+# Inputs are truncated to this many tokens
+ENCODE_MAX_LENGTH = int(os.environ.get("ENCODE_MAX_LENGTH", 512))
+# Batches larger than this are sorted by length and run in buckets of this size
+ENCODE_BUCKET_SIZE = int(os.environ.get("ENCODE_BUCKET_SIZE", 16))
+
+
+def encode(tokenizer, texts, max_length=ENCODE_MAX_LENGTH, device=None):
+  """Tokenizes texts padded to the longest of them (not to the model maximum) and truncated to max_length."""
+  encoding = tokenizer(texts, padding="longest", truncation=True, max_length=max_length, return_tensors="pt")
+  return encoding.to(device) if device is not None else encoding
+
+
+def _pad(sequences, pad_token_id):
+  longest = max(len(ids) for ids in sequences)
+  input_ids = torch.full((len(sequences), longest), pad_token_id, dtype=torch.long)
+  attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+  for row, ids in enumerate(sequences):
+    input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+    attention_mask[row, :len(ids)] = 1
+  return input_ids, attention_mask
+
+
+def encode_buckets(tokenizer, texts, max_length=ENCODE_MAX_LENGTH, bucket_size=ENCODE_BUCKET_SIZE):
+  """Tokenizes texts in one call and yields (indices, input_ids, attention_mask) batches.
+
+  Up to bucket_size texts form a single batch in their original order. Larger
+  batches are sorted by token length and cut into buckets of bucket_size, so
+  each bucket is padded only to its own longest text.
+  """
+  if not texts:
+    return
+  sequences = tokenizer(list(texts), truncation=True, max_length=max_length)["input_ids"]
+  order = list(range(len(sequences)))
+  if bucket_size and len(sequences) > bucket_size:
+    order.sort(key=lambda i: len(sequences[i]))
+  else:
+    bucket_size = len(sequences)
+  for start in range(0, len(order), bucket_size):
+    indices = order[start:start + bucket_size]
+    input_ids, attention_mask = _pad([sequences[i] for i in indices], tokenizer.pad_token_id)
+    yield indices, input_ids, attention_mask
+
+
+def generate_batched(texts, model, tokenizer, device, model_name, input_max_length=ENCODE_MAX_LENGTH,
+                     bucket_size=ENCODE_BUCKET_SIZE, **generate_kwargs):
+  """Generates one output per text with dynamically padded length buckets; returns the decoded
+  outputs in the order of texts. generate_kwargs (e.g. max_length) go to model.generate().
+  """
+  decoded = [None] * len(texts)
+  with stage("tokenize"):
+    buckets = list(encode_buckets(tokenizer, texts, input_max_length, bucket_size))
+
+  for indices, input_ids, attention_mask in buckets:
+    input_ids, attention_mask = input_ids.to(device), attention_mask.to(device)
+    observe_batch(model_name, len(indices))
+    with torch.no_grad(), stage("generate"), operator_profile(model_name):
+      outputs = model.generate(input_ids=input_ids, attention_mask=attention_mask, **generate_kwargs)
+    count_tokens(model_name, attention_mask.sum().item(), outputs.ne(tokenizer.pad_token_id).sum().item())
+    with stage("decode"):
+      texts_out = tokenizer.batch_decode(outputs, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+    for i, text in zip(indices, texts_out):
+      decoded[i] = text
+  return decoded
 
 
 def greedy_decoding (inp_ids,attn_mask,model,tokenizer):
@@ -8,18 +75,20 @@ def greedy_decoding (inp_ids,attn_mask,model,tokenizer):
   return Question.strip().capitalize()
 
 
-def beam_search_decoding (inp_ids,attn_mask,model,tokenizer,num):
+def beam_search_decoding (inp_ids,attn_mask,model,tokenizer,num,model_name="t5"):
   num_beams = max(10, num)  # num_beams must be >= num_return_sequences
-  beam_output = model.generate(input_ids=inp_ids,
-                                 attention_mask=attn_mask,
-                                 max_length=256,
-                               num_beams=num_beams,
-                               num_return_sequences=num,
-                               no_repeat_ngram_size=2,
-                               early_stopping=True
-                               )
-  Questions = [tokenizer.decode(out, skip_special_tokens=True, clean_up_tokenization_spaces=True) for out in
-               beam_output]
+  with stage("generate"), operator_profile(model_name):
+    beam_output = model.generate(input_ids=inp_ids,
+                                   attention_mask=attn_mask,
+                                   max_length=256,
+                                 num_beams=num_beams,
+                                 num_return_sequences=num,
+                                 no_repeat_ngram_size=2,
+                                 early_stopping=True
+                                 )
+  count_tokens(model_name, attn_mask.sum().item(), beam_output.ne(tokenizer.pad_token_id).sum().item())
+  with stage("decode"):
+    Questions = tokenizer.batch_decode(beam_output, skip_special_tokens=True, clean_up_tokenization_spaces=True)
   return [Question.strip().capitalize() for Question in Questions]
 
 
@@ -34,5 +103,5 @@ def topkp_decoding (inp_ids,attn_mask,model,tokenizer):
                                 no_repeat_ngram_size=2,
                                 early_stopping=True
                                )
-  Questions = [tokenizer.decode(out, skip_special_tokens=True,clean_up_tokenization_spaces=True) for out in topkp_output]
+  Questions = tokenizer.batch_decode(topkp_output, skip_special_tokens=True, clean_up_tokenization_spaces=True)
   return [Question.strip().capitalize() for Question in Questions]
@@ -0,0 +1,65 @@
+"""Per-request pool of named entities for multiple-choice distractors.
+
+The pool is built once from the spaCy docs of a text: distinct (text, label)
+pairs in first-seen order, with the positions of each label's entries.
+Drawing k distractors for an answer is O(k): same-label candidates are
+sampled by index with the answer's own slot skipped, and any shortfall is
+filled by rejection sampling over the other labels.
+"""
+import random
+from typing import Any, Iterable, List, Tuple
+
+
+class EntityPool:
+    """Distinct entities of a set of docs, grouped by NER label."""
+
+    def __init__(self, docs: Iterable[Any]):
+        self.entries: List[Tuple[str, str]] = []
+        self.by_label = {}
+        self._index = {}
+        for doc in docs:
+            for entity in doc.ents:
+                key = (entity.text, entity.label_)
+                if key in self._index:
+                    continue
+                group = self.by_label.setdefault(entity.label_, [])
+                self._index[key] = (len(self.entries), len(group))
+                group.append(len(self.entries))
+                self.entries.append(key)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def distractors(self, text: str, label: str, k: int, rng=random) -> List[str]:
+        """Up to k entity texts other than (text, label), preferring entities labelled label."""
+        group = self.by_label.get(label, [])
+        own = self._index.get((text, label))
+        same = len(group) - (own is not None)
+
+        if same >= k:
+            # Sample slots of the group minus our own, shifting past it
+            skip = own[1] if own is not None else len(group)
+            picks = [group[i + (i >= skip)] for i in rng.sample(range(same), k)]
+        else:
+            picks = [i for i in group if own is None or i != own[0]]
+            picks.extend(self._others(label, k - len(picks), rng))
+        return [self.entries[i][0] for i in picks]
+
+    def _others(self, label, k, rng):
+        """k entries whose label is not label (fewer if there are not enough)."""
+        available = len(self.entries) - len(self.by_label.get(label, []))
+        k = min(k, available)
+        if k <= 0:
+            return []
+        if available <= 2 * k:
+            candidates = [i for i, (_, other) in enumerate(self.entries) if other != label]
+            return rng.sample(candidates, k)
+        # Most entries qualify, so a few draws suffice on average
+        picked = []
+        seen = set()
+        while len(picked) < k:
+            i = rng.randrange(len(self.entries))
+            if i not in seen and self.entries[i][1] != label:
+                seen.add(i)
+                picked.append(i)
+        return picked
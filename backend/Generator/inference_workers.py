@@ -0,0 +1,403 @@
+"""Model-owning inference worker processes behind local Unix sockets.
+
+With INFERENCE_WORKERS enabled, the HTTP process does not load any models.
+One process is spawned per model family and loads only that family, and the
+server talks to them through RemoteModel proxies with the same methods as
+the local generators. Calls are pickled over a Unix socket per family and
+front-end process. Each worker runs its family's calls from its own queue,
+so HTTP concurrency is decoupled from model memory and every family queues
+independently. Registered Documents travel as (doc_id, text) and keep their
+artifacts in a per-worker store, so repeated requests for a document skip
+preprocessing in the worker too.
+
+Stage timings measured in a worker are sent back with each reply and
+recorded in the calling process, so they show up in its /metrics and in the
+request's Server-Timing header. Token and batch-size counters are not
+forwarded: they stay in the worker's own registry, which nothing exports.
+Targets whose family is not in INFERENCE_FAMILIES are falsy RemoteModels and
+raise ModelUnavailable when called.
+"""
+import atexit
+import itertools
+import logging
+import os
+import pickle
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Client, Listener
+
+from Generator.metrics import begin_request, end_request, observe_queue_wait, record_stage
+from Generator.model_manager import ModelUnavailable
+from Generator.warmup import WARMUP, warm_up
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INFERENCE_WORKERS = os.environ.get("INFERENCE_WORKERS", "0").lower() in ("1", "true", "yes")
+INFERENCE_FAMILIES = os.environ.get("INFERENCE_FAMILIES", "t5_qg,boolq,qg,answer,qa")
+# Calls each worker runs concurrently; 1 serializes a family on its model
+INFERENCE_WORKER_THREADS = int(os.environ.get("INFERENCE_WORKER_THREADS", 1))
+# Loading large checkpoints can take minutes
+INFERENCE_START_TIMEOUT = int(os.environ.get("INFERENCE_START_TIMEOUT", 900))
+INFERENCE_CALL_TIMEOUT = int(os.environ.get("INFERENCE_CALL_TIMEOUT", 900))
+
+
+class InferenceError(RuntimeError):
+    """A remote call failed in a way that cannot be re-raised as the original exception."""
+
+
+def _load_t5_qg():
+    from Generator import main
+    return {"mcq": main.MCQGenerator(), "shortq": main.ShortQGenerator()}
+
+
+def _load_boolq():
+    from Generator import main
+    return {"boolq": main.BoolQGenerator()}
+
+
+def _load_qg():
+    from Generator import main
+    return {"qg": main.QuestionGenerator()}
+
+
+def _load_answer():
+    from Generator import main
+    return {"answer": main.AnswerPredictor()}
+
+
+def _load_qa():
+    from transformers import pipeline
+    return {"qa": pipeline("question-answering")}
+
+
+# Model family -> loader returning {target name: object}
+FAMILIES = {
+    "t5_qg": _load_t5_qg,
+    "boolq": _load_boolq,
+    "qg": _load_qg,
+    "answer": _load_answer,
+    "qa": _load_qa,
+}
+TARGET_FAMILIES = {"mcq": "t5_qg", "shortq": "t5_qg", "boolq": "boolq", "qg": "qg", "answer": "answer", "qa": "qa"}
+
+
+def _portable_error(error):
+    """The exception itself if it survives pickling, otherwise an InferenceError describing it."""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return InferenceError(f"{type(error).__name__}: {error}")
+
+
+def _serve_connection(conn, tasks):
+    send_lock = threading.Lock()
+    while True:
+        try:
+            task_id, target, method, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            break
+        tasks.put((conn, send_lock, task_id, target, method, args, kwargs, time.perf_counter()))
+    conn.close()
+
+
+def _run_tasks(targets, tasks):
+    while True:
+        conn, send_lock, task_id, target, method, args, kwargs, received = tasks.get()
+        started = time.perf_counter()
+        token = begin_request()
+        try:
+            obj = targets[target]
+            fn = obj if method == "__call__" else getattr(obj, method)
+            result = (True, fn(*args, **kwargs))
+        except Exception as e:
+            logger.exception(f"Inference call {target}.{method} failed")
+            result = (False, _portable_error(e))
+        # Stage timings go back with the reply for the caller's metrics
+        timings = end_request(token)
+        reply = (task_id, *result, started - received, timings)
+        with send_lock:
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                # The client went away; keep serving the others
+                pass
+            except Exception as e:
+                # The result could not be pickled
+                try:
+                    conn.send((task_id, False, InferenceError(f"Unsendable result: {e}"), started - received, timings))
+                except Exception as send_error:
+                    logger.warning(f"Could not send the error of {target}.{method}: {send_error}")
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _exit_with_parent(parent_pid):
+    while _pid_alive(parent_pid) and os.getppid() == parent_pid:
+        time.sleep(1)
+    os._exit(0)
+
+
+def _worker_main(family, address, threads, parent_pid):
+    """Entry point of an inference worker process."""
+    logging.basicConfig(level=logging.INFO)
+    from Generator import startup
+    from Generator.serving import freeze_models
+
+    startup.install_import_timer()
+    threading.Thread(target=_exit_with_parent, args=(parent_pid,), daemon=True).start()
+
+    start = time.perf_counter()
+    targets = FAMILIES[family]()
+    freeze_models(*targets.values(), share_memory=False)
+    startup.record_model(family, time.perf_counter() - start)
+    if WARMUP:
+        # Before the socket exists, so a worker only takes calls once warm
+        for target, obj in targets.items():
+            warmup_start = time.perf_counter()
+            try:
+                warm_up(obj)
+                logger.info(f"Warmed up {target} in {time.perf_counter() - warmup_start:.1f}s")
+            except Exception as e:
+                logger.warning(f"Warmup of {target} failed: {e}")
+    startup.report()
+
+    tasks = queue.Queue()
+    for _ in range(threads):
+        threading.Thread(target=_run_tasks, args=(targets, tasks), daemon=True).start()
+
+    # The socket only appears once the models are loaded, which is what clients wait for
+    listener = Listener(address, family="AF_UNIX")
+    logger.info(f"Inference worker {family} ready on {address}")
+    while True:
+        conn = listener.accept()
+        threading.Thread(target=_serve_connection, args=(conn, tasks), daemon=True).start()
+
+
+class _Connection:
+    """A front-end process's connection to one worker, multiplexing concurrent calls."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self.closed = False
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def submit(self, target, method, args, kwargs):
+        future = Future()
+        task_id = next(self._ids)
+        with self._pending_lock:
+            if self.closed:
+                raise InferenceError("Inference worker connection is closed")
+            self._pending[task_id] = future
+        future.task_id = task_id
+        try:
+            with self._send_lock:
+                self._conn.send((task_id, target, method, args, kwargs))
+        except Exception:
+            with self._pending_lock:
+                self._pending.pop(task_id, None)
+            raise
+        return future
+
+    def discard(self, future):
+        """Stops waiting for future's reply; a reply that still arrives is ignored."""
+        with self._pending_lock:
+            self._pending.pop(future.task_id, None)
+
+    def pending(self):
+        with self._pending_lock:
+            return len(self._pending)
+
+    def _read(self):
+        while True:
+            try:
+                task_id, ok, value, queue_wait, timings = self._conn.recv()
+            except Exception:
+                # Closed, or a reply that cannot be unpickled: fail everything pending
+                break
+            with self._pending_lock:
+                future = self._pending.pop(task_id, None)
+            if future is None:
+                continue
+            future.queue_wait = queue_wait
+            future.timings = timings
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+        with self._pending_lock:
+            self.closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(InferenceError("Inference worker connection lost"))
+
+
+class InferenceWorkers:
+    """Spawns one worker process per model family and routes calls to them."""
+
+    def __init__(self, families=INFERENCE_FAMILIES, threads=INFERENCE_WORKER_THREADS,
+                 start_timeout=INFERENCE_START_TIMEOUT, call_timeout=INFERENCE_CALL_TIMEOUT):
+        if isinstance(families, str):
+            families = [f.strip() for f in families.split(",") if f.strip()]
+        unknown = set(families) - set(FAMILIES)
+        if unknown:
+            raise ValueError(f"Unknown inference families: {sorted(unknown)}")
+        self.families = list(families)
+        self.threads = threads
+        self.start_timeout = start_timeout
+        self.call_timeout = call_timeout
+        self.socket_dir = None
+        self.processes = {}
+        self._owner_pid = None
+        self._connections = {}
+        self._connections_pid = None
+        self._lock = threading.Lock()
+
+    def address(self, family):
+        return os.path.join(self.socket_dir, f"{family}.sock")
+
+    def start(self):
+        # Fresh interpreters rather than forks (or multiprocessing spawn, which would
+        # re-run the server module): workers must not inherit torch or thread state
+        self.socket_dir = tempfile.mkdtemp(prefix="eduaid-inference-")
+        self._owner_pid = os.getpid()
+        for family in self.families:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "Generator.inference_workers",
+                 family, self.address(family), str(self.threads), str(os.getpid())],
+                cwd=_BACKEND_DIR,
+            )
+            self.processes[family] = process
+            logger.info(f"Started inference worker {family} (pid {process.pid})")
+        atexit.register(self.shutdown)
+        return self
+
+    def shutdown(self):
+        # Only the process that started the workers owns them, not forked HTTP workers
+        if self._owner_pid != os.getpid():
+            return
+        for process in self.processes.values():
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self.socket_dir:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def serves(self, target):
+        """Whether target's family was started."""
+        return TARGET_FAMILIES[target] in self.processes
+
+    def _connect(self, family):
+        process = self.processes.get(family)
+        if process is None:
+            raise ModelUnavailable(f"Inference family {family} is not running")
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            try:
+                return _Connection(Client(self.address(family), family="AF_UNIX"))
+            except (FileNotFoundError, ConnectionRefusedError):
+                if not _pid_alive(process.pid):
+                    raise InferenceError(f"Inference worker {family} (pid {process.pid}) exited")
+                if time.monotonic() > deadline:
+                    raise InferenceError(f"Inference worker {family} did not start in time")
+                time.sleep(0.5)
+
+    def connection(self, family):
+        with self._lock:
+            if self._connections_pid != os.getpid():
+                # Connections are per process; a forked HTTP worker opens its own
+                self._connections = {}
+                self._connections_pid = os.getpid()
+            conn = self._connections.get(family)
+            if conn is None or conn.closed:
+                conn = self._connections[family] = self._connect(family)
+            return conn
+
+    def call(self, target, method, args=(), kwargs=None):
+        family = TARGET_FAMILIES[target]
+        connection = self.connection(family)
+        future = connection.submit(target, method, args, kwargs or {})
+        try:
+            result = future.result(timeout=self.call_timeout)
+        except FutureTimeoutError:
+            connection.discard(future)
+            raise InferenceError(f"Inference call {target}.{method} timed out")
+        finally:
+            if getattr(future, "queue_wait", None) is not None:
+                observe_queue_wait(f"inference_{family}", future.queue_wait)
+            for name, seconds in getattr(future, "timings", {}).items():
+                record_stage(name, seconds)
+        return result
+
+    def ready(self):
+        return all(s["ready"] for s in self.status().values())
+
+    def status(self):
+        with self._lock:
+            connections = dict(self._connections) if self._connections_pid == os.getpid() else {}
+        return {
+            family: {
+                "pid": process.pid,
+                "alive": _pid_alive(process.pid),
+                # The worker only listens once its models are loaded and warmed up
+                "ready": _pid_alive(process.pid) and os.path.exists(self.address(family)),
+                "connected": family in connections and not connections[family].closed,
+                "pending": connections[family].pending() if family in connections else 0,
+            }
+            for family, process in self.processes.items()
+        }
+
+
+class RemoteModel:
+    """Proxy with the interface of a local generator (or pipeline) whose calls run in a worker."""
+
+    def __init__(self, workers, target):
+        self._workers = workers
+        self._target = target
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return lambda *args, **kwargs: self._workers.call(self._target, method, args, kwargs)
+
+    def __call__(self, *args, **kwargs):
+        return self._workers.call(self._target, "__call__", args, kwargs)
+
+    def __bool__(self):
+        # Like an unavailable LazyModel, so endpoints answer 503 for families that are not running
+        return self._workers.serves(self._target)
+
+    def __repr__(self):
+        return f"RemoteModel({self._target!r})"
+
+
+if __name__ == "__main__":
+    # Import by package name so pickled exceptions resolve to the same classes in the server
+    from Generator.inference_workers import _worker_main as serve
+    serve(sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
@@ -0,0 +1,146 @@
+"""Map-reduce keyword selection for book-length documents.
+
+The text is walked section by section, keyword candidates are extracted per
+section (map), and the candidates are merged with a global frequency/diversity
+score (reduce). Only the selected keywords are then matched against the
+sentences of the section they came from, so memory stays bounded by one
+section at a time and runtime is linear in document length. Sections are
+processed sequentially: the spaCy and sense2vec work is CPU-bound Python, so
+threads would not run it in parallel, and worker processes would each need
+their own copy of the models.
+"""
+import math
+import os
+
+from Generator.mcq import tokenize_into_sentences, identify_keywords, find_sentences_with_keywords, are_words_distant
+
+# Documents longer than this are routed through the map-reduce pipeline
+LARGE_DOCUMENT_THRESHOLD = int(os.environ.get("LARGE_DOCUMENT_THRESHOLD", 50000))
+SECTION_CHARS = int(os.environ.get("LARGE_DOCUMENT_SECTION_CHARS", 8000))
+# Characters of a large document echoed back as the response's "statement"
+STATEMENT_PREVIEW_CHARS = int(os.environ.get("LARGE_DOCUMENT_STATEMENT_CHARS", 2000))
+CANDIDATES_PER_SECTION = 8
+# Upper bound on distinct candidates kept during the reduce step
+MAX_CANDIDATES = 4096
+
+
+def is_large_document(text, large_document=False):
+    """Return True if text should go through the map-reduce pipeline."""
+    return bool(large_document) or len(text) > LARGE_DOCUMENT_THRESHOLD
+
+
+def iter_sections(text, section_chars=SECTION_CHARS):
+    """Yield (start, end) spans of consecutive sections, preferring paragraph then sentence breaks."""
+    length = len(text)
+    start = 0
+    while start < length:
+        end = start + section_chars
+        if end >= length:
+            yield start, length
+            return
+        floor = start + section_chars // 2
+        cut = text.rfind("\n", floor, end)
+        if cut == -1:
+            cut = text.rfind(". ", floor, end)
+            if cut != -1:
+                cut += 1
+        if cut == -1:
+            cut = text.rfind(" ", floor, end)
+        if cut == -1:
+            cut = end
+        yield start, cut
+        start = cut
+
+
+def _section_candidates(section, nlp_model, s2v_model, fdist, normalized_levenshtein):
+    """Map step: ranked keyword candidates for a single section."""
+    sentences = tokenize_into_sentences(section)
+    if not sentences:
+        return []
+    max_keywords = min(CANDIDATES_PER_SECTION, 2 * len(sentences))
+    return identify_keywords(nlp_model, " ".join(sentences), max_keywords, s2v_model, fdist, normalized_levenshtein, len(sentences))
+
+
+def statement_preview(text, limit=STATEMENT_PREVIEW_CHARS):
+    """The start of a large document, cut at a word boundary, instead of echoing all of it."""
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > 0 else limit].rstrip() + " ..."
+
+
+class _Candidate:
+    __slots__ = ("keyword", "score", "sections", "best_rank", "span")
+
+    def __init__(self, keyword, span, rank):
+        self.keyword = keyword
+        self.score = 0.0
+        self.sections = 0
+        self.best_rank = rank
+        self.span = span
+
+
+def _prune(candidates):
+    """Drop the weaker half of the candidate table to keep the reduce step bounded."""
+    ranked = sorted(candidates.values(), key=lambda c: c.score, reverse=True)
+    return {c.keyword.lower(): c for c in ranked[:MAX_CANDIDATES // 2]}
+
+
+def select_global_keywords(candidates, max_keywords, num_sections, normalized_levenshtein, threshold=0.5):
+    """Reduce step: pick keywords by score while spreading them across sections and avoiding near-duplicates."""
+    ranked = sorted(candidates.values(), key=lambda c: c.score * (1 + math.log(c.sections)), reverse=True)
+    per_section_quota = max(1, math.ceil(2 * max_keywords / max(num_sections, 1)))
+    used = {}
+    selected = []
+    for candidate in ranked:
+        if len(selected) >= max_keywords:
+            break
+        if used.get(candidate.span, 0) >= per_section_quota:
+            continue
+        if selected and not are_words_distant([c.keyword for c in selected], candidate.keyword, threshold, normalized_levenshtein):
+            continue
+        selected.append(candidate)
+        used[candidate.span] = used.get(candidate.span, 0) + 1
+    return selected
+
+
+def map_reduce_keyword_contexts(text, max_keywords, nlp_model, s2v_model, fdist, normalized_levenshtein,
+                                section_chars=SECTION_CHARS):
+    """Return an ordered {keyword: context} mapping for a book-length text.
+
+    Context is the top three sentences mentioning the keyword within the section
+    where the keyword ranked highest.
+    """
+    candidates = {}
+    num_sections = 0
+    for span in iter_sections(text, section_chars):
+        keywords = _section_candidates(text[span[0]:span[1]], nlp_model, s2v_model, fdist, normalized_levenshtein)
+        num_sections += 1
+        for rank, keyword in enumerate(keywords):
+            key = keyword.lower()
+            candidate = candidates.get(key)
+            if candidate is None:
+                candidate = candidates[key] = _Candidate(keyword, span, rank)
+            elif rank < candidate.best_rank:
+                candidate.best_rank = rank
+                candidate.span = span
+            candidate.sections += 1
+            candidate.score += 1.0 / (rank + 1)
+        if len(candidates) > MAX_CANDIDATES:
+            candidates = _prune(candidates)
+
+    selected = select_global_keywords(candidates, max_keywords, num_sections, normalized_levenshtein)
+
+    # Resolve contexts section by section, only for sections that own a selected keyword
+    by_span = {}
+    for candidate in selected:
+        by_span.setdefault(candidate.span, []).append(candidate.keyword)
+
+    contexts = {}
+    for (start, end), keywords in by_span.items():
+        sentences = tokenize_into_sentences(text[start:end])
+        mapping = find_sentences_with_keywords(keywords, sentences)
+        for keyword, keyword_sentences in mapping.items():
+            contexts[keyword] = " ".join(keyword_sentences[:3])
+
+    return {c.keyword: contexts[c.keyword] for c in selected if c.keyword in contexts}
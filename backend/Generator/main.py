@@ -1,36 +1,45 @@
+import logging
+import threading
 import time
 import torch
 import random
-from transformers import T5ForConditionalGeneration, T5Tokenizer
-from transformers import AutoModelForSequenceClassification, AutoTokenizer,AutoModelForSeq2SeqLM, T5ForConditionalGeneration, T5Tokenizer
+from transformers import T5ForConditionalGeneration, T5TokenizerFast
+from transformers import AutoModelForSequenceClassification, AutoTokenizer, AutoModelForSeq2SeqLM
 import numpy as np
 import spacy
-from sense2vec import Sense2Vec
 from collections import OrderedDict
 from nltk import FreqDist
 from nltk.corpus import brown
 from similarity.normalized_levenshtein import NormalizedLevenshtein
 from Generator.mcq import tokenize_into_sentences, identify_keywords, find_sentences_with_keywords, generate_multiple_choice_questions, generate_normal_questions
-from Generator.encoding import beam_search_decoding
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-import en_core_web_sm
-import json
+from Generator.large_document import is_large_document, map_reduce_keyword_contexts, statement_preview
+from Generator.encoding import beam_search_decoding, encode
+from Generator.pdf_extraction import PDFExtractor, parse_page_range
+from Generator.document_cache import ExtractedDocument, content_hash, page_range_id
+from Generator.metrics import stage, count_tokens, observe_batch
+from Generator.profiling import operator_profile
+from Generator.startup import load_pretrained, load_tokenizer
+from Generator.segmentation import split_into_segments
+from Generator.entity_pool import EntityPool
+from Generator.seeding import make_rng
 import re
 from typing import Any, List, Mapping, Tuple
 import re
+import io
 import os
-import fitz 
-import mammoth
+import codecs
+
+logger = logging.getLogger(__name__)
 
 class MCQGenerator:
     
     def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-large')
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Question-Generator')
+        self.tokenizer = load_tokenizer(T5TokenizerFast, 't5-large')
+        self.model = load_pretrained(T5ForConditionalGeneration, 'Roasters/Question-Generator')
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model.to(self.device)
         self.nlp = spacy.load('en_core_web_sm')
+        from sense2vec import Sense2Vec
         self.s2v = Sense2Vec().from_disk('s2v_old')
         self.fdist = FreqDist(brown.words())
         self.normalized_levenshtein = NormalizedLevenshtein()
@@ -50,21 +59,30 @@ class MCQGenerator:
         }
 
         text = inp['input_text']
-        sentences = tokenize_into_sentences(text)
-        modified_text = " ".join(sentences)
-
-        # Try to extract more keywords than requested, then filter down
-        # This increases the chance of finding enough valid keywords
-        target_keywords = min(inp['max_questions'] * 2, len(sentences))
-        keywords = identify_keywords(self.nlp, modified_text, target_keywords, self.s2v, self.fdist, self.normalized_levenshtein, len(sentences))
-        
-        # Trim to requested amount after validation
-        keywords = keywords[:inp['max_questions']]
-        keyword_sentence_mapping = find_sentences_with_keywords(keywords, sentences)
-
-        for k in keyword_sentence_mapping.keys():
-            text_snippet = " ".join(keyword_sentence_mapping[k][:3])
-            keyword_sentence_mapping[k] = text_snippet
+        if is_large_document(text, payload.get("large_document")):
+            # Book-length input: select keywords section by section
+            modified_text = statement_preview(text)
+            keyword_sentence_mapping = map_reduce_keyword_contexts(text, inp['max_questions'], self.nlp, self.s2v, self.fdist, self.normalized_levenshtein)
+        else:
+            # A registered document (or prebuilt index) lets generators share preprocessing
+            document = payload.get("document")
+            sentence_index = document.sentence_index if document is not None else payload.get("sentence_index")
+            sentences = sentence_index.sentences if sentence_index is not None else tokenize_into_sentences(text)
+            modified_text = " ".join(sentences)
+            spacy_doc = document.spacy_doc(self.nlp) if document is not None else None
+
+            # Try to extract more keywords than requested, then filter down
+            # This increases the chance of finding enough valid keywords
+            target_keywords = min(inp['max_questions'] * 2, len(sentences))
+            keywords = identify_keywords(self.nlp, modified_text, target_keywords, self.s2v, self.fdist, self.normalized_levenshtein, len(sentences), spacy_doc)
+
+            # Trim to requested amount after validation
+            keywords = keywords[:inp['max_questions']]
+            keyword_sentence_mapping = find_sentences_with_keywords(keywords, sentences, sentence_index)
+
+            for k in keyword_sentence_mapping.keys():
+                text_snippet = " ".join(keyword_sentence_mapping[k][:3])
+                keyword_sentence_mapping[k] = text_snippet
 
         final_output = {}
 
@@ -90,11 +108,12 @@ class MCQGenerator:
 class ShortQGenerator:
     
     def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-large')
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Question-Generator')
+        self.tokenizer = load_tokenizer(T5TokenizerFast, 't5-large')
+        self.model = load_pretrained(T5ForConditionalGeneration, 'Roasters/Question-Generator')
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model.to(self.device)
         self.nlp = spacy.load('en_core_web_sm')
+        from sense2vec import Sense2Vec
         self.s2v = Sense2Vec().from_disk('s2v_old')
         self.fdist = FreqDist(brown.words())
         self.normalized_levenshtein = NormalizedLevenshtein()
@@ -113,18 +132,27 @@ class ShortQGenerator:
         }
 
         text = inp['input_text']
-        sentences = tokenize_into_sentences(text)
-        modified_text = " ".join(sentences)
-
-        # Extract 2x keywords to increase the chance of reaching max_questions
-        target_keywords = min(inp['max_questions'] * 2, len(sentences))
-        keywords = identify_keywords(self.nlp, modified_text, target_keywords, self.s2v, self.fdist, self.normalized_levenshtein, len(sentences))
-        keywords = keywords[:inp['max_questions']]
-        keyword_sentence_mapping = find_sentences_with_keywords(keywords, sentences)
-        
-        for k in keyword_sentence_mapping.keys():
-            text_snippet = " ".join(keyword_sentence_mapping[k][:3])
-            keyword_sentence_mapping[k] = text_snippet
+        if is_large_document(text, payload.get("large_document")):
+            # Book-length input: select keywords section by section
+            modified_text = statement_preview(text)
+            keyword_sentence_mapping = map_reduce_keyword_contexts(text, inp['max_questions'], self.nlp, self.s2v, self.fdist, self.normalized_levenshtein)
+        else:
+            # A registered document (or prebuilt index) lets generators share preprocessing
+            document = payload.get("document")
+            sentence_index = document.sentence_index if document is not None else payload.get("sentence_index")
+            sentences = sentence_index.sentences if sentence_index is not None else tokenize_into_sentences(text)
+            modified_text = " ".join(sentences)
+            spacy_doc = document.spacy_doc(self.nlp) if document is not None else None
+
+            # Extract 2x keywords to increase the chance of reaching max_questions
+            target_keywords = min(inp['max_questions'] * 2, len(sentences))
+            keywords = identify_keywords(self.nlp, modified_text, target_keywords, self.s2v, self.fdist, self.normalized_levenshtein, len(sentences), spacy_doc)
+            keywords = keywords[:inp['max_questions']]
+            keyword_sentence_mapping = find_sentences_with_keywords(keywords, sentences, sentence_index)
+
+            for k in keyword_sentence_mapping.keys():
+                text_snippet = " ".join(keyword_sentence_mapping[k][:3])
+                keyword_sentence_mapping[k] = text_snippet
 
         final_output = {}
 
@@ -144,8 +172,8 @@ class ShortQGenerator:
 class ParaphraseGenerator:
     
     def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-large')
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Question-Generator')
+        self.tokenizer = load_tokenizer(T5TokenizerFast, 't5-large')
+        self.model = load_pretrained(T5ForConditionalGeneration, 'Roasters/Question-Generator')
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model.to(self.device)
         self.set_seed(42)
@@ -169,22 +197,28 @@ class ParaphraseGenerator:
         sentence = text
         text_to_paraphrase = "paraphrase: " + sentence + " </s>"
 
-        encoding = self.tokenizer.encode_plus(text_to_paraphrase, pad_to_max_length=True, return_tensors="pt")
+        with stage("tokenize"):
+            encoding = encode(self.tokenizer, text_to_paraphrase)
         input_ids, attention_masks = encoding["input_ids"].to(self.device), encoding["attention_mask"].to(self.device)
 
-        beam_outputs = self.model.generate(
-            input_ids=input_ids,
-            attention_mask=attention_masks,
-            max_length=50,
-            num_beams=50,
-            num_return_sequences=num,
-            no_repeat_ngram_size=2,
-            early_stopping=True
-            )
+        observe_batch("paraphrase", 1)
+        with stage("generate"), operator_profile("paraphrase"):
+            beam_outputs = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_masks,
+                max_length=50,
+                num_beams=50,
+                num_return_sequences=num,
+                no_repeat_ngram_size=2,
+                early_stopping=True
+                )
+        count_tokens("paraphrase", attention_masks.sum().item(), beam_outputs.ne(self.tokenizer.pad_token_id).sum().item())
+
+        with stage("decode"):
+            decoded = self.tokenizer.batch_decode(beam_outputs, skip_special_tokens=True, clean_up_tokenization_spaces=True)
 
         final_outputs =[]
-        for beam_output in beam_outputs:
-            paraphrased_sentence = self.tokenizer.decode(beam_output, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+        for paraphrased_sentence in decoded:
             if paraphrased_sentence.lower() != sentence.lower() and paraphrased_sentence not in final_outputs:
                 final_outputs.append(paraphrased_sentence)
         
@@ -201,8 +235,8 @@ class ParaphraseGenerator:
 class BoolQGenerator:
        
     def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-base')
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Boolean-Questions')
+        self.tokenizer = load_tokenizer(T5TokenizerFast, 't5-base')
+        self.model = load_pretrained(T5ForConditionalGeneration, 'Roasters/Boolean-Questions')
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model.to(self.device)
         self.set_seed(42)
@@ -213,8 +247,8 @@ class BoolQGenerator:
         if torch.cuda.is_available():
             torch.cuda.manual_seed_all(seed)
 
-    def random_choice(self):
-        a = random.choice([0,1])
+    def random_choice(self, rng=random):
+        a = rng.choice([0,1])
         return bool(a)
     
 
@@ -227,15 +261,18 @@ class BoolQGenerator:
 
         text = inp['input_text']
         num= inp['max_questions']
-        sentences = tokenize_into_sentences(text)
+        document = payload.get("document")
+        sentences = document.sentences if document is not None else tokenize_into_sentences(text)
         modified_text = " ".join(sentences)
-        answer = self.random_choice()
+        answer = self.random_choice(make_rng(payload.get("seed"), "boolq"))
         form = "truefalse: %s passage: %s </s>" % (modified_text, answer)
         print(form)
-        encoding = self.tokenizer.encode_plus(form, return_tensors="pt")
+        with stage("tokenize"):
+            encoding = self.tokenizer.encode_plus(form, return_tensors="pt")
         input_ids, attention_masks = encoding["input_ids"].to(self.device), encoding["attention_mask"].to(self.device)
 
-        output = beam_search_decoding (input_ids, attention_masks, self.model, self.tokenizer,num)
+        observe_batch("boolq", 1)
+        output = beam_search_decoding (input_ids, attention_masks, self.model, self.tokenizer,num, model_name="boolq")
         if self.device.type == 'cuda':
             torch.cuda.empty_cache()
         
@@ -250,15 +287,15 @@ class BoolQGenerator:
 class AnswerPredictor:
           
     def __init__(self):
-        self.tokenizer = T5Tokenizer.from_pretrained('t5-large', model_max_length=512)
-        self.model = T5ForConditionalGeneration.from_pretrained('Roasters/Answer-Predictor')
+        self.tokenizer = load_tokenizer(T5TokenizerFast, 't5-large', model_max_length=512)
+        self.model = load_pretrained(T5ForConditionalGeneration, 'Roasters/Answer-Predictor')
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model.to(self.device)
         
         # Load the lightweight NLI model for boolean question answering
         self.nli_model_name = "typeform/distilbert-base-uncased-mnli"
-        self.nli_tokenizer = AutoTokenizer.from_pretrained(self.nli_model_name)
-        self.nli_model = AutoModelForSequenceClassification.from_pretrained(self.nli_model_name)
+        self.nli_tokenizer = load_tokenizer(AutoTokenizer, self.nli_model_name)
+        self.nli_model = load_pretrained(AutoModelForSequenceClassification, self.nli_model_name)
         
         self.set_seed(42)
         
@@ -279,16 +316,21 @@ class AnswerPredictor:
                 "input_text": payload.get("input_text"),
                 "input_question" : payload.get("input_question")
             }
-        for ques in payload.get("input_question"):
-                
-            context = inp["input_text"]
-            question = ques
-            input_text = "question: %s <s> context: %s </s>" % (question, context)
-
-            encoding = self.tokenizer.encode_plus(input_text, return_tensors="pt")
-            input_ids, attention_masks = encoding["input_ids"].to(self.device), encoding["attention_mask"].to(self.device)
-            greedy_output = self.model.generate(input_ids=input_ids, attention_mask=attention_masks, max_length=256)
-            Question = self.tokenizer.decode(greedy_output[0], skip_special_tokens=True, clean_up_tokenization_spaces=True)
+        context = inp["input_text"]
+        input_texts = ["question: %s <s> context: %s </s>" % (question, context) for question in inp["input_question"]]
+        # One call into the Rust tokenizer for every question; generation still runs one at a time
+        with stage("tokenize"):
+            encodings = self.tokenizer(input_texts)["input_ids"] if input_texts else []
+
+        for token_ids in encodings:
+            input_ids = torch.tensor([token_ids], device=self.device)
+            attention_masks = torch.ones_like(input_ids)
+            observe_batch("answer", 1)
+            with stage("generate"), operator_profile("answer"):
+                greedy_output = self.model.generate(input_ids=input_ids, attention_mask=attention_masks, max_length=256)
+            count_tokens("answer", attention_masks.sum().item(), greedy_output.ne(self.tokenizer.pad_token_id).sum().item())
+            with stage("decode"):
+                Question = self.tokenizer.decode(greedy_output[0], skip_special_tokens=True, clean_up_tokenization_spaces=True)
             answers.append(Question.strip().capitalize())
 
         if self.device.type == 'cuda':
@@ -302,10 +344,15 @@ class AnswerPredictor:
 
         answers = []
 
-        for question in input_questions:
-            hypothesis = question
-            inputs = self.nli_tokenizer.encode_plus(input_text, hypothesis, return_tensors="pt")
-            outputs = self.nli_model(**inputs)
+        with stage("tokenize"):
+            encodings = self.nli_tokenizer([input_text] * len(input_questions), list(input_questions)) if input_questions else {}
+
+        for i in range(len(input_questions)):
+            inputs = {key: torch.tensor([values[i]]) for key, values in encodings.items()}
+            observe_batch("nli", 1)
+            count_tokens("nli", inputs["attention_mask"].sum().item())
+            with stage("nli"):
+                outputs = self.nli_model(**inputs)
             logits = outputs.logits
             probabilities = torch.softmax(logits, dim=1)
             entailment_prob = probabilities[0][0].item()
@@ -323,6 +370,9 @@ class AnswerPredictor:
 
 class GoogleDocsService:
     def __init__(self, service_account_file, scopes):
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+
         self.credentials = service_account.Credentials.from_service_account_file(
             service_account_file, scopes=scopes)
         self.docs_service = build('docs', 'v1', credentials=self.credentials)
@@ -359,38 +409,136 @@ class GoogleDocsService:
     
 
 class FileProcessor:
-    def __init__(self, upload_folder='uploads/'):
+    """Extracts text from uploaded files entirely in memory.
+
+    Uploads are read from the request stream and never written to disk.
+    upload_folder is accepted for backwards compatibility and ignored.
+    Extracted text is cached by the SHA-256 of the uploaded bytes when a
+    cache is given. A PDF page range is extracted on its own; with a cache,
+    the whole document is then extracted and cached in the background, so
+    later ranges of the same file are served from the cache.
+    """
+
+    TEXT_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, upload_folder=None, pdf_extractor=None, cache=None):
         self.upload_folder = upload_folder
-        if not os.path.exists(self.upload_folder):
-            os.makedirs(self.upload_folder)
-
-    def extract_text_from_pdf(self, file_path):
-        doc = fitz.open(file_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        return text
-
-    def extract_text_from_docx(self, file_path):
-        with open(file_path, "rb") as docx_file:
-            result = mammoth.extract_raw_text(docx_file)
-            return result.value
-
-    def process_file(self, file):
-        file_path = os.path.join(self.upload_folder, file.filename)
-        file.save(file_path)
-        content = ""
-
-        if file.filename.endswith('.txt'):
-            with open(file_path, 'r') as f:
-                content = f.read()
-        elif file.filename.endswith('.pdf'):
-            content = self.extract_text_from_pdf(file_path)
-        elif file.filename.endswith('.docx'):
-            content = self.extract_text_from_docx(file_path)
-
-        os.remove(file_path)
-        return content
+        self.pdf_extractor = pdf_extractor or PDFExtractor()
+        self.cache = cache
+        self._filling = set()
+        self._filling_lock = threading.Lock()
+
+    def iter_pdf_pages(self, source, page_range=None):
+        """Yields the text of each page of a PDF given as bytes, a file object or a path.
+        Long documents are extracted page-range-parallel by the PDFExtractor.
+        """
+        if isinstance(source, str):
+            with open(source, "rb") as pdf_file:
+                source = pdf_file.read()
+        elif not isinstance(source, (bytes, bytearray, memoryview)):
+            source = source.read()
+        yield from self.pdf_extractor.iter_pages(source, page_range)
+
+    def extract_text_from_pdf(self, source, page_range=None):
+        return "".join(self.iter_pdf_pages(source, page_range))
+
+    def extract_text_from_docx(self, source):
+        import mammoth
+
+        if isinstance(source, str):
+            with open(source, "rb") as docx_file:
+                return mammoth.extract_raw_text(docx_file).value
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        return mammoth.extract_raw_text(source).value
+
+    def iter_text_chunks(self, stream):
+        """Decodes a UTF-8 byte stream incrementally."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = stream.read(self.TEXT_CHUNK_SIZE)
+            if not chunk:
+                break
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def _iter_text(self, filename, stream, page_range=None):
+        filename = filename.lower()
+        if filename.endswith('.txt'):
+            yield from self.iter_text_chunks(stream)
+        elif filename.endswith('.pdf'):
+            yield from self.iter_pdf_pages(stream.read(), page_range)
+        elif filename.endswith('.docx'):
+            yield self.extract_text_from_docx(stream)
+
+    def process_upload(self, file, page_range=None):
+        """Returns (document_id, text) for an uploaded file. document_id is the SHA-256 of
+        the uploaded bytes, followed by the page range for a PDF page range (see
+        page_range_id); a cache hit skips extraction entirely.
+        """
+        data = getattr(file, "stream", file).read()
+        document_id = content_hash(data)
+        ranged = file.filename.lower().endswith('.pdf') and page_range is not None
+
+        document = self.cache.get(document_id) if self.cache else None
+        if document is None and ranged:
+            # Extract only the requested pages now; the full document is cached afterwards
+            with stage("file_extraction"):
+                text = "".join(self._iter_text(file.filename, io.BytesIO(data), page_range))
+            if self.cache:
+                self._fill_cache_later(document_id, file.filename, data)
+            return page_range_id(document_id, page_range), text
+
+        if document is None:
+            with stage("file_extraction"):
+                pages = list(self._iter_text(file.filename, io.BytesIO(data)))
+            document = ExtractedDocument.from_pages(pages)
+            if self.cache:
+                self.cache.put(document_id, document)
+
+        if ranged:
+            return page_range_id(document_id, page_range), document.page_text(page_range)
+        return document_id, document.text
+
+    def _fill_cache_later(self, document_id, filename, data):
+        """Extracts and caches the whole document on a background thread, once per document."""
+        with self._filling_lock:
+            if document_id in self._filling:
+                return
+            self._filling.add(document_id)
+
+        def fill():
+            try:
+                pages = list(self._iter_text(filename, io.BytesIO(data)))
+                self.cache.put(document_id, ExtractedDocument.from_pages(pages))
+            except Exception as e:
+                logger.warning(f"Background extraction of {document_id} failed: {e}")
+            finally:
+                with self._filling_lock:
+                    self._filling.discard(document_id)
+
+        threading.Thread(target=fill, name="upload-cache-fill", daemon=True).start()
+
+    def cached_text(self, document_id):
+        """Returns the text of a previously uploaded document (or page range), or None if it is
+        not cached.
+        """
+        if not self.cache:
+            return None
+        key, _, pages = document_id.partition(":")
+        try:
+            page_range = parse_page_range(pages)
+        except ValueError:
+            return None
+        document = self.cache.get(key)
+        return document.page_text(page_range) if document else None
+
+    def process_file(self, file, page_range=None):
+        return self.process_upload(file, page_range)[1]
 
 class QuestionGenerator:
     """A transformer-based NLP system for generating reading comprehension-style questions from
@@ -411,12 +559,13 @@ class QuestionGenerator:
 
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-        self.qg_tokenizer = AutoTokenizer.from_pretrained(QG_PRETRAINED, use_fast=False)
-        self.qg_model = AutoModelForSeq2SeqLM.from_pretrained(QG_PRETRAINED)
+        self.qg_tokenizer = load_tokenizer(AutoTokenizer, QG_PRETRAINED, use_fast=True)
+        self.qg_model = load_pretrained(AutoModelForSeq2SeqLM, QG_PRETRAINED)
         self.qg_model.to(self.device)
         self.qg_model.eval()
 
         self.qa_evaluator = QAEvaluator()
+        self._ner_nlp = None
 
     def generate(
         self,
@@ -424,15 +573,19 @@ class QuestionGenerator:
         use_evaluator: bool = False,
         num_questions: bool = None,
         answer_style: str = "all",
+        document: Any = None,
+        seed: int = None,
     ) -> List:
         """Takes an article and generates a set of question and answer pairs. If use_evaluator
         is True then QA pairs will be ranked and filtered based on their quality. answer_style
-        should selected from ["all", "sentences", "multiple_choice"].
+        should selected from ["all", "sentences", "multiple_choice"]. If document is a registered
+        Document for the article, its cached segments and NER parses are reused. seed makes the
+        choice of multiple-choice distractors reproducible.
         """
 
         print("Generating questions...\n")
 
-        qg_inputs, qg_answers = self.generate_qg_inputs(article, answer_style)
+        qg_inputs, qg_answers = self.generate_qg_inputs(article, answer_style, document, seed)
         generated_questions = self.generate_questions_from_inputs(qg_inputs)
 
         message = "{} questions doesn't match {} answers".format(
@@ -466,7 +619,7 @@ class QuestionGenerator:
         return qa_list
 
     def generate_qg_inputs(
-        self, text: str, answer_style: str
+        self, text: str, answer_style: str, document: Any = None, seed: int = None
     ) -> Tuple[List[str], List[str]]:
         """Given a text, returns a list of model inputs and a list of corresponding answers.
         Model inputs take the form "answer_token <answer text> context_token <context text>" where
@@ -487,10 +640,12 @@ class QuestionGenerator:
         answers = []
 
         if answer_style == "sentences" or answer_style == "all":
-            segments = self._split_into_segments(text)
+            segments = self._artifact(
+                document, "qg_segments",
+                lambda: [(segment, self._split_text(segment)) for segment in self._split_into_segments(text)]
+            )
 
-            for segment in segments:
-                sentences = self._split_text(segment)
+            for segment, sentences in segments:
                 prepped_inputs, prepped_answers = self._prepare_qg_inputs(
                     sentences, segment
                 )
@@ -498,13 +653,31 @@ class QuestionGenerator:
                 answers.extend(prepped_answers)
 
         if answer_style == "multiple_choice" or answer_style == "all":
-            sentences = self._split_text(text)
-            prepped_inputs, prepped_answers = self._prepare_qg_inputs_MC(sentences)
+            sentences = self._artifact(document, "qg_sentences", lambda: self._split_text(text))
+            docs = self._artifact(document, "qg_entity_docs", lambda: self._parse_entities(sentences))
+            prepped_inputs, prepped_answers = self._prepare_qg_inputs_MC(
+                sentences, docs, make_rng(seed, "mc_answers")
+            )
             inputs.extend(prepped_inputs)
             answers.extend(prepped_answers)
 
         return inputs, answers
 
+    @staticmethod
+    def _artifact(document: Any, name: str, factory):
+        """Memoizes a preprocessing step on a registered document, if one was given."""
+        if document is None:
+            return factory()
+        return document.artifact(name, factory)
+
+    @stage("spacy")
+    def _parse_entities(self, sentences: List[str]) -> List[Any]:
+        """Runs NER over sentences with a lazily loaded spaCy pipeline."""
+        if self._ner_nlp is None:
+            import en_core_web_sm
+            self._ner_nlp = en_core_web_sm.load()
+        return list(self._ner_nlp.pipe(sentences, disable=["parser"]))
+
     def generate_questions_from_inputs(self, qg_inputs: List) -> List[str]:
         """Given a list of concatenated answers and contexts, with the form:
         "answer_token <answer text> context_token <context text>", generates a list of
@@ -518,6 +691,7 @@ class QuestionGenerator:
 
         return generated_questions
 
+    @stage("sentence_split")
     def _split_text(self, text: str) -> List[str]:
         """Splits the text into sentences, and attempts to split or truncate long sentences."""
         MAX_SENTENCE_LEN = 128
@@ -534,26 +708,12 @@ class QuestionGenerator:
 
         return list(set([s.strip(" ") for s in sentences]))
 
+    @stage("tokenize")
     def _split_into_segments(self, text: str) -> List[str]:
         """Splits a long text into segments short enough to be input into the transformer network.
         Segments are used as context for question generation.
         """
-        MAX_TOKENS = 490
-        paragraphs = text.split("\n")
-        tokenized_paragraphs = [
-            self.qg_tokenizer(p)["input_ids"] for p in paragraphs if len(p) > 0
-        ]
-        segments = []
-
-        while len(tokenized_paragraphs) > 0:
-            segment = []
-
-            while len(segment) < MAX_TOKENS and len(tokenized_paragraphs) > 0:
-                paragraph = tokenized_paragraphs.pop(0)
-                segment.extend(paragraph)
-            segments.append(segment)
-
-        return [self.qg_tokenizer.decode(s, skip_special_tokens=True) for s in segments]
+        return split_into_segments(text, self.qg_tokenizer)
 
     def _prepare_qg_inputs(
         self, sentences: List[str], text: str
@@ -572,14 +732,16 @@ class QuestionGenerator:
         return inputs, answers
 
     def _prepare_qg_inputs_MC(
-        self, sentences: List[str]
+        self, sentences: List[str], docs: List[Any] = None, rng: Any = random
     ) -> Tuple[List[str], List[str]]:
         """Performs NER on the text, and uses extracted entities are candidate answers for multiple-choice
         questions. Sentences are used as context, and entities as answers. Returns a tuple of (model inputs, answers).
         Model inputs are "answer_token <answer text> context_token <context text>"
         """
-        spacy_nlp = en_core_web_sm.load()
-        docs = list(spacy_nlp.pipe(sentences, disable=["parser"]))
+        if docs is None:
+            docs = self._parse_entities(sentences)
+        # Built once for the whole text rather than once per entity
+        pool = EntityPool(docs)
         inputs_from_text = []
         answers_from_text = []
 
@@ -591,55 +753,31 @@ class QuestionGenerator:
                     qg_input = (
                         f"{self.ANSWER_TOKEN} {entity} {self.CONTEXT_TOKEN} {sentence}"
                     )
-                    answers = self._get_MC_answers(entity, docs)
+                    answers = self._get_MC_answers(entity, pool, rng)
                     inputs_from_text.append(qg_input)
                     answers_from_text.append(answers)
 
         return inputs_from_text, answers_from_text
 
     def _get_MC_answers(
-        self, correct_answer: Any, docs: Any
+        self, correct_answer: Any, pool: Any, rng: Any = random
     ) -> List[Mapping[str, Any]]:
         """Finds a set of alternative answers for a multiple-choice question. Will attempt to find
-        alternatives of the same entity type as correct_answer if possible.
+        alternatives of the same entity type as correct_answer if possible. pool is an EntityPool
+        (or the list of docs to build one from).
         """
-        entities = []
-
-        for doc in docs:
-            entities.extend([{"text": e.text, "label_": e.label_} for e in doc.ents])
+        if not isinstance(pool, EntityPool):
+            pool = EntityPool(pool)
 
-        # remove duplicate elements
-        entities_json = [json.dumps(kv) for kv in entities]
-        pool = set(entities_json)
         num_choices = (
             min(4, len(pool)) - 1
         )  # -1 because we already have the correct answer
 
-        # add the correct answer
-        final_choices = []
-        correct_label = correct_answer.label_
-        final_choices.append({"answer": correct_answer.text, "correct": True})
-        pool.remove(
-            json.dumps({"text": correct_answer.text, "label_": correct_answer.label_})
-        )
+        final_choices = [{"answer": correct_answer.text, "correct": True}]
+        for text in pool.distractors(correct_answer.text, correct_answer.label_, num_choices, rng):
+            final_choices.append({"answer": text, "correct": False})
 
-        # find answers with the same NER label
-        matches = [e for e in pool if correct_label in e]
-
-        # if we don't have enough then add some other random answers
-        if len(matches) < num_choices:
-            choices = matches
-            pool = pool.difference(set(choices))
-            choices.extend(random.sample(list(pool), num_choices - len(choices)))
-        else:
-            choices = random.sample(matches, num_choices)
-
-        choices = [json.loads(s) for s in choices]
-
-        for choice in choices:
-            final_choices.append({"answer": choice["text"], "correct": False})
-
-        random.shuffle(final_choices)
+        rng.shuffle(final_choices)
         return final_choices
 
     @torch.no_grad()
@@ -648,10 +786,15 @@ class QuestionGenerator:
         a question sentence. The generated question is decoded and then returned.
         """
         encoded_input = self._encode_qg_input(qg_input)
-        output = self.qg_model.generate(input_ids=encoded_input["input_ids"])
-        question = self.qg_tokenizer.decode(output[0], skip_special_tokens=True)
+        observe_batch("qg", 1)
+        with stage("generate"), operator_profile("qg"):
+            output = self.qg_model.generate(input_ids=encoded_input["input_ids"])
+        count_tokens("qg", encoded_input["attention_mask"].sum().item(), output.ne(self.qg_tokenizer.pad_token_id).sum().item())
+        with stage("decode"):
+            question = self.qg_tokenizer.decode(output[0], skip_special_tokens=True)
         return question
 
+    @stage("tokenize")
     def _encode_qg_input(self, qg_input: str) -> torch.tensor:
         """Tokenizes a string and returns a tensor of input ids corresponding to indices of tokens in
         the vocab.
@@ -717,13 +860,12 @@ class QAEvaluator:
 
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-        self.qae_tokenizer = AutoTokenizer.from_pretrained(QAE_PRETRAINED)
-        self.qae_model = AutoModelForSequenceClassification.from_pretrained(
-            QAE_PRETRAINED
-        )
+        self.qae_tokenizer = load_tokenizer(AutoTokenizer, QAE_PRETRAINED)
+        self.qae_model = load_pretrained(AutoModelForSequenceClassification, QAE_PRETRAINED)
         self.qae_model.to(self.device)
         self.qae_model.eval()
 
+    @stage("tokenize")
     def encode_qa_pairs(
         self, questions: List[str], answers: List[str]
     ) -> List[torch.tensor]:
@@ -736,6 +878,7 @@ class QAEvaluator:
 
         return encoded_pairs
 
+    @stage("qae")
     def get_scores(self, encoded_qa_pairs: List[torch.tensor]) -> List[float]:
         """Generates scores for a list of encoded QA pairs."""
         scores = {}
@@ -773,6 +916,8 @@ class QAEvaluator:
     @torch.no_grad()
     def _evaluate_qa(self, encoded_qa_pair: torch.tensor) -> float:
         """Takes an encoded QA pair and returns a score."""
+        observe_batch("qae", 1)
+        count_tokens("qae", encoded_qa_pair["attention_mask"].sum().item())
         output = self.qae_model(**encoded_qa_pair)
         return output[0][0][1]
 
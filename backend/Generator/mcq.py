@@ -1,17 +1,18 @@
 import string
 import nltk
-import torch
 from nltk.tokenize import sent_tokenize
-from flashtext import KeywordProcessor
 from nltk.corpus import stopwords
-from sense2vec import Sense2Vec
 from similarity.normalized_levenshtein import NormalizedLevenshtein
 import spacy
 from Generator.nltk_utils import safe_nltk_download
+from Generator.sentence_index import SentenceIndex
+from Generator.metrics import stage
+from Generator.encoding import generate_batched
 
 safe_nltk_download('corpora/brown')
 safe_nltk_download('corpora/stopwords')
 
+@stage("s2v")
 def is_word_available(word, s2v_model):
     word = word.replace(" ", "_")
     sense = s2v_model.get_best_sense(word)
@@ -29,6 +30,7 @@ def generate_word_variations(word):
     inserts = [L + c + R for L, R in splits for c in letters]
     return set(deletes + transposes + replaces + inserts)
 
+@stage("s2v")
 def find_similar_words(word, s2v_model):
     output = []
     word_preprocessed = word.translate(word.maketrans("", "", string.punctuation))
@@ -83,34 +85,21 @@ def get_answer_choices(answer, s2v_model):
 
     return choices, source
 
+@stage("sentence_split")
 def tokenize_into_sentences(text):
     sentences = [sent_tokenize(text)]
     sentences = [y for x in sentences for y in x]
     sentences = [sentence.strip() for sentence in sentences if len(sentence) > 20]
     return sentences
 
-def find_sentences_with_keywords(keywords, sentences):
-    keyword_processor = KeywordProcessor()
-    keyword_sentences = {}
-    for word in keywords:
-        word = word.strip()
-        keyword_sentences[word] = []
-        keyword_processor.add_keyword(word)
-    for sentence in sentences:
-        keywords_found = keyword_processor.extract_keywords(sentence)
-        for key in keywords_found:
-            keyword_sentences[key].append(sentence)
-
-    for key in keyword_sentences.keys():
-        values = keyword_sentences[key]
-        values = sorted(values, key=len, reverse=True)
-        keyword_sentences[key] = values
-
-    delete_keys = [k for k, v in keyword_sentences.items() if len(v) == 0]
-    for del_key in delete_keys:
-        del keyword_sentences[del_key]
-
-    return keyword_sentences
+def find_sentences_with_keywords(keywords, sentences, sentence_index=None):
+    """Map each keyword to the sentences that mention it, longest first.
+
+    Pass a prebuilt SentenceIndex to reuse it across generators and requests.
+    """
+    if sentence_index is None:
+        sentence_index = SentenceIndex(sentences)
+    return sentence_index.keyword_sentences(keywords)
 
 def are_words_distant(words_list, current_word, threshold, normalized_levenshtein):
     score_list = [normalized_levenshtein.distance(word.lower(), current_word.lower()) for word in words_list]
@@ -136,12 +125,13 @@ def _get_spacy_nlp():
         _spacy_nlp = spacy.load('en_core_web_sm')
     return _spacy_nlp
 
-def extract_noun_phrases(text):
-    """Extract noun phrases using spaCy instead of pke"""
+def extract_noun_phrases(text, doc=None):
+    """Extract noun phrases using spaCy instead of pke. Reuses doc when it is already parsed."""
     out = []
     try:
-        nlp = _get_spacy_nlp()
-        doc = nlp(text)
+        if doc is None:
+            with stage("spacy"):
+                doc = _get_spacy_nlp()(text)
         # Extract noun phrases (multi-word nouns and proper nouns)
         for chunk in doc.noun_chunks:
             phrase = chunk.text.lower().strip()
@@ -169,11 +159,14 @@ def extract_phrases_from_doc(doc):
     phrase_keys = phrase_keys[:50]
     return phrase_keys
 
-def identify_keywords(nlp_model, text, max_keywords, s2v_model, fdist, normalized_levenshtein, num_sentences):
-    doc = nlp_model(text)
+@stage("keywords")
+def identify_keywords(nlp_model, text, max_keywords, s2v_model, fdist, normalized_levenshtein, num_sentences, doc=None):
+    if doc is None:
+        with stage("spacy"):
+            doc = nlp_model(text)
     max_keywords = int(max_keywords)
 
-    keywords = extract_noun_phrases(text)
+    keywords = extract_noun_phrases(text, doc)
     keywords = sorted(keywords, key=lambda x: fdist[x])
     keywords = filter_useful_phrases(keywords, max_keywords, normalized_levenshtein)
 
@@ -201,20 +194,12 @@ def generate_multiple_choice_questions(keyword_sent_mapping, device, tokenizer,
         text = context + " " + "answer: " + answer + " </s>"
         batch_text.append(text)
 
-    encoding = tokenizer.batch_encode_plus(batch_text, pad_to_max_length=True, return_tensors="pt")
-
     print("Generating questions using the model...")
-    input_ids, attention_masks = encoding["input_ids"].to(device), encoding["attention_mask"].to(device)
-
-    with torch.no_grad():
-        outputs = model.generate(input_ids=input_ids,
-                                 attention_mask=attention_masks,
-                                 max_length=150)
+    decoded_questions = generate_batched(batch_text, model, tokenizer, device, "mcq", max_length=150)
 
     generated_questions = []
     for index, answer in enumerate(answers):
-        out = outputs[index, :]
-        decoded_question = tokenizer.decode(out, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+        decoded_question = decoded_questions[index]
 
         question_statement = decoded_question.replace("question:", "").strip()
         options, options_algorithm = get_answer_choices(answer, sense2vec_model)
@@ -252,22 +237,14 @@ def generate_normal_questions(keyword_sent_mapping, device, tokenizer, model):
         text = context + " " + "answer: " + answer + " </s>"
         batch_text.append(text)
 
-    encoding = tokenizer.batch_encode_plus(batch_text, pad_to_max_length=True, return_tensors="pt")
-
     print("Running model for generation...")
-    input_ids, attention_masks = encoding["input_ids"].to(device), encoding["attention_mask"].to(device)
-
-    with torch.no_grad():
-        outs = model.generate(input_ids=input_ids,
-                              attention_mask=attention_masks,
-                              max_length=150)
+    decoded = generate_batched(batch_text, model, tokenizer, device, "shortq", max_length=150)
 
     output_array = {"questions": []}
 
     for index, val in enumerate(answers):
         individual_quest = {}
-        out = outs[index, :]
-        dec = tokenizer.decode(out, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+        dec = decoded[index]
         
         Question = dec.replace('question:', '')
         Question = Question.strip()
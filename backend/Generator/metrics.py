@@ -0,0 +1,240 @@
+"""Lightweight per-stage latency metrics with a Prometheus text exporter.
+
+Pipeline stages are timed with stage("name"), which can be used as a
+context manager or a decorator. Durations go into a histogram labelled by
+stage and, while a request is being traced with begin_request(), they also
+add up per request so the server can emit a Server-Timing header. Metrics
+live in process memory, so each worker process reports only its own
+metrics.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import ContextDecorator
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        key = tuple(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(tuple(label_values), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        key = tuple(label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values):
+        with self._lock:
+            series = self._series.get(tuple(label_values))
+            return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Gauge:
+    """Value read from a callback at export time, e.g. a pool size or an external counter."""
+
+    def __init__(self, name, documentation, callback, kind="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self):
+        yield f"{self.name} {_format_value(self.callback())}"
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            # Re-registering a name (e.g. on module reload) replaces the old metric
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name, documentation, callback, kind="gauge"):
+        return self.register(Gauge(name, documentation, callback, kind))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "eduaid_stage_seconds", "Time spent in each pipeline stage.", ("stage",))
+STAGE_ERRORS = REGISTRY.counter(
+    "eduaid_stage_errors_total", "Pipeline stages that raised an exception.", ("stage",))
+TOKENS = REGISTRY.counter(
+    "eduaid_tokens_total", "Tokens fed to (in) and produced by (out) each model.", ("model", "direction"))
+BATCH_SIZE = REGISTRY.histogram(
+    "eduaid_batch_size", "Number of sequences per model call.", ("model",), SIZE_BUCKETS)
+QUEUE_WAIT = REGISTRY.histogram(
+    "eduaid_queue_wait_seconds", "Time work spent waiting before it started running.", ("queue",))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "eduaid_request_seconds", "HTTP request latency per endpoint.", ("endpoint",))
+REQUESTS = REGISTRY.counter(
+    "eduaid_requests_total", "HTTP requests per endpoint and status code.", ("endpoint", "status"))
+
+
+class stage(ContextDecorator):
+    """Times a block or function as a pipeline stage: `with stage("spacy"):` or `@stage("spacy")`."""
+
+    def __init__(self, name):
+        self.name = name
+        self._starts = threading.local()
+
+    def __enter__(self):
+        starts = getattr(self._starts, "stack", None)
+        if starts is None:
+            starts = self._starts.stack = []
+        # A stack keeps shared decorator instances correct under recursion
+        starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._starts.stack.pop()
+        record_stage(self.name, elapsed)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(1, self.name)
+        return False
+
+
+def record_stage(name, seconds):
+    """Records a stage duration measured elsewhere, e.g. in an inference worker."""
+    STAGE_SECONDS.observe(seconds, name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def count_tokens(model, tokens_in=0, tokens_out=0):
+    """Adds to the token counters of model."""
+    if tokens_in:
+        TOKENS.inc(int(tokens_in), model, "in")
+    if tokens_out:
+        TOKENS.inc(int(tokens_out), model, "out")
+
+
+def observe_batch(model, size):
+    BATCH_SIZE.observe(size, model)
+
+
+def observe_queue_wait(queue, seconds):
+    QUEUE_WAIT.observe(seconds, queue)
+
+
+def begin_request():
+    """Starts collecting stage timings for the current request; returns a token for end_request."""
+    return _request_timings.set({})
+
+
+def end_request(token):
+    """Stops collecting and returns the {stage: seconds} timings of the request."""
+    timings = _request_timings.get() or {}
+    _request_timings.reset(token)
+    return timings
+
+
+def server_timing_header(timings, total=None):
+    """Formats stage timings as a Server-Timing header value (durations in milliseconds)."""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
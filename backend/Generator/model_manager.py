@@ -0,0 +1,317 @@
+"""On-demand model loading with idle and memory-budget eviction.
+
+Each model family is built on first use by its loader. Families listed in
+the warm set are built at startup instead. A background reaper unloads
+families that have been idle for longer than the TTL, and loading a family
+that would exceed the memory budget first evicts the least recently used
+idle ones. Warm families are only evicted for the budget, never for
+idleness. Calls go through LazyModel proxies, so a family is never unloaded
+while a call is using it.
+
+Each load is followed by a warmup pass (see Generator/warmup.py). A
+preforked master must not run inference, so it skips warmup and each
+worker calls warm_up_loaded() after forking instead. The reaper thread is
+likewise per process: threads do not survive fork, so each worker starts
+its own on first use, and a preforked master never runs one, which keeps
+the copies the workers share from being unloaded under them.
+"""
+import gc
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from Generator.serving import PREFORK, freeze_models, model_bytes
+from Generator.startup import record_model
+from Generator.warmup import WARMUP, warm_up
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated families to load at startup, or "all"
+MODEL_WARM = os.environ.get("MODEL_WARM", "")
+# Seconds a family may sit unused before it is unloaded (0 disables)
+MODEL_IDLE_TTL = int(os.environ.get("MODEL_IDLE_TTL", 1800))
+# Total memory for loaded families in MB (0 means unlimited)
+MODEL_MEMORY_BUDGET_MB = int(os.environ.get("MODEL_MEMORY_BUDGET_MB", 0))
+# After a failed load, report the family as unavailable for this long before retrying
+MODEL_RETRY_SECONDS = int(os.environ.get("MODEL_RETRY_SECONDS", 300))
+
+
+class ModelUnavailable(RuntimeError):
+    """A model family could not be loaded."""
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Family:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.obj = None
+        self.state = "unloaded"
+        self.bytes = 0
+        self.in_use = 0
+        self.last_used = None
+        self.loads = 0
+        self.load_seconds = None
+        self.error = None
+        self.failed_at = None
+        # Per process: a forked worker starts cold even if its master warmed up
+        self.warmed_pid = None
+        self.warmup_seconds = None
+        self.warmup_error = None
+
+
+class ModelManager:
+    """Loads model families lazily and unloads them when idle or over budget."""
+
+    def __init__(self, loaders, warm=MODEL_WARM, idle_ttl=MODEL_IDLE_TTL,
+                 memory_budget_mb=MODEL_MEMORY_BUDGET_MB, retry_seconds=MODEL_RETRY_SECONDS, warmup=WARMUP):
+        self._families = {name: _Family(name, loader) for name, loader in loaders.items()}
+        if isinstance(warm, str):
+            warm = list(self._families) if warm.strip() == "all" else [w.strip() for w in warm.split(",") if w.strip()]
+        unknown = set(warm) - set(self._families)
+        if unknown:
+            raise ValueError(f"Unknown model families in warm set: {sorted(unknown)}")
+        self.warm = list(warm)
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.retry_seconds = retry_seconds
+        self.warmup = warmup
+        self._master_pid = os.getpid() if PREFORK else None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # Loads are serialized so RSS growth can be attributed to one family
+        self._load_lock = threading.Lock()
+        self._reaper_pid = None
+        self._reaper_lock = threading.Lock()
+
+    def start(self):
+        """Loads the warm set and starts the idle reaper; returns self."""
+        for name in self.warm:
+            try:
+                self._ensure_loaded(name)
+            except ModelUnavailable as e:
+                logger.error(str(e))
+        self._ensure_reaper()
+        return self
+
+    def _ensure_reaper(self):
+        """Starts the idle reaper of this process unless it runs or this is the preforked master."""
+        pid = os.getpid()
+        if self.idle_ttl <= 0 or self._reaper_pid == pid or pid == self._master_pid:
+            return
+        with self._reaper_lock:
+            if self._reaper_pid != pid:
+                threading.Thread(target=self._reap_forever, name="model-reaper", daemon=True).start()
+                self._reaper_pid = pid
+
+    def available(self, name):
+        """False while a recent load of name has failed; True otherwise, loaded or not."""
+        family = self._families[name]
+        with self._lock:
+            return not (family.state == "failed" and time.monotonic() - family.failed_at < self.retry_seconds)
+
+    @contextmanager
+    def use(self, name):
+        """Yields the loaded object for name, keeping it loaded until the block exits."""
+        family = self._families[name]
+        self._ensure_reaper()
+        self._ensure_loaded(name, hold=True)
+        try:
+            yield family.obj
+        finally:
+            with self._lock:
+                family.in_use -= 1
+                family.last_used = time.monotonic()
+                self._idle.notify_all()
+
+    def _ensure_loaded(self, name, hold=False):
+        family = self._families[name]
+        with self._lock:
+            if family.state == "loaded":
+                if hold:
+                    family.in_use += 1
+                return
+        with self._load_lock:
+            with self._lock:
+                if family.state == "loaded":
+                    if hold:
+                        family.in_use += 1
+                    return
+                if family.state == "failed" and time.monotonic() - family.failed_at < self.retry_seconds:
+                    raise ModelUnavailable(f"{name} failed to load: {family.error}")
+                family.state = "loading"
+
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            try:
+                obj = family.loader()
+                freeze_models(obj)
+            except Exception as e:
+                with self._lock:
+                    family.state = "failed"
+                    family.error = str(e)
+                    family.failed_at = time.monotonic()
+                raise ModelUnavailable(f"{name} failed to load: {e}") from e
+            elapsed = time.perf_counter() - start
+            rss_after = _rss_bytes()
+            record_model(name, elapsed)
+
+            size = model_bytes(obj)
+            if rss_before is not None and rss_after is not None:
+                # RSS also counts non-torch state such as sense2vec vectors and spaCy
+                size = max(size, rss_after - rss_before)
+
+            with self._lock:
+                family.obj = obj
+                family.state = "loaded"
+                family.bytes = size
+                family.loads += 1
+                family.load_seconds = elapsed
+                family.error = None
+                family.last_used = time.monotonic()
+                if hold:
+                    family.in_use += 1
+            logger.info(f"Loaded {name} in {elapsed:.1f}s (~{size / 2 ** 20:.0f} MB)")
+            if self.warmup and os.getpid() != self._master_pid:
+                self._warm_up(family)
+            self._enforce_budget(keep=name)
+
+    def _warm_up(self, family):
+        start = time.perf_counter()
+        try:
+            timings = warm_up(family.obj)
+            error = None
+        except Exception as e:
+            # A failed warmup only costs latency, so the family still serves
+            logger.warning(f"Warmup of {family.name} failed: {e}")
+            timings, error = {}, str(e)
+        with self._lock:
+            family.warmed_pid = os.getpid()
+            family.warmup_seconds = time.perf_counter() - start
+            family.warmup_error = error
+        logger.info(f"Warmed up {family.name} in {family.warmup_seconds:.1f}s "
+                    f"({', '.join(f'{k} {v:.1f}s' for k, v in timings.items()) or 'no models'})")
+
+    def warm_up_loaded(self):
+        """Warms every loaded family not yet warmed in this process (and starts its reaper)."""
+        self._ensure_reaper()
+        with self._load_lock:
+            for family in self._families.values():
+                if family.state == "loaded" and family.warmed_pid != os.getpid():
+                    self._warm_up(family)
+
+    def _ready(self, family):
+        return family.state == "loaded" and (not self.warmup or family.warmed_pid == os.getpid())
+
+    def ready(self):
+        """True once every warm family is loaded and, with warmup on, warmed in this process."""
+        with self._lock:
+            return all(self._ready(self._families[name]) for name in self.warm)
+
+    def _enforce_budget(self, keep):
+        if not self.memory_budget:
+            return
+        while True:
+            with self._lock:
+                loaded = [f for f in self._families.values() if f.state == "loaded"]
+                if sum(f.bytes for f in loaded) <= self.memory_budget:
+                    return
+                candidates = [f for f in loaded if f.name != keep and f.in_use == 0]
+                if not candidates:
+                    logger.warning("Model memory budget exceeded, but every other loaded model is in use")
+                    return
+                # Cold families go first, then least recently used
+                victim = min(candidates, key=lambda f: (f.name in self.warm, f.last_used or 0))
+                self._unload_locked(victim, "memory budget")
+
+    def _unload_locked(self, family, reason):
+        family.obj = None
+        family.state = "unloaded"
+        freed = family.bytes
+        family.bytes = 0
+        family.warmed_pid = None
+        logger.info(f"Unloaded {family.name} ({reason}, ~{freed / 2 ** 20:.0f} MB)")
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def evict_idle(self, now=None):
+        """Unloads non-warm families idle for longer than the TTL; returns their names."""
+        now = time.monotonic() if now is None else now
+        evicted = []
+        with self._lock:
+            for family in self._families.values():
+                if (family.state == "loaded" and family.in_use == 0 and family.name not in self.warm
+                        and family.last_used is not None and now - family.last_used > self.idle_ttl):
+                    self._unload_locked(family, "idle")
+                    evicted.append(family.name)
+        return evicted
+
+    def _reap_forever(self):
+        interval = max(1, min(60, self.idle_ttl // 2))
+        while True:
+            time.sleep(interval)
+            self.evict_idle()
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                family.name: {
+                    "state": family.state,
+                    "warm": family.name in self.warm,
+                    "in_use": family.in_use,
+                    "memory_mb": round(family.bytes / 2 ** 20, 1),
+                    "idle_seconds": round(now - family.last_used, 1) if family.last_used and family.state == "loaded" else None,
+                    "loads": family.loads,
+                    "load_seconds": round(family.load_seconds, 2) if family.load_seconds is not None else None,
+                    "error": family.error,
+                    "ready": self._ready(family),
+                    "warmup_seconds": round(family.warmup_seconds, 2) if family.warmup_seconds is not None else None,
+                    "warmup_error": family.warmup_error,
+                }
+                for family in self._families.values()
+            }
+
+    def proxy(self, name):
+        return LazyModel(self, name)
+
+
+class LazyModel:
+    """Stands in for a generator (or pipeline), loading it on first call."""
+
+    def __init__(self, manager, name):
+        self._manager = manager
+        self._name = name
+
+    def __bool__(self):
+        return self._manager.available(self._name)
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            with self._manager.use(self._name) as obj:
+                return getattr(obj, method)(*args, **kwargs)
+        return call
+
+    def __call__(self, *args, **kwargs):
+        with self._manager.use(self._name) as obj:
+            return obj(*args, **kwargs)
+
+    def __repr__(self):
+        return f"LazyModel({self._name!r})"
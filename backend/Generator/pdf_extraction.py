@@ -0,0 +1,250 @@
+"""Page-range-parallel PDF text extraction.
+
+Large PDFs are split into contiguous page ranges that are extracted on a
+pool of worker processes. The document bytes are shared with the workers
+through a shared memory block, each worker opens its own fitz handle, and
+the page texts are reassembled in order.
+
+Workers are fresh interpreters started as `python -m Generator.pdf_extraction`
+rather than multiprocessing children: spawn and forkserver children re-import
+the launching script, which for `python server.py` would re-run the server's
+model loading and worker startup in every PDF worker.
+"""
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from multiprocessing import shared_memory
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Worker processes per server process; gunicorn.conf.py divides the cores between its workers
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+# Documents with fewer pages than this are extracted in-process
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 32))
+
+
+def parse_page_range(value):
+    """Parses a 1-based inclusive page range such as "5", "3-10", "3-" or "-10".
+
+    Returns (first, last) with None for an open end, or None if value is empty.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+
+    first, sep, last = value.partition("-")
+    try:
+        first = int(first) if first.strip() else None
+        last = int(last) if last.strip() else None
+    except ValueError:
+        raise ValueError(f"Invalid page range: {value!r}")
+    if not sep:
+        last = first
+    if (first is not None and first < 1) or (last is not None and last < 1):
+        raise ValueError("Page numbers start at 1")
+    if first is not None and last is not None and first > last:
+        raise ValueError(f"Invalid page range: {value!r}")
+    return first, last
+
+
+def resolve_page_range(page_range, page_count):
+    """Converts a (first, last) 1-based range into a clamped 0-based [start, stop) pair."""
+    if page_range is None:
+        return 0, page_count
+    first, last = page_range
+    start = (first - 1) if first else 0
+    stop = last if last else page_count
+    return min(start, page_count), min(stop, page_count)
+
+
+def plan_shards(start, stop, num_shards):
+    """Splits [start, stop) into at most num_shards contiguous, near-equal ranges."""
+    total = stop - start
+    num_shards = max(1, min(num_shards, total))
+    size, extra = divmod(total, num_shards)
+    shards = []
+    for i in range(num_shards):
+        end = start + size + (1 if i < extra else 0)
+        shards.append((start, end))
+        start = end
+    return shards
+
+
+def _attach_shared_memory(name):
+    """Opens an existing block without registering it with this process's resource tracker.
+
+    Before Python 3.13 attaching registers the block, so the worker's tracker
+    warns about a leak and unlinks the parent's block when the worker exits.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _extract_page_range(shm_name, size, start, stop):
+    """Opens a private document handle and extracts pages [start, stop)."""
+    import fitz
+
+    shm = _attach_shared_memory(shm_name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def _worker_main():
+    """Entry point of a PDF worker process: extracts the page ranges pickled to its stdin."""
+    requests = sys.stdin.buffer
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    # Keep stray output (e.g. from MuPDF) off the reply stream
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    while True:
+        try:
+            task = pickle.load(requests)
+        except EOFError:
+            return
+        try:
+            reply = (True, _extract_page_range(*task))
+        except Exception as e:
+            reply = (False, f"{type(e).__name__}: {e}")
+        pickle.dump(reply, replies)
+        replies.flush()
+
+
+class _WorkerPool:
+    """Up to size long-lived worker processes, each running one page range at a time."""
+
+    def __init__(self, size):
+        self.size = size
+        self._processes = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = ThreadPoolExecutor(max_workers=size, thread_name_prefix="pdf-extract")
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._processes) < self.size:
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "Generator.pdf_extraction"],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=_BACKEND_DIR,
+                )
+                self._processes.append(process)
+                return process
+        return self._idle.get()
+
+    def _discard(self, process):
+        process.kill()
+        process.wait()
+        with self._lock:
+            self._processes.remove(process)
+
+    def _run(self, task):
+        process = self._acquire()
+        try:
+            pickle.dump(task, process.stdin)
+            process.stdin.flush()
+            ok, value = pickle.load(process.stdout)
+        except Exception as e:
+            self._discard(process)
+            raise RuntimeError(f"PDF worker (pid {process.pid}) failed") from e
+        self._idle.put(process)
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def submit(self, *task):
+        return self._threads.submit(self._run, task)
+
+    def shutdown(self):
+        self._threads.shutdown()
+        with self._lock:
+            processes, self._processes = self._processes, []
+        for process in processes:
+            process.stdin.close()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+class PDFExtractor:
+    """Extracts PDF page text, sharding large documents across a process pool."""
+
+    def __init__(self, max_workers=PDF_WORKERS, min_parallel_pages=PDF_PARALLEL_MIN_PAGES):
+        self.max_workers = max(1, max_workers)
+        self.min_parallel_pages = min_parallel_pages
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                # A forked process (e.g. a gunicorn worker) starts its own workers
+                self._pool = _WorkerPool(self.max_workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+
+    def iter_pages(self, data, page_range=None):
+        """Yields the text of each requested page, in order. page_range is a (first, last) tuple
+        as returned by parse_page_range. Sharded documents are yielded shard by shard.
+        """
+        import fitz
+
+        data = bytes(data)
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            start, stop = resolve_page_range(page_range, doc.page_count)
+            if self.max_workers == 1 or stop - start < self.min_parallel_pages:
+                for i in range(start, stop):
+                    yield doc[i].get_text()
+                return
+
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+        futures = []
+        try:
+            shm.buf[:len(data)] = data
+            pool = self._get_pool()
+            futures = [
+                pool.submit(shm.name, len(data), shard_start, shard_stop)
+                for shard_start, shard_stop in plan_shards(start, stop, self.max_workers)
+            ]
+            for future in futures:
+                yield from future.result()
+        finally:
+            # If the consumer stopped early or a shard failed, drop the shards that have not
+            # started and let the running ones finish before their shared memory goes away
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            shm.close()
+            shm.unlink()
+
+    def extract_pages(self, data, page_range=None):
+        return list(self.iter_pages(data, page_range))
+
+
+if __name__ == "__main__":
+    from Generator.pdf_extraction import _worker_main as serve
+    serve()
@@ -0,0 +1,201 @@
+"""Opt-in profiling of individual requests.
+
+A profiled request is sampled by a background thread that reads the request
+thread's stack from sys._current_frames() at a fixed interval. The samples
+are written in the collapsed-stack format that flamegraph.pl and speedscope
+read. Model calls wrapped in operator_profile() are also run under
+torch.profiler, and their operator tables are saved next to the stacks.
+Profiling has no effect unless PROFILING_ENABLED is set.
+"""
+import collections
+import contextvars
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(_BACKEND_DIR, "cache", "profiles"))
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.005))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 200))
+
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+COLLAPSED_SUFFIX = ".collapsed"
+OPERATORS_SUFFIX = ".ops.txt"
+
+_active_profile = contextvars.ContextVar("active_profile", default=None)
+# Held while torch.profiler is running, since only one profiler can be active per process
+_operator_lock = threading.Lock()
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+def collapse_stack(frame):
+    """Formats a frame and its callers as a root-first, semicolon-separated stack."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread from a background thread."""
+
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops sampling and returns the Counter of collapsed stacks."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.samples[collapse_stack(frame)] += 1
+            del frame
+
+
+class ProfileSession:
+    """Stack samples and torch operator tables collected for one request."""
+
+    def __init__(self, label, interval=PROFILE_INTERVAL):
+        self.profile_id = uuid.uuid4().hex
+        self.label = label
+        self.operator_tables = []
+        self._profiler = SamplingProfiler(interval=interval)
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def start(self):
+        self._profiler.start()
+        return self
+
+    def stop(self):
+        samples = self._profiler.stop()
+        self.duration = time.perf_counter() - self._started
+        return samples
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self._profiler.samples.most_common())
+
+    def save(self, profile_dir=PROFILE_DIR):
+        """Writes the collapsed stacks (and operator tables, if any) and returns the profile id."""
+        os.makedirs(profile_dir, exist_ok=True)
+        with open(os.path.join(profile_dir, self.profile_id + COLLAPSED_SUFFIX), "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        if self.operator_tables:
+            with open(os.path.join(profile_dir, self.profile_id + OPERATORS_SUFFIX), "w", encoding="utf-8") as f:
+                f.write(f"# {self.label} ({self.duration:.3f}s)\n\n")
+                f.write("\n\n".join(self.operator_tables))
+        _prune(profile_dir)
+        return self.profile_id
+
+
+def _prune(profile_dir, max_files=PROFILE_MAX_FILES):
+    try:
+        paths = [os.path.join(profile_dir, name) for name in os.listdir(profile_dir)]
+        paths.sort(key=os.path.getmtime)
+    except OSError:
+        return
+    for path in paths[:-max_files] if len(paths) > max_files else []:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def begin_profile(label):
+    """Starts profiling the current thread; returns (session, token) for end_profile."""
+    session = ProfileSession(label).start()
+    return session, _active_profile.set(session)
+
+
+def end_profile(session, token, profile_dir=PROFILE_DIR):
+    """Stops a profile started with begin_profile, saves it and returns its id."""
+    _active_profile.reset(token)
+    session.stop()
+    return session.save(profile_dir)
+
+
+def _start_torch_profiler():
+    import torch
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+    prof = torch.profiler.profile(activities=activities)
+    prof.__enter__()
+    return prof
+
+
+@contextmanager
+def operator_profile(label):
+    """Records torch operator stats for the block when the current request is being profiled.
+
+    torch.profiler is process-wide, so only one block is profiled at a time; an
+    overlapping block runs unprofiled and the skip is noted in its session. The
+    table can still include operators of unprofiled requests running meanwhile.
+    Profiler failures are logged and never reach the wrapped call.
+    """
+    session = _active_profile.get()
+    if session is None:
+        yield
+        return
+
+    if not _operator_lock.acquire(blocking=False):
+        session.operator_tables.append(f"## {label}\nskipped: another operator profile was running")
+        yield
+        return
+    try:
+        prof = _start_torch_profiler()
+    except Exception as e:
+        _operator_lock.release()
+        logger.warning(f"Failed to start torch profiler for {label}: {e}")
+        session.operator_tables.append(f"## {label}\nskipped: {e}")
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        try:
+            prof.__exit__(None, None, None)
+            table = prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=30)
+            session.operator_tables.append(f"## {label}\n{table}")
+        except Exception as e:
+            logger.warning(f"Failed to summarize torch profile for {label}: {e}")
+        finally:
+            _operator_lock.release()
+
+
+def profile_path(profile_id, suffix=COLLAPSED_SUFFIX, profile_dir=PROFILE_DIR):
+    """Path of a saved profile file, or None if the id is malformed or the file is missing."""
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    path = os.path.join(profile_dir, profile_id + suffix)
+    return path if os.path.exists(path) else None
@@ -1,12 +1,18 @@
 import re
 import random
-from nltk import pos_tag, word_tokenize
-from nltk.corpus import wordnet, stopwords
+import logging
+from nltk import pos_tag_sents, word_tokenize
+from nltk.corpus import stopwords
 from nltk.tokenize.treebank import TreebankWordDetokenizer
 
 # Initialize NLTK resources
 import nltk
 from Generator.nltk_utils import safe_nltk_download
+from Generator.metrics import stage
+from Generator.synonym_table import get_table
+from Generator.seeding import make_rng
+
+logger = logging.getLogger(__name__)
 
 safe_nltk_download('tokenizers/punkt')
 safe_nltk_download('taggers/averaged_perceptron_tagger_eng')
@@ -16,6 +22,8 @@ safe_nltk_download('corpora/stopwords')
 class QuestionEnhancer:
     def __init__(self):
         self.stop_words = set(stopwords.words('english'))
+        # Precomputed and memory-mapped, so requests never touch the WordNet corpus reader
+        self.synonyms = get_table()
         self.detokenizer = TreebankWordDetokenizer()
         
         self.question_word_map = {
@@ -36,85 +44,72 @@ class QuestionEnhancer:
             'did': ['accomplished', 'executed']
         }
 
-    def _generate_question_word_alternatives(self, word):
+    def _generate_question_word_alternatives(self, word, rng=random):
         """Generate alternatives for question words"""
         word = word.lower()
         if word in self.question_word_map:
-            return random.choice(self.question_word_map[word])
+            return rng.choice(self.question_word_map[word])
         return None
 
-    def _get_complex_synonym(self, word, pos_tag):
-        """Find more complex synonym using WordNet with POS awareness"""
+    def _get_complex_synonym(self, word, pos_tag, rng=random):
+        """Find more complex synonym from the WordNet synonym table with POS awareness"""
         if (word.lower() in self.stop_words or 
             len(word) <= 3 or 
             word.lower() in {'who', 'what', 'when', 'where', 'why', 'how'}):
             return None
             
         pos_mapping = {
-            'NN': wordnet.NOUN,
-            'VB': wordnet.VERB,
-            'JJ': wordnet.ADJ,
-            'RB': wordnet.ADV
+            'NN': 'n',
+            'VB': 'v',
+            'JJ': 'a',
+            'RB': 'r'
         }.get(pos_tag[:2])
         
         if not pos_mapping:
             return None
             
-        synsets = wordnet.synsets(word, pos=pos_mapping)
-        if not synsets:
-            return None
-            
         # Collect all suitable synonyms
-        candidates = []
-        for synset in synsets:
-            for lemma in synset.lemmas():
-                synonym = lemma.name().replace('_', ' ')
-                if (len(synonym) > len(word) and 
-                    synonym.lower() != word.lower() and
-                    ' ' not in synonym):
-                    candidates.append(synonym)
+        candidates = [
+            synonym for synonym in self.synonyms.lookup(word, pos_mapping)
+            if len(synonym) > len(word) and synonym.lower() != word.lower()
+        ]
         
-        return random.choice(candidates) if candidates else None
+        return rng.choice(candidates) if candidates else None
 
-    def _enhance_question_structure(self, question):
+    def _enhance_question_structure(self, question, tokens, tagged, rng=random):
         """Enhance question structure using algorithmic transformations"""
-        tokens = word_tokenize(question)
         if len(tokens) < 2:
             return None
             
         # Enhance question words
         first_word = tokens[0].lower()
-        alternative = self._generate_question_word_alternatives(first_word)
+        alternative = self._generate_question_word_alternatives(first_word, rng)
         if alternative:
             return alternative + ' ' + self.detokenizer.detokenize(tokens[1:])
             
         # Enhance verb phrases
-        tagged = pos_tag(tokens)
         for i, (word, tag) in enumerate(tagged):
             if tag.startswith('VB') and word.lower() in self.verb_enhancements:
-                replacement = random.choice(self.verb_enhancements[word.lower()])
+                replacement = rng.choice(self.verb_enhancements[word.lower()])
                 new_tokens = tokens[:i] + [replacement] + tokens[i+1:]
                 return self.detokenizer.detokenize(new_tokens)
                 
         return None
 
-    def _add_precision_terms(self, question):
+    def _add_precision_terms(self, question, tokens, tagged, rng=random):
         """Add precision terms to question"""
         terms = ['precisely', 'specifically', 'exactly', 'particularly']
-        if random.random() > 0.7:
-            tokens = word_tokenize(question)
+        if rng.random() > 0.7:
             if len(tokens) > 3:
-                pos = random.randint(1, min(3, len(tokens)-1))
-                tokens.insert(pos, random.choice(terms))
+                tokens = list(tokens)
+                pos = rng.randint(1, min(3, len(tokens)-1))
+                tokens.insert(pos, rng.choice(terms))
                 return self.detokenizer.detokenize(tokens)
         return None
 
-    def _convert_to_passive(self, question):
+    def _convert_to_passive(self, question, tokens, tagged, rng=random):
         """Convert to passive voice where appropriate"""
-        if random.random() < 0.4:  # Apply only 40% of the time
-            tokens = word_tokenize(question)
-            tagged = pos_tag(tokens)
-            
+        if rng.random() < 0.4:  # Apply only 40% of the time
             for i, (word, tag) in enumerate(tagged):
                 if (tag.startswith('VB') and i > 0 and 
                     tagged[i-1][1].startswith('NN')):
@@ -132,33 +127,8 @@ class QuestionEnhancer:
                     return f"{obj} {passive_aux} {verb} by {subject}"
         return None
 
-    def enhance(self, question):
-        """Enhance question difficulty through multiple strategies"""
-        if not question or not isinstance(question, str):
-            return question
-            
-        # Apply transformations in order of sophistication
-        transformations = [
-            self._enhance_question_structure,
-            self._add_precision_terms,
-            self._convert_to_passive,
-            self._enhance_lexically
-        ]
-        
-        for transform in transformations:
-            enhanced = transform(question)
-            if enhanced:
-                question = enhanced
-                break
-                
-        # Final cleanup
-        question = re.sub(r'\s+([?,!])', r'\1', question)
-        return question[0].upper() + question[1:]
-
-    def _enhance_lexically(self, question):
+    def _enhance_lexically(self, question, tokens, tagged, rng=random):
         """Enhance question through lexical substitutions"""
-        tokens = word_tokenize(question)
-        tagged = pos_tag(tokens)
         enhanced_tokens = []
         modified = False
         
@@ -168,7 +138,7 @@ class QuestionEnhancer:
                 continue
                 
             if tag.startswith(('NN', 'VB', 'JJ', 'RB')):
-                synonym = self._get_complex_synonym(word, tag)
+                synonym = self._get_complex_synonym(word, tag, rng)
                 if synonym:
                     enhanced_tokens.append(synonym)
                     modified = True
@@ -180,13 +150,65 @@ class QuestionEnhancer:
             return self.detokenizer.detokenize(enhanced_tokens)
         return None
 
+    def _enhance_tagged(self, question, tokens, tagged, rng):
+        # Apply transformations in order of sophistication
+        transformations = [
+            self._enhance_question_structure,
+            self._add_precision_terms,
+            self._convert_to_passive,
+            self._enhance_lexically
+        ]
+        
+        for transform in transformations:
+            enhanced = transform(question, tokens, tagged, rng)
+            if enhanced:
+                question = enhanced
+                break
+                
+        # Final cleanup
+        question = re.sub(r'\s+([?,!])', r'\1', question)
+        return question[0].upper() + question[1:]
+
+    def enhance_many(self, questions, seed=None):
+        """Enhance a batch of questions, tokenizing and POS-tagging them all in one pass.
+
+        With a seed, each question gets its own generator seeded from the seed and
+        the question text, so results do not depend on the rest of the batch.
+        Questions that are not non-empty strings, or fail to enhance, are returned unchanged.
+        """
+        results = list(questions)
+        valid = [i for i, q in enumerate(results) if q and isinstance(q, str)]
+        tokens = [word_tokenize(results[i]) for i in valid]
+        tagged = pos_tag_sents(tokens) if tokens else []
+
+        for i, question_tokens, question_tagged in zip(valid, tokens, tagged):
+            question = results[i]
+            rng = make_rng(seed, question)
+            try:
+                results[i] = self._enhance_tagged(question, question_tokens, question_tagged, rng)
+            except Exception as e:
+                logger.warning(f"Failed to make question harder: {e}")
+        return results
+
+    def enhance(self, question, seed=None):
+        """Enhance question difficulty through multiple strategies"""
+        return self.enhance_many([question], seed)[0]
+
 # Usage example
 enhancer = QuestionEnhancer()
 
-def make_question_harder(entry):
+@stage("make_question_harder")
+def make_question_harder(entry, seed=None):
     if isinstance(entry, dict):
         question = entry.get("question", "")
     else:
         question = entry
         
-    return enhancer.enhance(question)
\ No newline at end of file
+    return enhancer.enhance(question, seed)
+
+
+@stage("make_question_harder")
+def make_questions_harder(entries, seed=None):
+    """Batched make_question_harder: one tokenizing and tagging pass for all entries."""
+    questions = [entry.get("question", "") if isinstance(entry, dict) else entry for entry in entries]
+    return enhancer.enhance_many(questions, seed)
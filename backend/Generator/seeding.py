@@ -0,0 +1,31 @@
+"""Per-request seeds for the generators' random choices.
+
+Each stochastic step (BoolQ's answer polarity, multiple-choice distractors,
+question enhancement) takes an explicit seed instead of drawing from the
+global random module. That keeps outputs independent of how concurrent
+requests interleave. Seeds travel as plain arguments, so they also reach
+models running in inference worker processes. A request either sends its
+own seed or gets one derived from a hash of its content, so identical
+inputs give identical outputs and cached or coalesced results stay valid.
+"""
+import hashlib
+import random
+
+
+def derive_seed(seed=None, *parts):
+    """seed itself if it is an integer, otherwise a 63-bit hash of seed (if a string) or of parts."""
+    if isinstance(seed, bool) or (seed is not None and not isinstance(seed, (int, str))):
+        raise ValueError("seed must be an integer or a string")
+    if isinstance(seed, int):
+        return seed
+    if isinstance(seed, str):
+        parts = ("seed", seed)
+    digest = hashlib.sha256("\0".join(map(str, parts)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") >> 1
+
+
+def make_rng(seed, *scope):
+    """A generator for one stochastic step, seeded from seed and scope; the global random without a seed."""
+    if seed is None:
+        return random
+    return random.Random("\0".join(map(str, (seed,) + scope)))
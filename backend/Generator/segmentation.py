@@ -0,0 +1,101 @@
+"""Token-budgeted segmentation of long texts along sentence boundaries.
+
+The text is tokenized once with a fast tokenizer's offset mapping, so every
+sentence's token count comes from a binary search over token start offsets
+rather than from its own tokenizer call. Sentences are packed greedily into
+segments of at most max_tokens tokens in a single pass. A sentence longer
+than the budget is cut at token boundaries. Consecutive segments can
+share up to overlap_tokens tokens of whole trailing sentences. Segments
+are (start, end) character spans into the original text, so callers slice
+the text instead of decoding token ids back into it.
+"""
+import os
+import re
+from bisect import bisect_left
+from typing import List, Tuple
+
+# Token budget per question-generation context, leaving room for the answer and prompt tokens
+QG_SEGMENT_TOKENS = int(os.environ.get("QG_SEGMENT_TOKENS", 490))
+# Tokens of whole sentences repeated at the start of the next segment
+QG_SEGMENT_OVERLAP = int(os.environ.get("QG_SEGMENT_OVERLAP", 0))
+
+# Sentence-final punctuation (and any closing quotes or brackets) before whitespace, or a line break
+_BOUNDARY = re.compile(r"[.!?]+[\"')\]]*(?=\s|$)|\n+")
+
+
+def _add_span(spans, text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start < end:
+        spans.append((start, end))
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """Character spans of the sentences in text; line breaks also end a sentence."""
+    spans = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        _add_span(spans, text, start, match.end())
+        start = match.end()
+    _add_span(spans, text, start, len(text))
+    return spans
+
+
+def _units(spans, offsets, max_tokens):
+    """(start char, end char, tokens) per sentence, with over-budget sentences cut into pieces."""
+    token_starts = [start for start, _ in offsets]
+    units = []
+    for start, end in spans:
+        first, last = bisect_left(token_starts, start), bisect_left(token_starts, end)
+        if last - first <= max_tokens:
+            units.append((start, end, last - first))
+            continue
+        for piece in range(first, last, max_tokens):
+            piece_end = min(piece + max_tokens, last)
+            units.append((max(start, offsets[piece][0]), min(end, offsets[piece_end - 1][1]), piece_end - piece))
+    return units
+
+
+def segment_spans(text: str, tokenizer, max_tokens: int = QG_SEGMENT_TOKENS,
+                  overlap_tokens: int = QG_SEGMENT_OVERLAP) -> List[Tuple[int, int]]:
+    """Character spans of segments with at most max_tokens tokens each. Needs a fast tokenizer."""
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+    spans = sentence_spans(text)
+    if not spans:
+        return []
+    offsets = tokenizer(
+        text, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+    )["offset_mapping"]
+    # Some tokenizers emit zero-width tokens (e.g. a bare word-start marker); they take no room
+    offsets = [(start, end) for start, end in offsets if end > start]
+    units = _units(spans, offsets, max_tokens)
+
+    segments = []
+    first = 0
+    while first < len(units):
+        last, tokens = first, 0
+        while last < len(units) and (last == first or tokens + units[last][2] <= max_tokens):
+            tokens += units[last][2]
+            last += 1
+        segments.append((units[first][0], units[last - 1][1]))
+        if last == len(units):
+            break
+
+        # Start the next segment with as many trailing sentences as fit in the overlap,
+        # leaving room for at least one new sentence
+        next_first, shared = last, 0
+        room = min(overlap_tokens, max_tokens - units[last][2])
+        while next_first - 1 > first and shared + units[next_first - 1][2] <= room:
+            next_first -= 1
+            shared += units[next_first][2]
+        first = next_first
+    return segments
+
+
+def split_into_segments(text: str, tokenizer, max_tokens: int = QG_SEGMENT_TOKENS,
+                        overlap_tokens: int = QG_SEGMENT_OVERLAP) -> List[str]:
+    """The segments of segment_spans(), sliced from text."""
+    return [text[start:end] for start, end in segment_spans(text, tokenizer, max_tokens, overlap_tokens)]
@@ -0,0 +1,103 @@
+"""Reusable keyword-to-sentence index for a tokenized document.
+
+Sentences are scanned once into a word inverted index. Keywords can then be
+added at any time: each one is only verified against the sentences whose
+words cover it, so adding keywords never rescans the whole document.
+
+Matching follows the flashtext KeywordProcessor it replaces: case-insensitive,
+whole words only, and within one keyword set each sentence position goes to
+the leftmost, longest keyword, so "machine learning" hides "machine" where
+the two overlap. Word characters are Unicode (\w), so keywords in other
+scripts match too, and each sentence is listed once per keyword.
+"""
+import re
+import threading
+from array import array
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SentenceIndex:
+    """Keyword -> (sentence id, start, end) postings over a fixed list of sentences."""
+
+    def __init__(self, sentences):
+        self.sentences = list(sentences)
+        self.lengths = array("I", (len(s) for s in self.sentences))
+        self._word_postings = {}
+        for sentence_id, sentence in enumerate(self.sentences):
+            for word in set(_WORD_RE.findall(sentence.lower())):
+                self._word_postings.setdefault(word, array("I")).append(sentence_id)
+        self._keyword_postings = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def _candidate_ids(self, keyword):
+        """Ids of sentences containing every word of keyword, smallest posting list first."""
+        words = set(_WORD_RE.findall(keyword.lower()))
+        if not words:
+            return []
+        postings = sorted((self._word_postings.get(w, ()) for w in words), key=len)
+        if not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def add_keyword(self, keyword):
+        """Index a keyword and return its postings: every (sentence_id, start, end) match."""
+        keyword = keyword.strip()
+        postings = self._keyword_postings.get(keyword)
+        if postings is not None:
+            return postings
+
+        pattern = re.compile(r"(?<!\w)" + re.escape(keyword) + r"(?!\w)", re.IGNORECASE | re.UNICODE)
+        postings = []
+        for sentence_id in self._candidate_ids(keyword):
+            for match in pattern.finditer(self.sentences[sentence_id]):
+                postings.append((sentence_id, match.start(), match.end()))
+
+        with self._lock:
+            return self._keyword_postings.setdefault(keyword, postings)
+
+    def add_keywords(self, keywords):
+        for keyword in keywords:
+            self.add_keyword(keyword)
+
+    def postings(self, keyword):
+        return self.add_keyword(keyword)
+
+    def _ordered(self, ids, limit):
+        ids = sorted(set(ids), key=lambda sid: (-self.lengths[sid], sid))
+        if limit is not None:
+            ids = ids[:limit]
+        return [self.sentences[sid] for sid in ids]
+
+    def sentences_for(self, keyword, limit=None):
+        """Sentences mentioning keyword on its own (no longest-match against other keywords), longest first."""
+        return self._ordered((sid for sid, _, _ in self.add_keyword(keyword)), limit)
+
+    def keyword_sentences(self, keywords, limit=None):
+        """Same shape as find_sentences_with_keywords: {keyword: [sentences, longest first]}, empty keywords dropped.
+
+        A sentence counts for a keyword only where the keyword wins the leftmost-longest match.
+        """
+        keywords = list(dict.fromkeys(k.strip() for k in keywords if k.strip()))
+        found = {}
+        for keyword in keywords:
+            for sentence_id, start, end in self.add_keyword(keyword):
+                found.setdefault(sentence_id, []).append((start, start - end, keyword))
+
+        credited = {keyword: [] for keyword in keywords}
+        for sentence_id, matches in found.items():
+            matches.sort()
+            position = 0
+            for start, negative_length, keyword in matches:
+                if start >= position:
+                    credited[keyword].append(sentence_id)
+                    position = start - negative_length
+        return {keyword: self._ordered(ids, limit) for keyword, ids in credited.items() if ids}
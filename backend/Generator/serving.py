@@ -0,0 +1,72 @@
+"""Helpers for serving models from preforked worker processes.
+
+Models are loaded once in the gunicorn master. freeze_models() then puts them
+in inference mode and optionally moves their weights into shared memory, so
+forked workers read the same physical pages instead of each holding a copy.
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Set by gunicorn.conf.py when the app is preloaded in a forking master
+PREFORK = os.environ.get("EDUAID_PREFORK", "0").lower() in ("1", "true", "yes")
+
+
+def _iter_modules(obj, depth=2, seen=None):
+    """Yields torch modules held by obj's attributes, looking depth levels deep."""
+    import torch
+
+    seen = set() if seen is None else seen
+    if obj is None or id(obj) in seen:
+        return
+    seen.add(id(obj))
+    if isinstance(obj, torch.nn.Module):
+        yield obj
+        return
+    if depth == 0 or not hasattr(obj, "__dict__"):
+        return
+    for value in vars(obj).values():
+        yield from _iter_modules(value, depth - 1, seen)
+
+
+def freeze_model(model, share_memory=False):
+    """Eval mode, no gradients and, optionally, weights in shared memory."""
+    model.eval()
+    for parameter in model.parameters():
+        parameter.requires_grad_(False)
+    if share_memory:
+        model.share_memory()
+    return model
+
+
+def freeze_models(*holders, share_memory=PREFORK):
+    """Freezes every model reachable from the given generators or pipelines; returns the count."""
+    seen = set()
+    count = 0
+    for holder in holders:
+        for model in _iter_modules(holder, seen=seen):
+            freeze_model(model, share_memory)
+            count += 1
+    logger.info(f"Froze {count} models for inference (shared memory: {share_memory})")
+    return count
+
+
+def worker_threads(workers, cpus=None):
+    """Intra-op threads per worker so that all workers together use each core once."""
+    override = os.environ.get("TORCH_THREADS_PER_WORKER")
+    if override:
+        return max(1, int(override))
+    cpus = cpus or os.cpu_count() or 1
+    return max(1, cpus // max(1, workers))
+
+
+def model_bytes(*holders):
+    """Bytes held by the parameters and buffers of every model reachable from holders."""
+    seen = set()
+    total = 0
+    for holder in holders:
+        for model in _iter_modules(holder, seen=seen):
+            for tensor in list(model.parameters()) + list(model.buffers()):
+                total += tensor.numel() * tensor.element_size()
+    return total
@@ -0,0 +1,77 @@
+"""Single-flight coalescing of identical in-flight calls.
+
+While a call for a key is running, further calls with the same key wait for
+it and share its result (or exception) instead of repeating the work. Once
+the call finishes the key is forgotten, so this is not a result cache.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from Generator.metrics import observe_queue_wait
+
+
+def canonical_key(*parts, **params):
+    """Stable hash of the positional parts and keyword params, independent of dict ordering."""
+    blob = json.dumps([parts, params], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key. Results are shared, so treat them as read-only."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Runs fn() unless a call for key is already in flight, in which case waits for its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            started = time.perf_counter()
+            call.done.wait()
+            observe_queue_wait("coalesced", time.perf_counter() - started)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,149 @@
+"""Fast cold start: local safetensors/tokenizer snapshots and a startup-time report.
+
+With FAST_START enabled, load_pretrained() and load_tokenizer() save each
+hub checkpoint once to FAST_START_DIR: the weights as safetensors and
+tokenizers in their serialized form (tokenizer.json for fast tokenizers).
+Later starts load from that directory. Safetensors are memory-mapped
+instead of unpickled and copied, no hub metadata is requested, and
+low_cpu_mem_usage skips the random initialisation of weights that are
+overwritten anyway.
+
+install_import_timer() records how long each top-level package takes to
+import, excluding packages it imports in turn. report() logs those
+timings together with the model load times recorded via record_model().
+"""
+import builtins
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FAST_START = os.environ.get("FAST_START", "0").lower() in ("1", "true", "yes")
+FAST_START_DIR = os.environ.get("FAST_START_DIR", os.path.join(_BACKEND_DIR, "cache", "pretrained"))
+STARTUP_REPORT = os.environ.get("STARTUP_REPORT", "1").lower() in ("1", "true", "yes")
+# Imports faster than this are left out of the report
+STARTUP_REPORT_MIN_MS = float(os.environ.get("STARTUP_REPORT_MIN_MS", 20))
+
+_started = time.perf_counter()
+_imports = {}
+_models = {}
+_stack = threading.local()
+_original_import = None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    top = name.partition(".")[0]
+    if level or top in sys.modules or threading.current_thread() is not threading.main_thread():
+        return _original_import(name, globals, locals, fromlist, level)
+
+    frames = _stack.__dict__.setdefault("frames", [])
+    frames.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = frames.pop()
+        if frames:
+            frames[-1] += elapsed
+        _imports[top] = _imports.get(top, 0.0) + elapsed - nested
+
+
+def install_import_timer():
+    """Starts attributing import time to top-level packages, once per process."""
+    global _original_import
+    if _original_import is None:
+        _original_import = builtins.__import__
+        builtins.__import__ = _timed_import
+
+
+def uninstall_import_timer():
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+
+
+def record_model(name, seconds):
+    _models[name] = _models.get(name, 0.0) + seconds
+
+
+def timings():
+    """Import and model load seconds recorded so far, slowest first."""
+    return {
+        "total_seconds": time.perf_counter() - _started,
+        "imports": dict(sorted(_imports.items(), key=lambda item: -item[1])),
+        "models": dict(sorted(_models.items(), key=lambda item: -item[1])),
+    }
+
+
+def report():
+    """Stops the import timer and logs where startup time went."""
+    uninstall_import_timer()
+    if not STARTUP_REPORT:
+        return
+    data = timings()
+    lines = [f"Startup took {data['total_seconds']:.2f}s (fast start: {FAST_START})"]
+    shown = [(name, s) for name, s in data["imports"].items() if s * 1000 >= STARTUP_REPORT_MIN_MS]
+    if shown:
+        lines.append(f"  imports ({sum(data['imports'].values()):.2f}s):")
+        lines.extend(f"    {name:<28}{seconds * 1000:9.0f} ms" for name, seconds in shown)
+    if data["models"]:
+        lines.append(f"  models ({sum(data['models'].values()):.2f}s):")
+        lines.extend(f"    {name:<28}{seconds * 1000:9.0f} ms" for name, seconds in data["models"].items())
+    logger.info("\n".join(lines))
+
+
+def _snapshot_dir(name):
+    return os.path.join(FAST_START_DIR, name.replace("/", "--"))
+
+
+def _save_snapshot(obj, path, **kwargs):
+    # Written beside the final path and renamed, so a crash never leaves half a snapshot
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        obj.save_pretrained(tmp, **kwargs)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Could not save fast-start snapshot {path}: {e}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_pretrained(cls, name, **kwargs):
+    """cls.from_pretrained(name), from a memory-mapped safetensors snapshot when FAST_START is on."""
+    if not FAST_START:
+        return cls.from_pretrained(name, **kwargs)
+
+    kwargs.setdefault("low_cpu_mem_usage", True)
+    path = os.path.join(_snapshot_dir(name), "model")
+    if os.path.exists(os.path.join(path, "config.json")):
+        return cls.from_pretrained(path, use_safetensors=True, **kwargs)
+
+    model = cls.from_pretrained(name, **kwargs)
+    _save_snapshot(model, path, safe_serialization=True)
+    logger.info(f"Saved fast-start snapshot of {name} to {path}")
+    return model
+
+
+def load_tokenizer(cls, name, **kwargs):
+    """cls.from_pretrained(name), from a local serialized snapshot when FAST_START is on."""
+    if not FAST_START:
+        return cls.from_pretrained(name, **kwargs)
+
+    # Fast and slow tokenizers of the same checkpoint are stored separately; an
+    # AutoTokenizer only tells them apart by use_fast
+    kind = "fast" if kwargs.get("use_fast", True) else "slow"
+    path = os.path.join(_snapshot_dir(name), f"tokenizer-{cls.__name__}-{kind}")
+    if os.path.exists(os.path.join(path, "tokenizer_config.json")):
+        return cls.from_pretrained(path, **kwargs)
+
+    tokenizer = cls.from_pretrained(name, **kwargs)
+    _save_snapshot(tokenizer, path)
+    return tokenizer
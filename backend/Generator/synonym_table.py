@@ -0,0 +1,172 @@
+"""Precomputed WordNet synonym table for QuestionEnhancer.
+
+build_table() walks WordNet once, offline, and writes every single-word
+lemma and irregular form with its candidate synonyms: the single-word lemma
+names of wordnet.synsets(form, pos), in order, without duplicates. The
+table is a text file of sorted lines
+
+    <form>\\t<pos>\\t<candidate> <candidate> ...
+
+plus a .idx file of little-endian uint32 line offsets (and the text file's
+size as a final entry). Both are memory-mapped and searched by bisection,
+so the table costs no Python heap and the WordNet corpus reader is never
+loaded on the request path. Forms that are not in the table, such as
+regular inflections, are resolved through WordNet's suffix rules. Lookups
+are memoized in an LRU cache.
+
+    python -m Generator.synonym_table [path]
+"""
+import logging
+import mmap
+import os
+import sys
+import threading
+from array import array
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SYNONYM_TABLE_PATH = os.environ.get(
+    "SYNONYM_TABLE_PATH", os.path.join(_BACKEND_DIR, "cache", "wordnet_synonyms.tsv")
+)
+SYNONYM_CACHE_SIZE = int(os.environ.get("SYNONYM_CACHE_SIZE", 65536))
+
+POS_TAGS = ("n", "v", "a", "r")
+
+# WordNet's morphy substitutions (nltk.corpus.reader.wordnet.MORPHOLOGICAL_SUBSTITUTIONS)
+SUFFIX_RULES = {
+    "n": [("s", ""), ("ses", "s"), ("ves", "f"), ("xes", "x"), ("zes", "z"),
+          ("ches", "ch"), ("shes", "sh"), ("men", "man"), ("ies", "y")],
+    "v": [("s", ""), ("ies", "y"), ("es", "e"), ("es", ""), ("ed", "e"), ("ed", ""),
+          ("ing", "e"), ("ing", "")],
+    "a": [("er", ""), ("est", ""), ("er", "e"), ("est", "e")],
+    "r": [],
+}
+
+
+def _index_path(path):
+    return path + ".idx"
+
+
+def base_forms(word, pos):
+    """Candidate base forms of an inflected word, as WordNet's morphy derives them."""
+    return [word[:-len(old)] + new for old, new in SUFFIX_RULES.get(pos, []) if word.endswith(old)]
+
+
+def build_table(path=SYNONYM_TABLE_PATH):
+    """Writes the synonym table and its index from the NLTK WordNet corpus; returns the entry count."""
+    from nltk.corpus import wordnet
+
+    wordnet.ensure_loaded()
+    exceptions = getattr(wordnet, "_exception_map", {})
+    lines = []
+    for pos in POS_TAGS:
+        forms = set(wordnet.all_lemma_names(pos)) | set(exceptions.get(pos, ()))
+        for form in forms:
+            if "_" in form or "\t" in form or " " in form:
+                continue
+            candidates = []
+            for synset in wordnet.synsets(form, pos=pos):
+                for lemma in synset.lemmas():
+                    name = lemma.name()
+                    if "_" not in name and name.lower() != form and name not in candidates:
+                        candidates.append(name)
+            lines.append((form.encode("utf-8"), pos, " ".join(candidates)))
+    lines.sort()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    offsets = array("I")
+    tmp_path, tmp_index = f"{path}.tmp-{os.getpid()}", f"{_index_path(path)}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        for form, pos, candidates in lines:
+            offsets.append(f.tell())
+            f.write(form + f"\t{pos}\t{candidates}\n".encode("utf-8"))
+        offsets.append(f.tell())
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    with open(tmp_index, "wb") as f:
+        offsets.tofile(f)
+    os.replace(tmp_index, _index_path(path))
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote {len(lines)} WordNet synonym entries to {path}")
+    return len(lines)
+
+
+class SynonymTable:
+    """Read-only, memory-mapped view of a table written by build_table()."""
+
+    def __init__(self, path=SYNONYM_TABLE_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(_index_path(path), "rb") as f:
+            self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = memoryview(self._index_map).cast("I")
+        if sys.byteorder != "little":
+            self._offsets = array("I", self._offsets)
+            self._offsets.byteswap()
+        if len(self._offsets) == 0 or self._offsets[-1] != len(self._data):
+            raise ValueError(f"{_index_path(path)} does not match {path}")
+        self.lookup = lru_cache(maxsize=SYNONYM_CACHE_SIZE)(self._lookup)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _key(self, i):
+        start = self._offsets[i]
+        word_end = self._data.find(b"\t", start)
+        return self._data[start:word_end], self._data[word_end + 1:word_end + 2]
+
+    def _entry(self, word, pos):
+        """Candidates stored for exactly (word, pos), or None if the table has no such line."""
+        key = (word.encode("utf-8"), pos.encode("ascii"))
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(self) or self._key(lo) != key:
+            return None
+        line = self._data[self._offsets[lo]:self._offsets[lo + 1] - 1].decode("utf-8")
+        candidates = line.split("\t", 2)[2]
+        return candidates.split(" ") if candidates else []
+
+    def _lookup(self, word, pos):
+        word = word.lower()
+        candidates = self._entry(word, pos)
+        if candidates is not None:
+            return tuple(candidates)
+        # Not a lemma or irregular form: merge its base forms' entries, as morphy does
+        merged = []
+        for base in base_forms(word, pos):
+            for candidate in self._entry(base, pos) or ():
+                if candidate not in merged:
+                    merged.append(candidate)
+        return tuple(merged)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_table(path=SYNONYM_TABLE_PATH):
+    """The process-wide table, built first if it does not exist yet (which needs the WordNet corpus)."""
+    global _table
+    with _table_lock:
+        if _table is None:
+            try:
+                _table = SynonymTable(path)
+            except (OSError, ValueError):
+                logger.info(f"Building WordNet synonym table at {path}")
+                build_table(path)
+                _table = SynonymTable(path)
+        return _table
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    build_table(sys.argv[1] if len(sys.argv) > 1 else SYNONYM_TABLE_PATH)
@@ -0,0 +1,204 @@
+"""YouTube transcript fetching with an on-disk cache.
+
+Cleaned transcripts are cached by video id in a directory capped at
+TRANSCRIPT_CACHE_MAX_BYTES; reads refresh a file's modification time and the
+least recently used files are deleted after each write. Concurrent requests for the
+same id share a single fetch, fetches run on a bounded worker pool with
+timeouts, and VTT files are parsed line by line. Setting TRANSCRIPT_VTT_DIR
+serves transcripts from a directory of pre-fetched .vtt files instead of
+calling yt-dlp, for offline use and testing.
+"""
+import glob
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from Generator.metrics import stage, observe_queue_wait
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSCRIPT_CACHE_DIR = os.environ.get("TRANSCRIPT_CACHE_DIR", os.path.join(_BACKEND_DIR, "cache", "transcripts"))
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.environ.get("TRANSCRIPT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+TRANSCRIPT_VTT_DIR = os.environ.get("TRANSCRIPT_VTT_DIR", "")
+TRANSCRIPT_WORKERS = int(os.environ.get("TRANSCRIPT_WORKERS", 4))
+TRANSCRIPT_TIMEOUT = int(os.environ.get("TRANSCRIPT_TIMEOUT", 60))
+
+VIDEO_ID_RE = re.compile(r"^[a-zA-Z0-9_-]{6,20}$")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class TranscriptError(Exception):
+    """Base class for transcript failures."""
+
+
+class TranscriptNotFound(TranscriptError):
+    """The video has no usable English subtitles."""
+
+
+class TranscriptUnavailable(TranscriptError):
+    """The transcript backend (yt-dlp) is not installed."""
+
+
+class TranscriptTimeout(TranscriptError):
+    """Fetching the transcript took too long."""
+
+
+def iter_vtt_text(lines):
+    """Yields cleaned caption lines from an iterable of VTT lines, skipping headers and timestamps."""
+    in_cues = False
+    for line in lines:
+        line = line.strip()
+
+        # Skip metadata lines
+        if line.lower().startswith(("kind:", "language:", "webvtt")):
+            continue
+
+        # Cue text starts after the first timestamp line
+        if "-->" in line:
+            in_cues = True
+            continue
+
+        if in_cues:
+            line = _TAG_RE.sub("", line)
+            if line:
+                yield line
+
+
+def clean_transcript(file_path):
+    """Extracts and cleans transcript text from a VTT file, streaming it line by line."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return " ".join(iter_vtt_text(f)).strip()
+
+
+class TranscriptService:
+    """Fetches, cleans and caches transcripts, coalescing concurrent requests per video id."""
+
+    def __init__(self, cache_dir=TRANSCRIPT_CACHE_DIR, vtt_dir=TRANSCRIPT_VTT_DIR,
+                 max_workers=TRANSCRIPT_WORKERS, timeout=TRANSCRIPT_TIMEOUT,
+                 max_cache_bytes=TRANSCRIPT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.vtt_dir = vtt_dir
+        self.timeout = timeout
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="transcript")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _cache_path(self, video_id):
+        return os.path.join(self.cache_dir, f"{video_id}.txt")
+
+    def get(self, video_id):
+        """Returns the cleaned transcript for video_id, raising a TranscriptError on failure."""
+        if not VIDEO_ID_RE.match(video_id):
+            raise ValueError("Invalid video ID format")
+
+        path = self._cache_path(video_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            # Mark as recently used for pruning
+            os.utime(path)
+            return text
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            future = self._inflight.get(video_id)
+            if future is None:
+                future = self._executor.submit(self._fetch, video_id, time.perf_counter())
+                self._inflight[video_id] = future
+                future.add_done_callback(lambda _, key=video_id: self._forget(key))
+
+        try:
+            # Allow for time spent queued behind other fetches
+            return future.result(timeout=2 * self.timeout)
+        except FutureTimeoutError:
+            raise TranscriptTimeout(f"Transcript fetch timed out for video: {video_id}")
+
+    def _forget(self, video_id):
+        with self._lock:
+            self._inflight.pop(video_id, None)
+
+    def _fetch(self, video_id, submitted):
+        observe_queue_wait("transcript", time.perf_counter() - submitted)
+        with stage("transcript_fetch"):
+            if self.vtt_dir:
+                text = self._read_local(video_id)
+            else:
+                text = self._download(video_id)
+        if not text:
+            raise TranscriptNotFound(f"No subtitles found for video: {video_id}")
+
+        path = self._cache_path(video_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache transcript for {video_id}: {e}")
+        else:
+            self._prune_cache()
+        return text
+
+    def _prune_cache(self):
+        """Deletes the least recently used transcripts until the cache fits in max_cache_bytes."""
+        if not self.max_cache_bytes:
+            return
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".txt"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        # Keep the newest file even if it alone is over the cap
+        for _, size, path in sorted(entries)[:-1]:
+            if total <= self.max_cache_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def _read_local(self, video_id):
+        subtitle_files = glob.glob(os.path.join(glob.escape(self.vtt_dir), f"{video_id}*.vtt"))
+        if not subtitle_files:
+            return ""
+        return clean_transcript(max(subtitle_files, key=os.path.getmtime))
+
+    def _download(self, video_id):
+        # A private directory per fetch avoids globbing files from concurrent downloads
+        with tempfile.TemporaryDirectory(prefix="subtitles-") as subtitles_dir:
+            output_path = os.path.join(subtitles_dir, f"{video_id}.vtt")
+            try:
+                result = subprocess.run(
+                    ["yt-dlp", "--write-auto-sub", "--sub-lang", "en", "--skip-download",
+                     "--sub-format", "vtt", "-o", output_path,
+                     f"https://www.youtube.com/watch?v={video_id}"],
+                    check=True, capture_output=True, text=True, timeout=self.timeout
+                )
+                if result.stderr:
+                    logger.debug(f"yt-dlp stderr: {result.stderr[:500]}")
+            except subprocess.TimeoutExpired:
+                raise TranscriptTimeout(f"Transcript download timed out for video: {video_id}")
+            except subprocess.CalledProcessError as e:
+                raise TranscriptError(f"yt-dlp failed for video {video_id}: {(e.stderr or '')[:200]}")
+            except FileNotFoundError:
+                raise TranscriptUnavailable("yt-dlp is not installed or not in PATH")
+
+            subtitle_files = glob.glob(os.path.join(glob.escape(subtitles_dir), "*.vtt"))
+            if not subtitle_files:
+                return ""
+            return clean_transcript(subtitle_files[0])
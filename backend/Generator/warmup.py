@@ -0,0 +1,92 @@
+"""Warmup passes that prime a freshly loaded model before it takes traffic.
+
+The first calls into a model are much slower than later ones: the allocator
+grows its pools, tokenizers fill their caches and oneDNN picks kernels for
+each input shape. warm_up() runs dummy inputs through every model reachable
+from a generator or pipeline, at each of WARMUP_BATCH_SIZES and
+WARMUP_SEQ_LENGTHS, so real requests find those paths already taken.
+Encoder-decoder models run a short beam-search generate; encoders run a
+forward pass.
+"""
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+WARMUP = os.environ.get("WARMUP", "1").lower() in ("1", "true", "yes")
+WARMUP_BATCH_SIZES = os.environ.get("WARMUP_BATCH_SIZES", "1,4")
+WARMUP_SEQ_LENGTHS = os.environ.get("WARMUP_SEQ_LENGTHS", "64,256")
+# Short outputs: the decoder kernels are the same whatever the length
+WARMUP_NEW_TOKENS = int(os.environ.get("WARMUP_NEW_TOKENS", 4))
+
+_DUMMY_TEXT = (
+    "The mitochondria is the powerhouse of the cell and produces energy through cellular respiration. "
+)
+
+
+def _parse_sizes(value):
+    return [int(v) for v in str(value).split(",") if v.strip()]
+
+
+def _model_pairs(obj, depth=2, seen=None):
+    """Yields (name, model, tokenizer) for attributes like model/tokenizer or qg_model/qg_tokenizer."""
+    import torch
+
+    seen = set() if seen is None else seen
+    if obj is None or id(obj) in seen or depth < 0 or not hasattr(obj, "__dict__"):
+        return
+    seen.add(id(obj))
+    attrs = vars(obj)
+    for name, value in attrs.items():
+        if isinstance(value, torch.nn.Module) and name.endswith("model"):
+            tokenizer = attrs.get(name[:-len("model")] + "tokenizer")
+            if tokenizer is not None and callable(tokenizer):
+                yield name, value, tokenizer
+        elif not isinstance(value, (str, bytes, int, float, dict, list, tuple, torch.nn.Module)):
+            yield from _model_pairs(value, depth - 1, seen)
+
+
+def _warm_pair(model, tokenizer, batch_sizes, seq_lengths, new_tokens):
+    import torch
+
+    device = next(model.parameters()).device
+    encoder_decoder = getattr(model.config, "is_encoder_decoder", False)
+    for seq_length in seq_lengths:
+        text = (_DUMMY_TEXT * (seq_length // 8 + 1))
+        for batch_size in batch_sizes:
+            inputs = tokenizer(
+                [text] * batch_size, max_length=seq_length, truncation=True,
+                padding="max_length", return_tensors="pt",
+            ).to(device)
+            with torch.inference_mode():
+                if encoder_decoder:
+                    model.generate(
+                        input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"],
+                        max_new_tokens=new_tokens, num_beams=2,
+                    )
+                else:
+                    model(**inputs)
+
+
+def warm_up(obj, batch_sizes=WARMUP_BATCH_SIZES, seq_lengths=WARMUP_SEQ_LENGTHS, new_tokens=WARMUP_NEW_TOKENS):
+    """Runs warmup passes for every model in obj; returns {model attribute: seconds}."""
+    batch_sizes = _parse_sizes(batch_sizes) if isinstance(batch_sizes, str) else list(batch_sizes)
+    seq_lengths = _parse_sizes(seq_lengths) if isinstance(seq_lengths, str) else list(seq_lengths)
+    timings = {}
+    models = set()
+    for name, model, tokenizer in _model_pairs(obj):
+        # Generators sharing a model only warm it once
+        if id(model) in models:
+            continue
+        models.add(id(model))
+        start = time.perf_counter()
+        _warm_pair(model, tokenizer, batch_sizes, seq_lengths, new_tokens)
+        timings[name] = time.perf_counter() - start
+
+    nlp = getattr(obj, "nlp", None)
+    if nlp is not None and callable(nlp):
+        start = time.perf_counter()
+        nlp(_DUMMY_TEXT)
+        timings["nlp"] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,218 @@
+"""Caching layer in front of Wikipedia summary lookups.
+
+Summaries are kept in a SQLite file with a TTL, keyed by a SHA-256 of the
+sentence count and normalized title (the title can be a whole input text). Misses (unknown or
+ambiguous titles) are cached for a shorter negative TTL, and transient
+errors fall back to a stale entry when one exists. Expired misses, summaries
+stale for longer than WIKI_CACHE_STALE_TTL and the soonest-expiring rows
+beyond WIKI_CACHE_MAX_ROWS are deleted at startup and then at most every
+WIKI_CACHE_PRUNE_INTERVAL seconds, when an entry is written. The source can be the
+live MediaWiki API or an offline SQLite index built from a local dump,
+which is what air-gapped deployments use.
+
+Build an offline index from a JSON Lines dump with one
+{"title": ..., "summary": ...} object per line:
+
+    python -m Generator.wiki_cache build dump.jsonl wiki_index.sqlite3
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from Generator.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WIKI_CACHE_PATH = os.environ.get("WIKI_CACHE_PATH", os.path.join(_BACKEND_DIR, "cache", "wiki.sqlite3"))
+WIKI_CACHE_TTL = int(os.environ.get("WIKI_CACHE_TTL", 7 * 24 * 3600))
+WIKI_NEGATIVE_TTL = int(os.environ.get("WIKI_NEGATIVE_TTL", 3600))
+# How long an expired summary is kept as a fallback for failed lookups
+WIKI_CACHE_STALE_TTL = int(os.environ.get("WIKI_CACHE_STALE_TTL", 7 * 24 * 3600))
+WIKI_CACHE_MAX_ROWS = int(os.environ.get("WIKI_CACHE_MAX_ROWS", 100000))
+WIKI_CACHE_PRUNE_INTERVAL = int(os.environ.get("WIKI_CACHE_PRUNE_INTERVAL", 600))
+# Path to an offline index built with `python -m Generator.wiki_cache build`
+WIKI_OFFLINE_INDEX = os.environ.get("WIKI_OFFLINE_INDEX", "")
+
+# mediawikiapi raises these for titles that do not resolve to a single page
+_MISS_ERRORS = ("PageError", "DisambiguationError")
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def normalize_title(title):
+    return " ".join(title.replace("_", " ").split()).lower()
+
+
+def first_sentences(text, sentences):
+    """Truncates text to its first n sentences (0 keeps everything)."""
+    if not sentences:
+        return text
+    return " ".join(_SENTENCE_SPLIT_RE.split(text.strip())[:sentences])
+
+
+def _is_miss(error):
+    return isinstance(error, LookupError) or type(error).__name__ in _MISS_ERRORS
+
+
+class OfflineWikiSource:
+    """Summaries served from a local SQLite index instead of the network."""
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Offline Wikipedia index not found: {path}")
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return conn
+
+    def summary(self, title, sentences=0):
+        row = self._connection().execute(
+            "SELECT summary FROM summaries WHERE title = ?", (normalize_title(title),)
+        ).fetchone()
+        if row is None:
+            raise LookupError(f"No offline summary for {title!r}")
+        return first_sentences(row[0], sentences)
+
+
+def build_offline_index(dump_path, index_path):
+    """Builds an offline index from a JSON Lines dump. Returns the number of entries."""
+    count = 0
+    conn = sqlite3.connect(index_path)
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS summaries (title TEXT PRIMARY KEY, summary TEXT NOT NULL)")
+        with open(dump_path, "r", encoding="utf-8") as dump:
+            batch = []
+            for line in dump:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                batch.append((normalize_title(entry["title"]), entry["summary"]))
+                if len(batch) >= 10000:
+                    conn.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?)", batch)
+                    count += len(batch)
+                    batch = []
+            conn.executemany("INSERT OR REPLACE INTO summaries VALUES (?, ?)", batch)
+            count += len(batch)
+        conn.commit()
+    finally:
+        conn.close()
+    return count
+
+
+class WikiSummaryCache:
+    """Persistent TTL cache with negative caching around a summary source.
+
+    source must provide summary(title, sentences), like MediaWikiAPI.
+    summary() raises LookupError for (possibly cached) misses.
+    """
+
+    def __init__(self, source, path=WIKI_CACHE_PATH, ttl=WIKI_CACHE_TTL, negative_ttl=WIKI_NEGATIVE_TTL,
+                 stale_ttl=WIKI_CACHE_STALE_TTL, max_rows=WIKI_CACHE_MAX_ROWS):
+        self.source = source
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_rows = max_rows
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._prune_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries "
+            "(key TEXT PRIMARY KEY, summary TEXT, expires REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS summaries_expires ON summaries (expires)")
+        conn.commit()
+        self.prune()
+        self._next_prune = time.time() + WIKI_CACHE_PRUNE_INTERVAL
+
+    def _connection(self):
+        # Per thread and per process: SQLite connections must not cross a fork (e.g. gunicorn's preload)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = sqlite3.connect(self.path)
+            self._local.pid = os.getpid()
+        return conn
+
+    def _lookup(self, key):
+        return self._connection().execute("SELECT summary, expires FROM summaries WHERE key = ?", (key,)).fetchone()
+
+    def _store(self, key, summary, ttl):
+        conn = self._connection()
+        conn.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)", (key, summary, time.time() + ttl))
+        conn.commit()
+        with self._prune_lock:
+            due = time.time() >= self._next_prune
+            if due:
+                self._next_prune = time.time() + WIKI_CACHE_PRUNE_INTERVAL
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Deletes expired misses, summaries stale beyond stale_ttl and the soonest-expiring rows
+        beyond max_rows. Returns the number of rows deleted.
+        """
+        now = time.time()
+        conn = self._connection()
+        try:
+            deleted = conn.execute(
+                "DELETE FROM summaries WHERE expires < ? OR (summary IS NULL AND expires < ?)",
+                (now - self.stale_ttl, now),
+            ).rowcount
+            if self.max_rows:
+                excess = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0] - self.max_rows
+                if excess > 0:
+                    deleted += conn.execute(
+                        "DELETE FROM summaries WHERE key IN "
+                        "(SELECT key FROM summaries ORDER BY expires LIMIT ?)", (excess,)
+                    ).rowcount
+            conn.commit()
+        except sqlite3.Error as e:
+            # Another process may hold the write lock; the next prune catches up
+            conn.rollback()
+            logger.warning(f"Pruning the Wikipedia cache failed: {e}")
+            return 0
+        return deleted
+
+    def summary(self, title, sentences=8):
+        key = hashlib.sha256(f"{sentences}:{normalize_title(title)}".encode("utf-8")).hexdigest()
+        row = self._lookup(key)
+        if row is not None and row[1] > time.time():
+            if row[0] is None:
+                raise LookupError(f"No Wikipedia summary for {title!r} (cached)")
+            return row[0]
+
+        try:
+            with stage("wiki_fetch"):
+                summary = self.source.summary(title, sentences)
+        except Exception as e:
+            if _is_miss(e):
+                self._store(key, None, self.negative_ttl)
+                raise LookupError(f"No Wikipedia summary for {title!r}") from e
+            if row is not None and row[0] is not None:
+                logger.warning(f"Wikipedia lookup failed, serving stale summary: {e}")
+                return row[0]
+            raise
+
+        self._store(key, summary, self.ttl)
+        return summary
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        print("usage: python -m Generator.wiki_cache build DUMP.jsonl INDEX.sqlite3")
+        sys.exit(2)
+    print(f"Indexed {build_offline_index(sys.argv[2], sys.argv[3])} summaries into {sys.argv[3]}")
@@ -0,0 +1,9 @@
+"""Offline benchmarks for the Generator package and the Flask server.
+
+Everything runs against tiny randomly initialised models and synthetic data
+(see benchmarks.stubs), so results are reproducible without network access
+or downloaded checkpoints. Run from the backend directory:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json --tolerance 0.25
+"""
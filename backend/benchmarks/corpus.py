@@ -0,0 +1,84 @@
+"""Deterministic synthetic study material of a requested size."""
+import random
+
+CONCEPTS = [
+    "solar energy", "photosynthesis", "cell membrane", "water cycle", "plate tectonics",
+    "supply chain", "market economy", "machine learning", "neural network", "chemical reaction",
+    "carbon dioxide", "climate change", "nervous system", "immune response", "electric current",
+    "magnetic field", "ancient civilization", "industrial revolution", "trade route", "river delta",
+    "ocean current", "food chain", "genetic code", "protein synthesis", "renewable resource",
+    "greenhouse gas", "urban planning", "public health", "data structure", "search algorithm",
+    "prime number", "linear equation", "probability theory", "plant cell", "animal habitat",
+    "volcanic eruption", "sound wave", "light spectrum", "human rights", "printing press",
+]
+
+PEOPLE = [
+    "Marie Curie", "Isaac Newton", "Ada Lovelace", "Charles Darwin", "Nikola Tesla",
+    "Rosalind Franklin", "Alan Turing", "Gregor Mendel", "Galileo Galilei", "Jane Goodall",
+]
+
+PLACES = [
+    "Paris", "London", "Egypt", "India", "Brazil", "Japan", "Kenya", "Canada", "Peru", "Norway",
+]
+
+VERBS = [
+    "explains", "describes", "influences", "transforms", "supports", "limits",
+    "connects", "measures", "reveals", "shapes", "improves", "reduces",
+]
+
+TEMPLATES = [
+    "The {c1} {verb} the {c2} in many different ways that students can observe.",
+    "In {year}, {person} studied how the {c1} {verb} the {c2} near {place}.",
+    "Scientists in {place} believe that the {c1} is closely related to the {c2}.",
+    "{person} wrote that understanding the {c1} helps people reason about the {c2}.",
+    "A careful study of the {c1} shows why the {c2} matters for everyday life.",
+    "Teachers often compare the {c1} with the {c2} to make the idea easier to remember.",
+    "During the {century} century, the {c1} changed how communities thought about the {c2}.",
+]
+
+
+def synthetic_sentence(rng):
+    c1, c2 = rng.sample(CONCEPTS, 2)
+    return rng.choice(TEMPLATES).format(
+        c1=c1, c2=c2, verb=rng.choice(VERBS), person=rng.choice(PEOPLE),
+        place=rng.choice(PLACES), year=rng.randint(1500, 2020), century=rng.choice(["17th", "18th", "19th", "20th"]),
+    )
+
+
+def synthetic_document(size, seed=0, sentences_per_paragraph=6):
+    """Returns roughly size characters of paragraphs built from educational-sounding sentences."""
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < size:
+        paragraph = " ".join(synthetic_sentence(rng) for _ in range(sentences_per_paragraph))
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 1
+    return "\n".join(paragraphs)[:size].rsplit(" ", 1)[0] + "."
+
+
+def vocabulary():
+    """Every word the synthetic corpus can produce."""
+    words = set()
+    for text in CONCEPTS + PEOPLE + PLACES + VERBS + TEMPLATES:
+        words.update(text.replace("{", " ").replace("}", " ").replace(".", " ").replace(",", " ").split())
+    words.update(str(year) for year in range(1500, 2021))
+    words.update(["17th", "18th", "19th", "20th"])
+    return sorted(words)
+
+
+def synthetic_questions(count, seed=0):
+    """Short questions of the kind the generators return, for the post-processing benchmarks."""
+    rng = random.Random(seed)
+    forms = [
+        "What is the {c1}?",
+        "How does the {c1} affect the {c2}?",
+        "Why did {person} study the {c1}?",
+        "Who explained the {c1} in {place}?",
+        "Is the {c1} related to the {c2}?",
+    ]
+    questions = []
+    for _ in range(count):
+        c1, c2 = rng.sample(CONCEPTS, 2)
+        questions.append(rng.choice(forms).format(c1=c1, c2=c2, person=rng.choice(PEOPLE), place=rng.choice(PLACES)))
+    return questions
@@ -0,0 +1,348 @@
+"""Load generator for the server's public endpoints.
+
+Sends a weighted mix of requests either to the app in-process (stub models,
+Flask test client) or to a running server (--url), in one of two modes:
+
+* closed loop (--concurrency 1,8,32): N workers send back-to-back requests
+  for --duration seconds per level;
+* open loop (--rate 2,5,10): requests arrive as a Poisson process at the
+  given rate per second, and latency is measured from the scheduled arrival,
+  so queueing inside the server shows up as latency. At most --max-workers
+  requests are outstanding; arrivals beyond that wait in the client, and
+  each step reports how many did ("client_delayed") and how long requests
+  waited before being sent ("client_wait_p50"/"client_wait_p95"), so
+  client-side queueing can be told apart from the server's.
+
+Each step reports p50/p95/p99 latency, throughput, error rate and resident
+memory growth, overall and per request type. --distinct controls how many
+different documents are used, so caching and request coalescing can be
+compared against cold traffic.
+
+    python -m benchmarks.loadtest --concurrency 1,4,16 --duration 30
+    python -m benchmarks.loadtest --url http://localhost:5000 --rate 1,2,4 --server-pid 1234
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import synthetic_document, synthetic_questions  # noqa: E402
+from benchmarks.run import parse_size, percentile, summarize  # noqa: E402
+
+DEFAULT_MIX = ("mcq=3,shortq=2,boolq=2,problems=1,mcq_hard=1,shortq_hard=1,boolq_hard=1,"
+               "shortq_answer=1,mcq_answer=1,boolean_answer=1,make_harder=1,upload=1")
+
+
+def rss_bytes(pid="self"):
+    """Resident set size of a process from /proc, or None where unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid == "self":
+        import resource
+        # Peak rather than current RSS, but still shows growth
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return None
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in REQUEST_TYPES:
+            raise ValueError(f"Unknown request type {name!r}; choose from {sorted(REQUEST_TYPES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _json_request(path, body):
+    return "POST", path, json.dumps(body).encode("utf-8"), "application/json"
+
+
+def _upload_request(text):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"notes.txt\"\r\n"
+        f"Content-Type: text/plain\r\n\r\n{text}\r\n--{boundary}--\r\n"
+    ).encode("utf-8")
+    return "POST", "/upload", body, f"multipart/form-data; boundary={boundary}"
+
+
+def _generation(path, max_questions):
+    return lambda text: _json_request(path, {"input_text": text, "max_questions": max_questions})
+
+
+def _mcq_answer_request(max_questions):
+    def build(text):
+        words = [w.strip(".,") for w in text.split()[:4 * max_questions]]
+        options = [words[i:i + 4] or ["true", "false"] for i in range(0, 4 * max_questions, 4)]
+        return _json_request("/get_mcq_answer", {
+            "input_text": text, "input_question": synthetic_questions(max_questions), "input_options": options})
+    return build
+
+
+def _make_harder_request(text):
+    # One question per document, so --distinct also controls repetition here
+    return _json_request("/make_harder", {"question": synthetic_questions(1, seed=len(text))[0]})
+
+
+REQUEST_TYPES = {
+    "mcq": lambda mq: _generation("/get_mcq", mq),
+    "shortq": lambda mq: _generation("/get_shortq", mq),
+    "boolq": lambda mq: _generation("/get_boolq", mq),
+    "mcq_hard": lambda mq: _generation("/get_mcq_hard", mq),
+    "shortq_hard": lambda mq: _generation("/get_shortq_hard", mq),
+    "boolq_hard": lambda mq: _generation("/get_boolq_hard", mq),
+    "problems": lambda mq: lambda text: _json_request("/get_problems", {
+        "input_text": text, "max_questions_mcq": mq, "max_questions_boolq": mq, "max_questions_shortq": mq}),
+    "shortq_answer": lambda mq: lambda text: _json_request("/get_shortq_answer", {
+        "input_text": text, "input_question": synthetic_questions(mq)}),
+    "mcq_answer": _mcq_answer_request,
+    "boolean_answer": lambda mq: lambda text: _json_request("/get_boolean_answer", {
+        "input_text": text, "input_question": synthetic_questions(mq)}),
+    "make_harder": lambda mq: _make_harder_request,
+    "upload": lambda mq: _upload_request,
+}
+
+
+class InProcessTarget:
+    """Sends requests to the Flask app through its test client."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def send(self, method, path, body, content_type):
+        response = self.app.test_client().open(path, method=method, data=body, content_type=content_type)
+        return response.status_code
+
+    def server_rss(self):
+        return rss_bytes()
+
+
+class HttpTarget:
+    """Sends requests to a running server over HTTP."""
+
+    def __init__(self, url, timeout=600, server_pid=None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.server_pid = server_pid
+
+    def send(self, method, path, body, content_type):
+        req = urllib.request.Request(self.url + path, data=body, method=method,
+                                     headers={"Content-Type": content_type})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def server_rss(self):
+        return rss_bytes(self.server_pid) if self.server_pid else None
+
+
+class Workload:
+    """Draws weighted request types and documents reproducibly."""
+
+    def __init__(self, mix, documents, max_questions, seed=0):
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.builders = {name: REQUEST_TYPES[name](max_questions) for name in self.names}
+        self.documents = documents
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            name = self._rng.choices(self.names, self.weights)[0]
+            text = self._rng.choice(self.documents)
+        return name, self.builders[name](text)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.client_waits = []
+        self.client_delayed = 0
+        self._lock = threading.Lock()
+
+    def add_client_wait(self, wait, delayed):
+        with self._lock:
+            self.client_waits.append(wait)
+            self.client_delayed += delayed
+
+    def add(self, name, latency, ok):
+        with self._lock:
+            if ok:
+                self.latencies[name].append(latency)
+            else:
+                self.errors[name] += 1
+
+    def report(self, wall_time):
+        names = sorted(set(self.latencies) | set(self.errors))
+        overall = [latency for name in names for latency in self.latencies[name]]
+        errors = sum(self.errors.values())
+        report = summarize(overall, wall_time, errors)
+        report["error_rate"] = errors / max(1, errors + len(overall))
+        report["by_type"] = {name: summarize(self.latencies[name], wall_time, self.errors[name]) for name in names}
+        if self.client_waits:
+            report["client_delayed"] = self.client_delayed
+            report["client_wait_p50"] = percentile(self.client_waits, 0.50)
+            report["client_wait_p95"] = percentile(self.client_waits, 0.95)
+        return report
+
+
+def _issue(target, workload, recorder, scheduled=None, delayed=False):
+    name, (method, path, body, content_type) = workload.next()
+    start = scheduled if scheduled is not None else time.perf_counter()
+    if scheduled is not None:
+        recorder.add_client_wait(time.perf_counter() - scheduled, delayed)
+    try:
+        ok = 200 <= target.send(method, path, body, content_type) < 300
+    except Exception:
+        ok = False
+    recorder.add(name, time.perf_counter() - start, ok)
+
+
+def closed_loop(target, workload, concurrency, duration):
+    """concurrency workers send requests back to back for duration seconds."""
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            _issue(target, workload, recorder)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.report(time.perf_counter() - start)
+
+
+def open_loop(target, workload, rate, duration, max_workers, seed=0):
+    """Poisson arrivals at rate per second for duration seconds; latency includes queueing,
+    on the client too once max_workers requests are outstanding (reported as client_delayed).
+    """
+    recorder = Recorder()
+    rng = random.Random(seed)
+    outstanding = [0]
+    lock = threading.Lock()
+
+    def issue(arrival, delayed):
+        try:
+            _issue(target, workload, recorder, arrival, delayed)
+        finally:
+            with lock:
+                outstanding[0] -= 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        arrival = start
+        while True:
+            arrival += rng.expovariate(rate)
+            if arrival - start > duration:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with lock:
+                delayed = outstanding[0] >= max_workers
+                outstanding[0] += 1
+            pool.submit(issue, arrival, delayed)
+    return recorder.report(time.perf_counter() - start)
+
+
+def run_steps(target, workload, args):
+    steps = []
+    if args.rate:
+        levels = [("rate", float(r)) for r in args.rate.split(",") if r.strip()]
+    else:
+        levels = [("concurrency", int(c)) for c in args.concurrency.split(",") if c.strip()]
+
+    for mode, level in levels:
+        rss_before = target.server_rss()
+        if mode == "rate":
+            report = open_loop(target, workload, level, args.duration, args.max_workers, args.seed)
+        else:
+            report = closed_loop(target, workload, level, args.duration)
+        rss_after = target.server_rss()
+        report.update({
+            "mode": mode, "level": level,
+            "rss_before": rss_before, "rss_after": rss_after,
+            "rss_growth": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        })
+        steps.append(report)
+
+        growth = report["rss_growth"]
+        growth_text = f"{growth / 2 ** 20:+.1f}MiB" if growth is not None else "n/a"
+        print(f"{mode}={level:<6} n={report['count']:<5} p50={report['p50'] * 1000:8.1f}ms "
+              f"p95={report['p95'] * 1000:8.1f}ms p99={report['p99'] * 1000:8.1f}ms "
+              f"{report['throughput']:6.2f}/s errors={report['error_rate']:.1%} rss={growth_text}"
+              + (f" client_delayed={report['client_delayed']}" if "client_delayed" in report else ""), flush=True)
+    return steps
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the EduAid server")
+    parser.add_argument("--url", help="Target a running server instead of the in-process app with stub models")
+    parser.add_argument("--server-pid", help="PID of the --url server, to report its memory growth")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted request types (default {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", default="1,4,16", help="Closed-loop concurrency levels")
+    parser.add_argument("--rate", help="Open-loop arrival rates in requests/second (overrides --concurrency)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per level")
+    parser.add_argument("--max-workers", type=int, default=64, help="Open-loop cap on outstanding requests")
+    parser.add_argument("--size", default="5k", help="Document size in characters")
+    parser.add_argument("--distinct", type=int, default=8, help="Number of distinct documents in the pool")
+    parser.add_argument("--max-questions", type=int, default=4)
+    parser.add_argument("--max-new-tokens", type=int, default=32, help="Output length of the stub T5 model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="Write the step reports as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    mix = parse_mix(args.mix)
+    size = parse_size(args.size)
+    documents = [synthetic_document(size, seed=args.seed + i) for i in range(args.distinct)]
+    workload = Workload(mix, documents, args.max_questions, args.seed)
+
+    if args.url:
+        target = HttpTarget(args.url, server_pid=args.server_pid)
+    else:
+        from benchmarks.stubs import StubModels, load_server
+        server = load_server(StubModels(max_new_tokens=args.max_new_tokens, seed=args.seed))
+        target = InProcessTarget(server.app)
+
+    steps = run_steps(target, workload, args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "steps": steps}, f, indent=2)
+        print(f"Wrote {len(steps)} steps to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
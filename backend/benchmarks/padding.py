@@ -0,0 +1,168 @@
+"""Encoder cost of padding generator batches to the model maximum vs dynamically.
+
+Builds batches of the multiple-choice / short-answer prompts for typical
+1-3 sentence contexts ("context: ... answer: ... </s>") and counts the
+encoder tokens and FLOPs of three padding strategies:
+
+    max       every text padded to ENCODE_MAX_LENGTH (the old pad_to_max_length=True)
+    longest   the batch padded to its longest text (Generator.encoding.encode)
+    buckets   texts sorted by length and padded per bucket (Generator.encoding.encode_buckets)
+
+FLOPs are analytic, per T5 encoder layer and sequence of n tokens:
+2n(4d^2 + 2 d d_ff) for the projections and feed-forward plus 4n^2 d for
+attention. With --measure, a randomly initialised encoder of the chosen
+shape also runs each batch and the best wall time is reported.
+
+The t5-large tokenizer is used if it is in the local Hugging Face cache,
+otherwise the benchmark stub tokenizer.
+
+    python -m benchmarks.padding --batch-sizes 4,16,64
+    python -m benchmarks.padding --model t5-base --measure
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import CONCEPTS, synthetic_sentence  # noqa: E402
+from Generator.encoding import ENCODE_BUCKET_SIZE, ENCODE_MAX_LENGTH, encode_buckets  # noqa: E402
+
+# Encoder shapes (d_model, d_ff, layers, heads) of the checkpoints the generators use
+PRESETS = {
+    "t5-base": (768, 3072, 12, 12),
+    "t5-large": (1024, 4096, 24, 16),
+}
+
+STRATEGIES = ("max", "longest", "buckets")
+
+
+def prompts(count, seed=0):
+    """count prompts, each a context of one to three sentences and an answer concept from it."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        context = " ".join(synthetic_sentence(rng) for _ in range(rng.randint(1, 3)))
+        answer = next((c for c in CONCEPTS if c in context), rng.choice(CONCEPTS))
+        texts.append(f"context: {context} answer: {answer} </s>")
+    return texts
+
+
+def load_tokenizer():
+    try:
+        from transformers import T5TokenizerFast
+
+        return "t5-large", T5TokenizerFast.from_pretrained("t5-large", local_files_only=True)
+    except Exception:
+        from benchmarks.stubs import build_tokenizer
+
+        return "stub", build_tokenizer()
+
+
+def encoder_flops(seq_len, model):
+    d, d_ff, layers, _ = PRESETS[model]
+    return layers * (2 * seq_len * (4 * d * d + 2 * d * d_ff) + 4 * seq_len * seq_len * d)
+
+
+def padded_batches(tokenizer, texts, strategy, max_length, bucket_size):
+    """The (input_ids, attention_mask) batches strategy would send to the encoder."""
+    if strategy == "buckets":
+        return [(ids, mask) for _, ids, mask in encode_buckets(tokenizer, texts, max_length, bucket_size)]
+    ((_, ids, mask),) = encode_buckets(tokenizer, texts, max_length, bucket_size=0)
+    if strategy == "max":
+        import torch
+
+        pad = max_length - ids.shape[1]
+        ids = torch.nn.functional.pad(ids, (0, pad), value=tokenizer.pad_token_id)
+        mask = torch.nn.functional.pad(mask, (0, pad), value=0)
+    return [(ids, mask)]
+
+
+def build_encoder(model, seed=0):
+    import torch
+    from transformers import T5Config, T5EncoderModel
+
+    d, d_ff, layers, heads = PRESETS[model]
+    torch.manual_seed(seed)
+    config = T5Config(d_model=d, d_ff=d_ff, d_kv=d // heads, num_layers=layers, num_heads=heads)
+    return T5EncoderModel(config).eval()
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(encoder, batches, repeat):
+    import torch
+
+    def run():
+        with torch.no_grad():
+            for ids, mask in batches:
+                encoder(input_ids=ids, attention_mask=mask)
+    return _best_of(run, repeat)
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Compare encoder cost of padding strategies")
+    parser.add_argument("--batch-sizes", default="1,4,16,64", help="Comma-separated prompts per batch")
+    parser.add_argument("--model", choices=sorted(PRESETS), default="t5-large", help="Encoder shape for FLOPs")
+    parser.add_argument("--max-length", type=int, default=ENCODE_MAX_LENGTH)
+    parser.add_argument("--bucket-size", type=int, default=ENCODE_BUCKET_SIZE)
+    parser.add_argument("--measure", action="store_true", help="Also time a randomly initialised encoder")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    tokenizer_name, tokenizer = load_tokenizer()
+    encoder = build_encoder(args.model, args.seed) if args.measure else None
+    print(f"tokenizer {tokenizer_name}, {args.model} encoder FLOPs, max length {args.max_length}")
+    results = {}
+
+    for size in [int(s) for s in args.batch_sizes.split(",") if s.strip()]:
+        texts = prompts(size, seed=args.seed)
+        row = {}
+        for strategy in STRATEGIES:
+            batches = padded_batches(tokenizer, texts, strategy, args.max_length, args.bucket_size)
+            row[strategy] = {
+                "tokens": sum(ids.numel() for ids, _ in batches),
+                "real_tokens": sum(int(mask.sum()) for _, mask in batches),
+                "gflops": sum(ids.shape[0] * encoder_flops(ids.shape[1], args.model) for ids, _ in batches) / 1e9,
+            }
+            if encoder is not None:
+                row[strategy]["seconds"] = measure(encoder, batches, args.repeat)
+        for strategy in STRATEGIES[1:]:
+            row[strategy]["flops_saved"] = 1 - row[strategy]["gflops"] / row["max"]["gflops"]
+
+        line = f"batch {size:>4}"
+        for strategy in STRATEGIES:
+            r = row[strategy]
+            line += f"  {strategy} {r['tokens']:>7} tok {r['gflops']:>9.1f} GFLOP"
+            if "seconds" in r:
+                line += f" {r['seconds'] * 1000:8.1f}ms"
+        line += f"  saved {row['longest']['flops_saved']:.1%} / {row['buckets']['flops_saved']:.1%}"
+        print(line, flush=True)
+        results[size] = row
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "tokenizer": tokenizer_name, "results": results}, f, indent=2)
+        print(f"Wrote results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""Latency and throughput benchmarks for the generators and the server endpoints.
+
+Function benchmarks call Generator code directly. Endpoint benchmarks drive
+the Flask app through its test client from a pool of threads. Each case runs
+per document size and concurrency level, and the summary statistics are
+written as JSON.
+
+With --baseline, results are compared against an earlier run and any case
+whose median latency grew by more than --tolerance is reported as a
+regression (exit status 1). Every run also times a fixed CPU calibration
+workload, and baseline latencies are scaled by the ratio of the two
+calibration times, so a baseline recorded on another machine stays
+comparable. No reference run is committed: record one with --write-baseline
+(to benchmarks/baseline.json) or --output, then pass --baseline.
+
+    python -m benchmarks.run --sizes 1k,10k,100k --concurrency 1,4 --output results.json
+    python -m benchmarks.run --only endpoints --baseline results.json
+    python -m benchmarks.run --write-baseline
+    python -m benchmarks.run --baseline
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import synthetic_document, synthetic_questions  # noqa: E402
+
+DEFAULT_SIZES = "1k,10k,100k,500k"
+DEFAULT_CONCURRENCY = "1,4"
+# Inputs above this many characters need large_document mode on the server
+MAX_INPUT_LENGTH = 50000
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baseline.json")
+
+
+def parse_size(value):
+    value = value.strip().lower()
+    multiplier = 1
+    if value.endswith("k"):
+        multiplier, value = 1000, value[:-1]
+    elif value.endswith("m"):
+        multiplier, value = 1000 * 1000, value[:-1]
+    return int(float(value) * multiplier)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(latencies, wall_time, errors=0):
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+        "min": min(latencies) if latencies else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies) if latencies else 0.0,
+        "throughput": len(latencies) / wall_time if wall_time > 0 else 0.0,
+    }
+
+
+def run_case(fn, requests, concurrency, warmup=1):
+    """Calls fn(i) requests times from concurrency threads and summarizes per-call latency.
+    fn returns False (or raises) to count the call as an error.
+    """
+    for i in range(warmup):
+        fn(-1 - i)
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            ok = fn(i) is not False
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Benchmark call failed: {e}")
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        outcomes = [timed(i) for i in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, range(requests)))
+    wall_time = time.perf_counter() - start
+    latencies = [latency for latency, ok in outcomes if ok]
+    return summarize(latencies, wall_time, errors=sum(1 for _, ok in outcomes if not ok))
+
+
+class DocumentSource:
+    """Synthetic documents by size; fresh=True gives every call its own text so caches stay cold."""
+
+    def __init__(self, fresh=True):
+        self.fresh = fresh
+        self._cache = {}
+
+    def text(self, size, i=0):
+        seed = i if self.fresh else 0
+        key = (size, seed)
+        if key not in self._cache:
+            self._cache[key] = synthetic_document(size, seed=seed)
+        return self._cache[key]
+
+
+def function_cases(generators, stubs, docs, max_questions):
+    """(name, max_size, fn(size) -> fn(i)) for the Generator functions."""
+    from Generator import mcq
+    from Generator.question_filters import make_question_harder
+    from Generator.sentence_index import SentenceIndex
+
+    mcq_gen = generators["MCQGenerator"]
+    shortq_gen = generators["ShortQGenerator"]
+    boolq_gen = generators["BoolQGenerator"]
+    qg = generators["QuestionGenerator"]
+    evaluator = generators["QAEvaluator"]
+    questions = synthetic_questions(64)
+
+    def large(size):
+        return size > MAX_INPUT_LENGTH
+
+    def keywords(text):
+        sentences = mcq.tokenize_into_sentences(text)
+        return mcq.identify_keywords(stubs.nlp, " ".join(sentences), max_questions * 2, stubs.s2v, stubs.fdist,
+                                     stubs.normalized_levenshtein, len(sentences))
+
+    return [
+        ("mcq.tokenize_into_sentences", None,
+         lambda size: lambda i: mcq.tokenize_into_sentences(docs.text(size, i))),
+        ("SentenceIndex.build", None,
+         lambda size: lambda i: SentenceIndex(mcq.tokenize_into_sentences(docs.text(size, i)))),
+        ("mcq.identify_keywords", MAX_INPUT_LENGTH,
+         lambda size: lambda i: keywords(docs.text(size, i))),
+        ("MCQGenerator.generate_mcq", None,
+         lambda size: lambda i: mcq_gen.generate_mcq({
+             "input_text": docs.text(size, i), "max_questions": max_questions, "large_document": large(size)})),
+        ("ShortQGenerator.generate_shortq", None,
+         lambda size: lambda i: shortq_gen.generate_shortq({
+             "input_text": docs.text(size, i), "max_questions": max_questions, "large_document": large(size)})),
+        ("BoolQGenerator.generate_boolq", 10000,
+         lambda size: lambda i: boolq_gen.generate_boolq({
+             "input_text": docs.text(size, i), "max_questions": max_questions})),
+        ("QuestionGenerator.generate[sentences]", 10000,
+         lambda size: lambda i: qg.generate(docs.text(size, i), num_questions=max_questions, answer_style="sentences")),
+        ("QuestionGenerator.generate[multiple_choice]", 10000,
+         lambda size: lambda i: qg.generate(docs.text(size, i), num_questions=max_questions,
+                                            answer_style="multiple_choice")),
+        ("QAEvaluator.score", 0,
+         lambda size: lambda i: evaluator.get_scores(evaluator.encode_qa_pairs(questions[:16], questions[16:32]))),
+        ("question_filters.make_question_harder", 0,
+         lambda size: lambda i: [make_question_harder(q) for q in questions]),
+    ]
+
+
+def endpoint_cases(docs, max_questions):
+    """(name, max_size, fn(app, size) -> fn(i)) for the server endpoints."""
+
+    def payload(size, i):
+        body = {"input_text": docs.text(size, i), "max_questions": max_questions}
+        if size > MAX_INPUT_LENGTH:
+            body["large_document"] = True
+        return body
+
+    # A test client per call keeps concurrent callers from sharing client state
+    def post(app, path, body):
+        return app.test_client().post(path, json=body).status_code == 200
+
+    def upload(app, size, i):
+        data = {"file": (io.BytesIO(docs.text(size, i).encode("utf-8")), f"notes-{i}.txt")}
+        return app.test_client().post("/upload", data=data, content_type="multipart/form-data").status_code == 200
+
+    questions = synthetic_questions(8)
+    return [
+        ("POST /get_mcq", None, lambda app, size: lambda i: post(app, "/get_mcq", payload(size, i))),
+        ("POST /get_shortq", None, lambda app, size: lambda i: post(app, "/get_shortq", payload(size, i))),
+        ("POST /get_boolq", 10000, lambda app, size: lambda i: post(app, "/get_boolq", payload(size, i))),
+        ("POST /get_problems", 10000, lambda app, size: lambda i: post(app, "/get_problems", {
+            "input_text": docs.text(size, i), "max_questions_mcq": max_questions,
+            "max_questions_boolq": max_questions, "max_questions_shortq": max_questions})),
+        ("POST /get_shortq_hard", 10000, lambda app, size: lambda i: post(app, "/get_shortq_hard", payload(size, i))),
+        ("POST /get_mcq_hard", 10000, lambda app, size: lambda i: post(app, "/get_mcq_hard", payload(size, i))),
+        ("POST /get_shortq_answer", 10000, lambda app, size: lambda i: post(app, "/get_shortq_answer", {
+            "input_text": docs.text(size, i), "input_question": questions})),
+        ("POST /get_boolean_answer", 10000, lambda app, size: lambda i: post(app, "/get_boolean_answer", {
+            "input_text": docs.text(size, i), "input_question": questions})),
+        ("POST /upload", None, lambda app, size: lambda i: upload(app, size, i)),
+    ]
+
+
+def _applies(max_size, size):
+    if max_size == 0:
+        # Size-independent case: run once, reported with size 0
+        return size is None
+    return size is not None and (max_size is None or size <= max_size)
+
+
+def run(args):
+    import torch
+    from benchmarks.stubs import StubModels, load_server, make_generators
+
+    torch.manual_seed(args.seed)
+    stubs = StubModels(max_new_tokens=args.max_new_tokens, seed=args.seed)
+    docs = DocumentSource(fresh=not args.warm)
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    results = []
+
+    def record(kind, name, size, concurrency, fn):
+        requests = max(args.requests, concurrency)
+        stats = run_case(fn, requests, concurrency, warmup=args.warmup)
+        result = {"kind": kind, "name": name, "size": size or 0, "concurrency": concurrency, **stats}
+        results.append(result)
+        print(f"{kind:9} {name:45} size={size or 0:>7} c={concurrency:<3} "
+              f"p50={stats['p50'] * 1000:9.1f}ms p95={stats['p95'] * 1000:9.1f}ms "
+              f"{stats['throughput']:7.2f}/s errors={stats['errors']}", flush=True)
+
+    if args.only in (None, "functions"):
+        generators = make_generators(stubs)
+        for name, max_size, factory in function_cases(generators, stubs, docs, args.max_questions):
+            if args.filter and args.filter not in name:
+                continue
+            for size in [None] + sizes:
+                if _applies(max_size, size):
+                    # Generators share models, so function cases run one call at a time
+                    record("function", name, size, 1, factory(size))
+
+    if args.only in (None, "endpoints"):
+        server = load_server(stubs)
+        for name, max_size, factory in endpoint_cases(docs, args.max_questions):
+            if args.filter and args.filter not in name:
+                continue
+            for size in [None] + sizes:
+                if not _applies(max_size, size):
+                    continue
+                for concurrency in levels:
+                    record("endpoint", name, size, concurrency, factory(server.app, size))
+
+    return results
+
+
+def calibrate(repeat=5):
+    """Best time of a fixed Python and torch workload, used to scale baselines between machines."""
+    import torch
+
+    generator = torch.Generator().manual_seed(0)
+    a = torch.rand(256, 256, generator=generator)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sum(len(str(i)) for i in range(200000))
+        for _ in range(20):
+            a = torch.tanh(a @ a)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def metadata(args, calibration=None):
+    import torch
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "calibration": calibration,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "args": vars(args),
+    }
+
+
+def _case_key(result):
+    return result["kind"], result["name"], result["size"], result["concurrency"]
+
+
+def compare(results, baseline, tolerance, scale=1.0):
+    """Returns (regressions, improvements) as lists of (result, baseline_result, ratio) on median latency.
+    Baseline latencies are multiplied by scale before comparing.
+    """
+    previous = {_case_key(r): r for r in baseline.get("results", [])}
+    regressions, improvements = [], []
+    for result in results:
+        old = previous.get(_case_key(result))
+        if not old or not old.get("p50") or not result.get("p50"):
+            continue
+        ratio = result["p50"] / (old["p50"] * scale)
+        if ratio > 1 + tolerance:
+            regressions.append((result, old, ratio))
+        elif ratio < 1 / (1 + tolerance):
+            improvements.append((result, old, ratio))
+    return regressions, improvements
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Offline EduAid benchmarks with stub models")
+    parser.add_argument("--only", choices=["functions", "endpoints"], help="Run only one group of cases")
+    parser.add_argument("--filter", help="Run only cases whose name contains this string")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Document sizes in characters, e.g. 1k,10k,500k")
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY, help="Endpoint concurrency levels, e.g. 1,4,8")
+    parser.add_argument("--requests", type=int, default=5, help="Measured calls per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured calls before each case")
+    parser.add_argument("--max-questions", type=int, default=4)
+    parser.add_argument("--max-new-tokens", type=int, default=32, help="Output length of the stub T5 model")
+    parser.add_argument("--warm", action="store_true", help="Reuse one document per size so caches are hit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE,
+                        help="Compare against results previously written with --output "
+                             "(without a path: the run saved by --write-baseline)")
+    parser.add_argument("--write-baseline", action="store_true",
+                        help=f"Also write the results to {os.path.relpath(DEFAULT_BASELINE, BACKEND_DIR)}")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p50 slowdown")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_arguments(argv)
+    calibration = calibrate()
+    results = run(args)
+    report = {"meta": metadata(args, calibration), "results": results}
+
+    for path in [args.output] + ([DEFAULT_BASELINE] if args.write_baseline else []):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Wrote {len(results)} results to {path}")
+
+    if not args.baseline:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; create one with --output or --write-baseline")
+        return 2
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = baseline.get("meta", {}).get("calibration")
+    scale = calibration / previous if previous else 1.0
+    print(f"Comparing against {args.baseline} (calibration {calibration * 1000:.1f}ms, "
+          f"baseline latencies scaled x{scale:.2f})")
+    regressions, improvements = compare(results, baseline, args.tolerance, scale)
+    for result, old, ratio in improvements:
+        print(f"faster   {result['name']} size={result['size']} c={result['concurrency']}: "
+              f"{old['p50'] * 1000:.1f}ms -> {result['p50'] * 1000:.1f}ms ({ratio:.2f}x)")
+    for result, old, ratio in regressions:
+        print(f"SLOWER   {result['name']} size={result['size']} c={result['concurrency']}: "
+              f"{old['p50'] * 1000:.1f}ms -> {result['p50'] * 1000:.1f}ms ({ratio:.2f}x)")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%} tolerance")
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Tiny randomly initialised stand-ins for the production models.
+
+The stubs keep the real code paths, with real transformers generate/forward
+calls, a fast tokenizer, spaCy and NLTK, but use models small enough to load
+instantly without any network access. Only en_core_web_sm and the NLTK data
+that the server already needs must be installed.
+"""
+import contextlib
+import os
+import tempfile
+import zlib
+
+import numpy as np
+import torch
+from collections import Counter
+from tokenizers import Tokenizer, models, pre_tokenizers, processors
+from transformers import (
+    BertConfig, BertForQuestionAnswering, BertForSequenceClassification, PreTrainedTokenizerFast,
+    T5Config, T5ForConditionalGeneration, pipeline,
+)
+
+from benchmarks.corpus import CONCEPTS, synthetic_document, vocabulary
+
+SPECIAL_TOKENS = ["<pad>", "</s>", "<unk>", "[CLS]", "[SEP]", "[MASK]"]
+PROMPT_TOKENS = [
+    "context", "answer", "question", "truefalse", "passage", "paraphrase", "True", "False",
+    "<answer>", "<context>", ":", ".", ",", "?", "!", "(", ")", "'", "\"", "-",
+]
+
+
+def build_tokenizer(model_max_length=512):
+    """Word-level fast tokenizer over the synthetic corpus vocabulary, T5-style (pad=0, eos=1)."""
+    words = SPECIAL_TOKENS + PROMPT_TOKENS + [w for w in vocabulary() if w not in PROMPT_TOKENS]
+    words += [w.lower() for w in words if w.lower() not in words]
+    vocab = {}
+    for word in words:
+        vocab.setdefault(word, len(vocab))
+
+    tokenizer = Tokenizer(models.WordLevel(vocab=vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Sequence([
+        pre_tokenizers.WhitespaceSplit(), pre_tokenizers.Punctuation(),
+    ])
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="$A </s>", pair="$A </s> $B:1 </s>:1",
+        special_tokens=[("</s>", vocab["</s>"])],
+    )
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, model_max_length=model_max_length,
+        pad_token="<pad>", eos_token="</s>", unk_token="<unk>",
+        cls_token="[CLS]", sep_token="[SEP]", mask_token="[MASK]",
+    )
+
+
+class StubT5(T5ForConditionalGeneration):
+    """T5 whose generate() output length is capped, since random weights rarely emit EOS."""
+
+    max_new_tokens = 32
+
+    def generate(self, *args, **kwargs):
+        kwargs["max_length"] = min(kwargs.get("max_length") or self.max_new_tokens, self.max_new_tokens)
+        return super().generate(*args, **kwargs)
+
+
+def build_t5(vocab_size, max_new_tokens=32, seed=0):
+    torch.manual_seed(seed)
+    config = T5Config(
+        vocab_size=vocab_size, d_model=32, d_ff=64, d_kv=16, num_layers=2, num_decoder_layers=2,
+        num_heads=2, pad_token_id=0, eos_token_id=1, decoder_start_token_id=0,
+    )
+    model = StubT5(config)
+    model.max_new_tokens = max_new_tokens
+    return model.eval()
+
+
+def _bert_config(vocab_size, **kwargs):
+    return BertConfig(
+        vocab_size=vocab_size, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=512, pad_token_id=0, **kwargs,
+    )
+
+
+def build_bert_classifier(vocab_size, num_labels, seed=0):
+    torch.manual_seed(seed)
+    return BertForSequenceClassification(_bert_config(vocab_size, num_labels=num_labels)).eval()
+
+
+def build_bert_qa(vocab_size, seed=0):
+    torch.manual_seed(seed)
+    return BertForQuestionAnswering(_bert_config(vocab_size)).eval()
+
+
+class SyntheticSense2Vec:
+    """Small in-memory stand-in for sense2vec with the two methods the generators call.
+
+    Known keys come from the corpus concepts; other multi-word keys are accepted
+    deterministically (about three in four) so keyword selection finds answers.
+    """
+
+    def __init__(self, keys=None, dim=32, size=2000, seed=0):
+        rng = np.random.default_rng(seed)
+        keys = list(keys if keys is not None else CONCEPTS)
+        words = vocabulary()
+        while len(keys) < size:
+            keys.append("_".join(rng.choice(words, 2)))
+        self.keys = [f"{key.replace(' ', '_').lower()}|NOUN" for key in keys]
+        self._rows = {key: i for i, key in enumerate(self.keys)}
+        vectors = rng.standard_normal((len(self.keys), dim)).astype(np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.dim = dim
+
+    def get_best_sense(self, word):
+        key = f"{word.lower()}|NOUN"
+        if key in self._rows or zlib.crc32(key.encode("utf-8")) % 4:
+            return key
+        return None
+
+    def _vector(self, key):
+        row = self._rows.get(key)
+        if row is not None:
+            return self.vectors[row]
+        vector = np.random.default_rng(zlib.crc32(key.encode("utf-8"))).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def most_similar(self, key, n=10):
+        scores = self.vectors @ self._vector(key)
+        best = np.argsort(-scores)[:n + 1]
+        return [(self.keys[i], float(scores[i])) for i in best if self.keys[i] != key][:n]
+
+
+def build_fdist(seed=0):
+    """Word frequencies from a synthetic corpus, standing in for nltk's Brown FreqDist."""
+    return Counter(synthetic_document(200_000, seed=seed).lower().split())
+
+
+class StubModels:
+    """All stand-in models, built once and shared by the generator stubs."""
+
+    def __init__(self, max_new_tokens=32, seed=0):
+        import spacy
+        from similarity.normalized_levenshtein import NormalizedLevenshtein
+
+        self.device = torch.device("cpu")
+        self.tokenizer = build_tokenizer()
+        vocab_size = len(self.tokenizer)
+        self.t5 = build_t5(vocab_size, max_new_tokens, seed)
+        self.qae = build_bert_classifier(vocab_size, 2, seed)
+        self.nli = build_bert_classifier(vocab_size, 3, seed)
+        self.qa = build_bert_qa(vocab_size, seed)
+        self.nlp = spacy.load("en_core_web_sm")
+        self.s2v = SyntheticSense2Vec(seed=seed)
+        self.fdist = build_fdist(seed)
+        self.normalized_levenshtein = NormalizedLevenshtein()
+
+    def qa_pipeline(self):
+        return pipeline("question-answering", model=self.qa, tokenizer=self.tokenizer, device=-1)
+
+
+def _keyword_generator(cls, stubs):
+    generator = cls.__new__(cls)
+    generator.tokenizer = stubs.tokenizer
+    generator.model = stubs.t5
+    generator.device = stubs.device
+    generator.nlp = stubs.nlp
+    generator.s2v = stubs.s2v
+    generator.fdist = stubs.fdist
+    generator.normalized_levenshtein = stubs.normalized_levenshtein
+    return generator
+
+
+def make_generators(stubs, cache_dir=None):
+    """Builds every Generator.main class around the stub models, bypassing their __init__."""
+    from Generator import main
+    from Generator.document_cache import ExtractedTextCache
+
+    boolq = main.BoolQGenerator.__new__(main.BoolQGenerator)
+    boolq.tokenizer, boolq.model, boolq.device = stubs.tokenizer, stubs.t5, stubs.device
+
+    answer = main.AnswerPredictor.__new__(main.AnswerPredictor)
+    answer.tokenizer, answer.model, answer.device = stubs.tokenizer, stubs.t5, stubs.device
+    answer.nli_tokenizer, answer.nli_model = stubs.tokenizer, stubs.nli
+
+    evaluator = main.QAEvaluator.__new__(main.QAEvaluator)
+    evaluator.SEQ_LENGTH = 512
+    evaluator.device = stubs.device
+    evaluator.qae_tokenizer, evaluator.qae_model = stubs.tokenizer, stubs.qae
+
+    qg = main.QuestionGenerator.__new__(main.QuestionGenerator)
+    qg.ANSWER_TOKEN, qg.CONTEXT_TOKEN, qg.SEQ_LENGTH = "<answer>", "<context>", 512
+    qg.device = stubs.device
+    qg.qg_tokenizer, qg.qg_model = stubs.tokenizer, stubs.t5
+    qg.qa_evaluator = evaluator
+    qg._ner_nlp = stubs.nlp
+
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix="eduaid-bench-docs-")
+    return {
+        "MCQGenerator": _keyword_generator(main.MCQGenerator, stubs),
+        "ShortQGenerator": _keyword_generator(main.ShortQGenerator, stubs),
+        "BoolQGenerator": boolq,
+        "AnswerPredictor": answer,
+        "QuestionGenerator": qg,
+        "QAEvaluator": evaluator,
+        "FileProcessor": main.FileProcessor(cache=ExtractedTextCache(cache_dir)),
+    }
+
+
+@contextlib.contextmanager
+def _patched(obj, **attrs):
+    saved = {name: getattr(obj, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(obj, name, value)
+
+
+def load_server(stubs, work_dir=None):
+    """Imports server.py wired to the stub models and returns the module.
+
+    Caches go to a temporary directory, and nothing is fetched from the network:
+    model constructors are swapped for the stubs while the module initialises
+    and the QA pipeline is replaced afterwards.
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix="eduaid-bench-")
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    os.environ.setdefault("DOCUMENT_CACHE_DIR", os.path.join(work_dir, "documents"))
+    os.environ.setdefault("WIKI_CACHE_PATH", os.path.join(work_dir, "wiki.sqlite3"))
+    os.environ.setdefault("TRANSCRIPT_CACHE_DIR", os.path.join(work_dir, "transcripts"))
+    os.environ.setdefault("PROFILE_DIR", os.path.join(work_dir, "profiles"))
+
+    from Generator import main
+
+    generators = make_generators(stubs, os.environ["DOCUMENT_CACHE_DIR"])
+    factories = {name: (lambda g=generator: g) for name, generator in generators.items()
+                 if name not in ("QAEvaluator", "FileProcessor")}
+    factories["FileProcessor"] = lambda *args, **kwargs: generators["FileProcessor"]
+
+    with _patched(main, **factories):
+        import server
+    server.qa_model = stubs.qa_pipeline()
+    server.app.config["DEBUG"] = False
+    return server
@@ -0,0 +1,158 @@
+"""Fast vs slow tokenizer equivalence check and tokenization micro-benchmark.
+
+For each checkpoint the generators use, the slow (SentencePiece/Python) and
+fast (Rust) tokenizers encode the same texts: paragraphs of a synthetic
+document and the prompts each generator builds. Every text must map to
+identical input ids, otherwise the exit status is 1. The benchmark then
+times slow per-text calls, fast per-text calls and one fast batch call.
+
+Checkpoints are loaded from the local Hugging Face cache
+(run download_models.py first); missing ones are skipped.
+
+    python -m benchmarks.tokenization --size 100k
+    python -m benchmarks.tokenization --models t5-base --skip-benchmark
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import synthetic_document, synthetic_questions  # noqa: E402
+from benchmarks.run import parse_size  # noqa: E402
+
+# Checkpoint -> whether its generator encodes (text, text_pair)
+CHECKPOINTS = {
+    "t5-large": False,
+    "t5-base": False,
+    "iarfmoose/t5-base-question-generator": False,
+    "iarfmoose/bert-base-cased-qa-evaluator": True,
+    "typeform/distilbert-base-uncased-mnli": True,
+}
+
+
+def prompts(text, seed=0):
+    """The prompt formats built in Generator.main and Generator.mcq, over text's paragraphs."""
+    paragraphs = [p for p in text.split("\n") if p]
+    questions = synthetic_questions(len(paragraphs), seed=seed)
+    singles = list(paragraphs)
+    pairs = []
+    for paragraph, question in zip(paragraphs, questions):
+        answer = " ".join(paragraph.split()[:3])
+        singles += [
+            f"context: {paragraph} answer: {answer} </s>",
+            f"truefalse: {paragraph} passage: {answer} </s>",
+            f"question: {question} <s> context: {paragraph} </s>",
+            f"paraphrase: {paragraph} </s>",
+            f"<answer> {answer} <context> {paragraph}",
+        ]
+        pairs.append((paragraph, question))
+        pairs.append((question, answer))
+    return singles, pairs
+
+
+def load_pair(name):
+    from transformers import AutoTokenizer
+
+    slow = AutoTokenizer.from_pretrained(name, use_fast=False, local_files_only=True)
+    fast = AutoTokenizer.from_pretrained(name, use_fast=True, local_files_only=True)
+    if not fast.is_fast:
+        raise ValueError(f"{name} has no fast tokenizer")
+    return slow, fast
+
+
+def _encode_each(tokenizer, texts, pairs):
+    if pairs:
+        return [tokenizer(a, b)["input_ids"] for a, b in texts]
+    return [tokenizer(t)["input_ids"] for t in texts]
+
+
+def _encode_batch(tokenizer, texts, pairs):
+    if pairs:
+        return tokenizer([a for a, _ in texts], [b for _, b in texts])["input_ids"]
+    return tokenizer(texts)["input_ids"]
+
+
+def check_equivalence(slow, fast, texts, pairs):
+    """Returns (number of texts compared, up to five mismatching texts)."""
+    mismatches = []
+    batched = _encode_batch(fast, texts, pairs)
+    for text, expected, actual in zip(texts, _encode_each(slow, texts, pairs), batched):
+        if expected != actual:
+            mismatches.append({"text": text, "slow": expected[:32], "fast": actual[:32]})
+    return len(texts), mismatches[:5]
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(slow, fast, texts, pairs, repeat=3):
+    timings = {
+        "slow_each": _best_of(lambda: _encode_each(slow, texts, pairs), repeat),
+        "fast_each": _best_of(lambda: _encode_each(fast, texts, pairs), repeat),
+        "fast_batch": _best_of(lambda: _encode_batch(fast, texts, pairs), repeat),
+    }
+    timings["speedup"] = timings["slow_each"] / timings["fast_batch"] if timings["fast_batch"] else None
+    return timings
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Check fast tokenizers against slow ones and time them")
+    parser.add_argument("--models", default=",".join(CHECKPOINTS), help="Comma-separated checkpoints")
+    parser.add_argument("--size", default="50k", help="Synthetic document size in characters")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-benchmark", action="store_true", help="Only check equivalence")
+    parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    singles, pairs = prompts(synthetic_document(parse_size(args.size), seed=args.seed), args.seed)
+    results = {}
+    failed = False
+
+    for name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        try:
+            slow, fast = load_pair(name)
+        except Exception as e:
+            print(f"{name:<42} skipped: {e}")
+            results[name] = {"skipped": str(e)}
+            continue
+
+        texts, use_pairs = (pairs, True) if CHECKPOINTS.get(name) else (singles, False)
+        compared, mismatches = check_equivalence(slow, fast, texts, use_pairs)
+        result = {"compared": compared, "mismatches": mismatches}
+        status = "identical" if not mismatches else f"{len(mismatches)}+ MISMATCHES"
+        line = f"{name:<42} {compared} texts {status}"
+        if not args.skip_benchmark:
+            result["timings"] = benchmark(slow, fast, texts, use_pairs, args.repeat)
+            t = result["timings"]
+            line += (f"  slow {t['slow_each'] * 1000:8.1f}ms  fast {t['fast_each'] * 1000:8.1f}ms"
+                     f"  batched {t['fast_batch'] * 1000:8.1f}ms  x{t['speedup']:.1f}")
+        print(line, flush=True)
+        for mismatch in mismatches:
+            print(f"    {mismatch}")
+        failed = failed or bool(mismatches)
+        results[name] = result
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+        print(f"Wrote results to {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,15 +14,17 @@ print(f"Downloading models to {HF_CACHE_DIR} ...")
 print("This may take 10-30 minutes depending on your internet speed.\n")
 
 from transformers import (
-    T5ForConditionalGeneration, T5Tokenizer,
+    T5ForConditionalGeneration, T5TokenizerFast,
     AutoModelForSequenceClassification, AutoTokenizer,
     AutoModelForSeq2SeqLM
 )
+# With FAST_START=1 these also write the local safetensors/tokenizer snapshots the server starts from
+from Generator.startup import load_pretrained, load_tokenizer
 
 models = [
-    ('T5Tokenizer', 't5-large'),
+    ('T5TokenizerFast', 't5-large'),
     ('T5ForConditionalGeneration', 'Roasters/Question-Generator'),
-    ('T5Tokenizer', 't5-base'),
+    ('T5TokenizerFast', 't5-base'),
     ('T5ForConditionalGeneration', 'Roasters/Boolean-Questions'),
     ('T5ForConditionalGeneration', 'Roasters/Answer-Predictor'),
 ]
@@ -30,10 +32,10 @@ models = [
 for model_type, model_name in models:
     print(f"  Downloading {model_name} ...")
     try:
-        if model_type == 'T5Tokenizer':
-            T5Tokenizer.from_pretrained(model_name)
+        if model_type == 'T5TokenizerFast':
+            load_tokenizer(T5TokenizerFast, model_name)
         elif model_type == 'T5ForConditionalGeneration':
-            T5ForConditionalGeneration.from_pretrained(model_name)
+            load_pretrained(T5ForConditionalGeneration, model_name)
         print(f"  ✓ {model_name} done\n")
     except Exception as e:
         print(f"  ✗ {model_name} failed: {e}\n")
@@ -48,21 +50,30 @@ try:
     qae = re.search(r"QAE_PRETRAINED\s*=\s*['\"]([^'\"]+)['\"]", content)
     nli = re.search(r"nli_model_name\s*=\s*['\"]([^'\"]+)['\"]", content)
     
-    for match, label in [(qg, 'QG'), (qae, 'QAE'), (nli, 'NLI')]:
+    # Same classes as Generator/main.py, so FAST_START snapshots match what the server loads
+    for match, label, model_cls in [(qg, 'QG', AutoModelForSeq2SeqLM),
+                                     (qae, 'QAE', AutoModelForSequenceClassification),
+                                     (nli, 'NLI', AutoModelForSequenceClassification)]:
         if match:
             name = match.group(1)
             print(f"  Downloading {label} model: {name} ...")
             try:
-                AutoTokenizer.from_pretrained(name, use_fast=False)
-                AutoModelForSeq2SeqLM.from_pretrained(name)
+                load_tokenizer(AutoTokenizer, name, use_fast=True)
+                load_pretrained(model_cls, name)
                 print(f"  ✓ {label} done\n")
             except Exception as e:
-                try:
-                    AutoModelForSequenceClassification.from_pretrained(name)
-                    print(f"  ✓ {label} done\n")
-                except Exception as e2:
-                    print(f"  ✗ {label} failed: {e2}\n")
+                print(f"  ✗ {label} failed: {e}\n")
 except Exception as e:
     print(f"Could not parse main.py for additional models: {e}")
 
+# Precompute the WordNet synonym table used by QuestionEnhancer
+try:
+    from Generator.nltk_utils import safe_nltk_download
+    from Generator.synonym_table import build_table, SYNONYM_TABLE_PATH
+    safe_nltk_download('corpora/wordnet')
+    print(f"  Building WordNet synonym table at {SYNONYM_TABLE_PATH} ...")
+    print(f"  ✓ {build_table()} entries\n")
+except Exception as e:
+    print(f"  ✗ WordNet synonym table failed: {e}\n")
+
 print("\nAll downloads complete! You can now start server.py")
@@ -0,0 +1,54 @@
+"""Gunicorn configuration for multi-process serving.
+
+The app, with all of its models, is loaded once in the master (preload_app).
+Weights are frozen into shared memory and the garbage collector is frozen
+before forking, so workers share model pages instead of copying them. Each
+worker gets an even share of the CPU cores for torch intra-op threads and,
+unless PDF_WORKERS is set, for its PDF extraction processes.
+
+    cd backend && gunicorn -c gunicorn.conf.py server:app
+
+Settings are read from the environment: WEB_BIND, WEB_WORKERS, WEB_THREADS,
+WEB_TIMEOUT and TORCH_THREADS_PER_WORKER.
+"""
+import gc
+import os
+import sys
+
+# Read by Generator.serving when the app is imported below
+os.environ.setdefault("EDUAID_PREFORK", "1")
+# Load every model family in the master so workers share the weights instead of each loading them
+os.environ.setdefault("MODEL_WARM", "all")
+
+bind = os.environ.get("WEB_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+# Each worker starts its own PDF extraction pool; split the cores rather than oversubscribe them
+os.environ.setdefault("PDF_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 2))
+# Generation on long documents can take minutes
+timeout = int(os.environ.get("WEB_TIMEOUT", 600))
+preload_app = True
+
+
+def when_ready(server):
+    # Keep the collector from touching (and so copying) the master's objects in workers
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Models loaded; forking {workers} workers")
+
+
+def post_fork(server, worker):
+    import torch
+    from Generator.serving import worker_threads
+
+    # Do not run inference in the master before forking: OpenMP pools do not survive fork
+    threads_per_worker = worker_threads(workers)
+    torch.set_num_threads(threads_per_worker)
+    server.log.info(f"Worker {worker.pid} using {threads_per_worker} torch threads")
+
+    # Warm up (and start the idle reaper) here rather than in the master; the worker accepts
+    # requests once this returns
+    app_module = sys.modules.get("server")
+    if app_module is not None and app_module.model_manager is not None:
+        app_module.model_manager.warm_up_loaded()
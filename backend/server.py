@@ -1,10 +1,10 @@
+import io
 import os
 import re
-import glob
 import json
 import random
 import logging
-import subprocess
+import time
 
 # Set environment variables for model caching BEFORE any AI imports
 # This prevents crashes when C: drive is full
@@ -12,11 +12,13 @@ os.environ['HF_HOME'] = 'D:/huggingface_cache'
 os.environ['TRANSFORMERS_CACHE'] = 'D:/huggingface_cache'
 os.makedirs('D:/huggingface_cache', exist_ok=True)
 
-from flask import Flask, request, jsonify
+# Time every import and model load below for the startup report
+from Generator import startup
+startup.install_import_timer()
+
+from flask import Flask, Request, Response, g, request, jsonify
 from flask_cors import CORS
 import nltk
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
 
 
 # Setup logging
@@ -28,11 +30,33 @@ safe_nltk_download('corpora/stopwords')
 safe_nltk_download('tokenizers/punkt_tab')
 
 from Generator import main
-from Generator.question_filters import make_question_harder
+from Generator.question_filters import make_question_harder, make_questions_harder
+from Generator.document_store import DocumentStore
+from Generator.singleflight import SingleFlight, canonical_key
+from Generator.seeding import derive_seed
+from Generator import metrics, profiling
+from Generator.model_manager import ModelManager, ModelUnavailable
+from Generator.inference_workers import INFERENCE_WORKERS, InferenceWorkers, RemoteModel
+from Generator.pdf_extraction import parse_page_range
+from Generator.document_cache import ExtractedTextCache
+from Generator.transcripts import (
+    TranscriptService, TranscriptError, TranscriptNotFound, TranscriptTimeout, TranscriptUnavailable, VIDEO_ID_RE
+)
+from Generator.wiki_cache import WikiSummaryCache, OfflineWikiSource, WIKI_OFFLINE_INDEX
 from mediawikiapi import MediaWikiAPI
 
+class InMemoryUploadRequest(Request):
+    """Keeps multipart uploads in memory instead of spooling them to temp files."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
+# Uploads are buffered in memory, so cap the request body size
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get("MAX_REQUEST_BYTES", 64 * 1024 * 1024))
 app.config['DEBUG'] = True  # Enable debug mode for better error visibility
 
 import traceback
@@ -58,70 +82,83 @@ CORS(app, resources={
     r"/*": {
         "origins": allowed_origins,
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"],
+        "allow_headers": ["Content-Type", "X-Profile"],
+        "expose_headers": ["Server-Timing", "X-Profile-Id"],
         "max_age": 3600
     }
 })
 
 logger.info("Flask app initialized")
 
-# Initialize generators
-try:
-    MCQGen = main.MCQGenerator()
-    logger.info("MCQGenerator loaded")
-except Exception as e:
-    logger.error(f"Failed to load MCQGenerator: {e}")
-    MCQGen = None
-
-try:
-    BoolQGen = main.BoolQGenerator()
-    logger.info("BoolQGenerator loaded")
-except Exception as e:
-    logger.error(f"Failed to load BoolQGenerator: {e}")
-    BoolQGen = None
-
-try:
-    ShortQGen = main.ShortQGenerator()
-    logger.info("ShortQGenerator loaded")
-except Exception as e:
-    logger.error(f"Failed to load ShortQGenerator: {e}")
-    ShortQGen = None
-
 try:
-    file_processor = main.FileProcessor()
+    file_processor = main.FileProcessor(cache=ExtractedTextCache())
     logger.info("FileProcessor loaded")
 except Exception as e:
     logger.error(f"Failed to load FileProcessor: {e}")
     file_processor = None
 
 try:
-    mediawikiapi = MediaWikiAPI()
-    logger.info("MediaWiki API initialized")
+    if WIKI_OFFLINE_INDEX:
+        wiki_source = OfflineWikiSource(WIKI_OFFLINE_INDEX)
+        logger.info(f"Using offline Wikipedia index: {WIKI_OFFLINE_INDEX}")
+    else:
+        wiki_source = MediaWikiAPI()
+        logger.info("MediaWiki API initialized")
+    wiki_summaries = WikiSummaryCache(wiki_source)
 except Exception as e:
     logger.warning(f"MediaWiki API unavailable: {e}")
-    mediawikiapi = None
+    wiki_summaries = None
+
+def load_qa_pipeline():
+    from transformers import pipeline
+    return pipeline("question-answering")
+
+
+MODEL_LOADERS = {
+    "mcq": main.MCQGenerator,
+    "shortq": main.ShortQGenerator,
+    "boolq": main.BoolQGenerator,
+    "answer": main.AnswerPredictor,
+    "qg": main.QuestionGenerator,
+    "qa": load_qa_pipeline,
+}
+
+# Initialize generators, in this process or in dedicated inference worker processes
+inference_workers = None
+model_manager = None
+if INFERENCE_WORKERS:
+    inference_workers = InferenceWorkers().start()
+    MCQGen, ShortQGen, BoolQGen, answer, qg, qa_model = (
+        RemoteModel(inference_workers, target) for target in ("mcq", "shortq", "boolq", "answer", "qg", "qa")
+    )
+    logger.info(f"Models served by inference workers: {', '.join(inference_workers.families)}")
+else:
+    # Each family loads on first use (or at startup if in MODEL_WARM) and unloads when idle
+    model_manager = ModelManager(MODEL_LOADERS).start()
+    MCQGen, ShortQGen, BoolQGen, answer, qg, qa_model = (
+        model_manager.proxy(name) for name in ("mcq", "shortq", "boolq", "answer", "qg", "qa")
+    )
+    logger.info(f"Model families loaded on demand; warm set: {model_manager.warm or 'none'}")
 
-# Initialize answer prediction models
-try:
-    answer = main.AnswerPredictor()
-    logger.info("AnswerPredictor loaded")
-except Exception as e:
-    logger.warning(f"AnswerPredictor unavailable: {e}")
-    answer = None
+# Cached, coalesced YouTube transcript fetching
+transcript_service = TranscriptService()
 
-try:
-    qg = main.QuestionGenerator()
-    logger.info("QuestionGenerator loaded")
-except Exception as e:
-    logger.warning(f"QuestionGenerator unavailable: {e}")
-    qg = None
+# Concurrent identical generation requests share one computation
+generation_flight = SingleFlight()
+metrics.REGISTRY.gauge("eduaid_coalescing_executed_total", "Generation requests that ran the models.",
+                       lambda: generation_flight.stats()["executed"], kind="counter")
+metrics.REGISTRY.gauge("eduaid_coalescing_coalesced_total", "Generation requests served by an identical in-flight request.",
+                       lambda: generation_flight.stats()["coalesced"], kind="counter")
+metrics.REGISTRY.gauge("eduaid_coalescing_in_flight", "Distinct generation requests currently running.",
+                       lambda: generation_flight.stats()["in_flight"])
 
-try:
-    qa_model = pipeline("question-answering")
-    logger.info("QA pipeline loaded")
-except Exception as e:
-    logger.warning(f"QA pipeline unavailable: {e}")
-    qa_model = None
+# Add a Server-Timing header with per-stage durations to every response
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+STARTED_AT = time.monotonic()
+
+# Registered documents and their precomputed artifacts, shared across endpoints
+document_store = DocumentStore()
 
 # Google Docs service - handle missing credentials gracefully
 SERVICE_ACCOUNT_FILE = './service_account_key.json'
@@ -138,7 +175,12 @@ else:
     logger.info("service_account_key.json not found - Google Forms feature disabled")
 
 
-def validate_input(input_text, max_length=50000):
+MAX_INPUT_LENGTH = 50000
+# Upper bound for requests that opt into large-document (map-reduce) mode
+MAX_LARGE_DOCUMENT_LENGTH = int(os.environ.get("MAX_LARGE_DOCUMENT_LENGTH", 5000000))
+
+
+def validate_input(input_text, max_length=MAX_INPUT_LENGTH):
     """Validate and sanitize input text"""
     if not isinstance(input_text, str):
         raise ValueError("Input must be a string")
@@ -148,6 +190,42 @@ def validate_input(input_text, max_length=50000):
         raise ValueError("Input text cannot be empty")
     return input_text.strip()
 
+def input_length_limit(data, allow_large=False):
+    """Return the maximum accepted input length for a request payload.
+
+    Only endpoints that map-reduce large documents pass allow_large; everywhere
+    else large_document is ignored and MAX_INPUT_LENGTH applies.
+    """
+    if allow_large and data.get("large_document"):
+        return MAX_LARGE_DOCUMENT_LENGTH
+    return MAX_INPUT_LENGTH
+
+def resolve_document(data, allow_large=False):
+    """Return the registered Document a request refers to.
+
+    Requests may pass a doc_id (or an upload's document_id) instead of input_text.
+    Raw input_text is validated and registered so its preprocessing is shared too.
+    The length limit is checked on every resolve, so a large document registered
+    through /documents or /upload is still rejected by endpoints without allow_large.
+    """
+    doc_id = data.get("doc_id") or data.get("document_id")
+    max_length = input_length_limit(data, allow_large)
+    if not doc_id:
+        return document_store.register(validate_input(data.get("input_text", ""), max_length))
+
+    doc_id = str(doc_id)
+    document = document_store.get(doc_id)
+    if document is None and file_processor:
+        # Fall back to the upload cache, e.g. after a restart
+        text = file_processor.cached_text(doc_id)
+        if text:
+            document = document_store.register(validate_input(text, MAX_LARGE_DOCUMENT_LENGTH), doc_id)
+    if document is None:
+        raise ValueError("Unknown doc_id")
+    if len(document.text) > max_length:
+        raise ValueError(f"Input exceeds maximum length of {max_length} characters")
+    return document
+
 def validate_max_questions(max_questions, min_val=1, max_val=50):
     """Validate max_questions parameter"""
     if not isinstance(max_questions, int) or max_questions < min_val or max_questions > max_val:
@@ -156,18 +234,124 @@ def validate_max_questions(max_questions, min_val=1, max_val=50):
 
 def process_input_text(input_text, use_mediawiki):
     """Process input text, optionally enriching with Wikipedia summary"""
-    if use_mediawiki == 1 and mediawikiapi:
+    if use_mediawiki == 1 and wiki_summaries:
         try:
-            input_text = mediawikiapi.summary(input_text, 8)
+            input_text = wiki_summaries.summary(input_text, 8)
         except Exception as e:
             logger.warning(f"Wikipedia enrichment failed: {e}")
     return input_text
 
+def enrich_document(document, use_mediawiki):
+    """Return the document to generate from, registering the Wikipedia summary when requested"""
+    text = process_input_text(document.text, use_mediawiki)
+    return document if text == document.text else document_store.register(text)
+
+def coalesce(endpoint, document, compute, **params):
+    """Run compute() once for concurrent requests with the same endpoint, document and params.
+    The result is shared between those requests and must not be mutated afterwards.
+    """
+    if "profile" in g:
+        # A profiled request must do its own work to be worth profiling
+        return compute()
+    return generation_flight.do(canonical_key(endpoint, document.doc_id, **params), compute)
+
+
+def request_seed(data, document):
+    """The payload's seed, or one derived from the document's content hash."""
+    return derive_seed(data.get("seed"), document.doc_id)
+
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_start = time.perf_counter()
+    g.metrics_token = metrics.begin_request()
+
+
+@app.after_request
+def record_request_metrics(response):
+    token = g.pop("metrics_token", None)
+    if token is None:
+        return response
+    elapsed = time.perf_counter() - g.metrics_start
+    timings = metrics.end_request(token)
+    endpoint = request.endpoint or "unmatched"
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint)
+    metrics.REQUESTS.inc(1, endpoint, str(response.status_code))
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings, elapsed)
+    return response
+
+
+def profiling_requested():
+    flag = request.headers.get("X-Profile") or request.args.get("profile")
+    return flag is not None and flag.lower() in ("1", "true", "yes")
+
+
+@app.before_request
+def start_request_profile():
+    if profiling.PROFILING_ENABLED and profiling_requested():
+        g.profile = profiling.begin_profile(request.endpoint or request.path)
+
+
+@app.after_request
+def save_request_profile(response):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return response
+    try:
+        profile_id = profiling.end_profile(*profile)
+        response.headers["X-Profile-Id"] = profile_id
+        logger.info(f"Saved profile {profile_id} for {request.path}")
+    except Exception as e:
+        logger.error(f"Failed to save profile: {e}")
+    return response
+
+
+@app.route("/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """Collapsed stacks of a profiled request (?kind=operators for torch operator stats)"""
+    if not profiling.PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    suffix = profiling.OPERATORS_SUFFIX if request.args.get("kind") == "operators" else profiling.COLLAPSED_SUFFIX
+    path = profiling.profile_path(profile_id, suffix)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    with open(path, "r", encoding="utf-8") as f:
+        return Response(f.read(), mimetype="text/plain")
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus metrics for this worker process"""
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "ok", "message": "Backend is running"}), 200
+    return jsonify({
+        "status": "ok",
+        "message": "Backend is running",
+        "coalescing": generation_flight.stats(),
+        "inference_workers": inference_workers.status() if inference_workers else None,
+        "models": model_manager.status() if model_manager else None
+    }), 200
+
+
+@app.route("/live", methods=["GET"])
+def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({"status": "alive", "uptime_seconds": round(time.monotonic() - STARTED_AT, 1)}), 200
+
+
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """Readiness: every model loaded at startup is loaded and warmed up in this process"""
+    if inference_workers:
+        ready, models = inference_workers.ready(), inference_workers.status()
+    else:
+        ready, models = model_manager.ready(), model_manager.status()
+    return jsonify({"ready": ready, "models": models}), 200 if ready else 503
 
 
 @app.errorhandler(400)
@@ -176,6 +360,13 @@ def bad_request(error):
     return jsonify({"error": "Bad request", "message": str(error)}), 400
 
 
+@app.errorhandler(ModelUnavailable)
+def model_unavailable(error):
+    """A model family failed to load; it is retried after MODEL_RETRY_SECONDS"""
+    logger.warning(f"Model unavailable: {error}")
+    return jsonify({"error": "Model not available", "message": str(error)}), 503
+
+
 @app.errorhandler(500)
 def internal_error(error):
     """Handle server errors"""
@@ -183,6 +374,24 @@ def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/documents", methods=["POST"])
+def register_document():
+    """Register a text once and return a doc_id usable in place of input_text."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        document = resolve_document(data, allow_large=True)
+        return jsonify({"doc_id": document.doc_id, "length": len(document.text)}), 200
+    except ValueError as e:
+        logger.warning(f"Validation error in /documents: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in /documents: {e}")
+        return jsonify({"error": "Failed to register document"}), 500
+
+
 @app.route("/get_mcq", methods=["POST"])
 def get_mcq():
     try:
@@ -193,20 +402,29 @@ def get_mcq():
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
-        input_text = validate_input(data.get("input_text", ""))
+        document = resolve_document(data, allow_large=True)
         max_questions = validate_max_questions(data.get("max_questions", 4))
         use_mediawiki = data.get("use_mediawiki", 0)
+        large_document = bool(data.get("large_document", False))
         
-        input_text = process_input_text(input_text, use_mediawiki)
-        output = MCQGen.generate_mcq({
-            "input_text": input_text,
-            "max_questions": max_questions
-        })
+        def generate():
+            enriched = enrich_document(document, use_mediawiki)
+            return MCQGen.generate_mcq({
+                "input_text": enriched.text,
+                "max_questions": max_questions,
+                "large_document": large_document,
+                "document": enriched
+            })
+
+        output = coalesce("get_mcq", document, generate, max_questions=max_questions,
+                          use_mediawiki=use_mediawiki, large_document=large_document)
         
         return jsonify({"output": output.get("questions", [])}), 200
     except ValueError as e:
         logger.warning(f"Validation error in /get_mcq: {e}")
         return jsonify({"error": str(e)}), 400
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in /get_mcq: {e}")
         return jsonify({"error": "Failed to generate MCQ"}), 500
@@ -222,20 +440,29 @@ def get_boolq():
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
-        input_text = validate_input(data.get("input_text", ""))
+        document = resolve_document(data)
         max_questions = validate_max_questions(data.get("max_questions", 4))
         use_mediawiki = data.get("use_mediawiki", 0)
+        seed = request_seed(data, document)
         
-        input_text = process_input_text(input_text, use_mediawiki)
-        output = BoolQGen.generate_boolq({
-            "input_text": input_text,
-            "max_questions": max_questions
-        })
+        def generate():
+            enriched = enrich_document(document, use_mediawiki)
+            return BoolQGen.generate_boolq({
+                "input_text": enriched.text,
+                "max_questions": max_questions,
+                "document": enriched,
+                "seed": seed
+            })
+
+        output = coalesce("get_boolq", document, generate, max_questions=max_questions,
+                          use_mediawiki=use_mediawiki, seed=seed)
         
         return jsonify({"output": output.get("Boolean_Questions", [])}), 200
     except ValueError as e:
         logger.warning(f"Validation error in /get_boolq: {e}")
         return jsonify({"error": str(e)}), 400
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in /get_boolq: {e}")
         return jsonify({"error": "Failed to generate Boolean questions"}), 500
@@ -251,20 +478,29 @@ def get_shortq():
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
-        input_text = validate_input(data.get("input_text", ""))
+        document = resolve_document(data, allow_large=True)
         max_questions = validate_max_questions(data.get("max_questions", 4))
         use_mediawiki = data.get("use_mediawiki", 0)
+        large_document = bool(data.get("large_document", False))
         
-        input_text = process_input_text(input_text, use_mediawiki)
-        output = ShortQGen.generate_shortq({
-            "input_text": input_text,
-            "max_questions": max_questions
-        })
+        def generate():
+            enriched = enrich_document(document, use_mediawiki)
+            return ShortQGen.generate_shortq({
+                "input_text": enriched.text,
+                "max_questions": max_questions,
+                "large_document": large_document,
+                "document": enriched
+            })
+
+        output = coalesce("get_shortq", document, generate, max_questions=max_questions,
+                          use_mediawiki=use_mediawiki, large_document=large_document)
         
         return jsonify({"output": output.get("questions", [])}), 200
     except ValueError as e:
         logger.warning(f"Validation error in /get_shortq: {e}")
         return jsonify({"error": str(e)}), 400
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in /get_shortq: {e}")
         return jsonify({"error": "Failed to generate short answer questions"}), 500
@@ -277,50 +513,70 @@ def get_problems():
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
-        input_text = validate_input(data.get("input_text", ""))
+        document = resolve_document(data, allow_large=True)
         max_questions_mcq = validate_max_questions(data.get("max_questions_mcq", 4))
         max_questions_boolq = validate_max_questions(data.get("max_questions_boolq", 4))
         max_questions_shortq = validate_max_questions(data.get("max_questions_shortq", 4))
         use_mediawiki = data.get("use_mediawiki", 0)
-        
-        input_text = process_input_text(input_text, use_mediawiki)
-        
-        output = {}
-        
-        if MCQGen:
-            try:
-                output["output_mcq"] = MCQGen.generate_mcq({
-                    "input_text": input_text,
-                    "max_questions": max_questions_mcq
-                })
-            except Exception as e:
-                logger.error(f"MCQ generation failed: {e}")
-                output["output_mcq"] = {"questions": []}
-        
-        if BoolQGen:
-            try:
-                output["output_boolq"] = BoolQGen.generate_boolq({
-                    "input_text": input_text,
-                    "max_questions": max_questions_boolq
-                })
-            except Exception as e:
-                logger.error(f"Boolean generation failed: {e}")
-                output["output_boolq"] = {"Boolean_Questions": []}
-        
-        if ShortQGen:
-            try:
-                output["output_shortq"] = ShortQGen.generate_shortq({
-                    "input_text": input_text,
-                    "max_questions": max_questions_shortq
-                })
-            except Exception as e:
-                logger.error(f"Short answer generation failed: {e}")
-                output["output_shortq"] = {"questions": []}
-        
+        large_document = bool(data.get("large_document", False))
+        seed = request_seed(data, document)
+        
+        def generate():
+            # The registered document shares its sentences and keyword index across generators
+            enriched = enrich_document(document, use_mediawiki)
+            input_text = enriched.text
+
+            output = {}
+
+            if MCQGen:
+                try:
+                    output["output_mcq"] = MCQGen.generate_mcq({
+                        "input_text": input_text,
+                        "max_questions": max_questions_mcq,
+                        "large_document": large_document,
+                        "document": enriched
+                    })
+                except Exception as e:
+                    logger.error(f"MCQ generation failed: {e}")
+                    output["output_mcq"] = {"questions": []}
+
+            if BoolQGen:
+                try:
+                    # BoolQ encodes the passage in one shot, so only its leading part is used
+                    output["output_boolq"] = BoolQGen.generate_boolq({
+                        "input_text": input_text[:MAX_INPUT_LENGTH],
+                        "max_questions": max_questions_boolq,
+                        "document": None if large_document else enriched,
+                        "seed": seed
+                    })
+                except Exception as e:
+                    logger.error(f"Boolean generation failed: {e}")
+                    output["output_boolq"] = {"Boolean_Questions": []}
+
+            if ShortQGen:
+                try:
+                    output["output_shortq"] = ShortQGen.generate_shortq({
+                        "input_text": input_text,
+                        "max_questions": max_questions_shortq,
+                        "large_document": large_document,
+                        "document": enriched
+                    })
+                except Exception as e:
+                    logger.error(f"Short answer generation failed: {e}")
+                    output["output_shortq"] = {"questions": []}
+
+            return output
+
+        output = coalesce("get_problems", document, generate, max_questions_mcq=max_questions_mcq,
+                          max_questions_boolq=max_questions_boolq, max_questions_shortq=max_questions_shortq,
+                          use_mediawiki=use_mediawiki, large_document=large_document, seed=seed)
+
         return jsonify(output), 200
     except ValueError as e:
         logger.warning(f"Validation error in /get_problems: {e}")
         return jsonify({"error": str(e)}), 400
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in /get_problems: {e}")
         return jsonify({"error": "Failed to generate problems"}), 500
@@ -336,14 +592,13 @@ def get_mcq_answer():
         if not data:
             return jsonify({"error": "No JSON provided"}), 400
         
-        input_text = data.get("input_text", "")
         input_questions = data.get("input_question", [])
         input_options = data.get("input_options", [])
         outputs = []
         
         # Validate inputs
         try:
-            input_text = validate_input(input_text)
+            input_text = resolve_document(data).text
         except ValueError as e:
             logger.warning(f"MCQ answer validation error: {e}")
             return jsonify({"error": str(e)}), 400
@@ -389,6 +644,9 @@ def get_mcq_answer():
                 if len(options_with_answer) < 2:
                     continue
                     
+                from sklearn.feature_extraction.text import TfidfVectorizer
+                from sklearn.metrics.pairwise import cosine_similarity
+
                 vectorizer = TfidfVectorizer().fit_transform(options_with_answer)
                 vectors = vectorizer.toarray()
                 generated_answer_vector = vectors[-1].reshape(1, -1)
@@ -400,11 +658,15 @@ def get_mcq_answer():
                 orig_index = filtered_options[max_similarity_index][0]
                 best_option = options[orig_index]
                 outputs.append(best_option)
+            except ModelUnavailable:
+                raise
             except Exception as e:
                 logger.error(f"Error processing MCQ answer: {e}")
                 continue
 
         return jsonify({"output": outputs}), 200
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in get_mcq_answer: {e}")
         return jsonify({"error": "Failed to process MCQ answers"}), 500
@@ -421,13 +683,12 @@ def get_answer():
         if not data:
             return jsonify({"error": "No JSON provided"}), 400
         
-        input_text = data.get("input_text", "")
         input_questions = data.get("input_question", [])
         answers = []
         
         # Validate text input
         try:
-            input_text = validate_input(input_text)
+            input_text = resolve_document(data).text
         except ValueError as e:
             logger.warning(f"Short answer validation error: {e}")
             return jsonify({"error": str(e)}), 400
@@ -448,11 +709,15 @@ def get_answer():
                 qa_response = qa_model(question=question, context=input_text)
                 answer = qa_response.get("answer", "")
                 answers.append(answer)
+            except ModelUnavailable:
+                raise
             except Exception as e:
                 logger.error(f"Error generating answer for question: {e}")
                 answers.append("")
 
         return jsonify({"output": answers}), 200
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in get_shortq_answer: {e}")
         return jsonify({"error": "Failed to process questions"}), 500
@@ -469,13 +734,12 @@ def get_boolean_answer():
         if not data:
             return jsonify({"error": "No JSON provided"}), 400
         
-        input_text = data.get("input_text", "")
         input_questions = data.get("input_question", [])
         output = []
         
         # Validate text input
         try:
-            input_text = validate_input(input_text)
+            input_text = resolve_document(data).text
         except ValueError as e:
             logger.warning(f"Boolean answer validation error: {e}")
             return jsonify({"error": str(e)}), 400
@@ -497,11 +761,15 @@ def get_boolean_answer():
                     {"input_text": input_text, "input_question": [question]}
                 )
                 output.append("True" if qa_response and qa_response[0] else "False")
+            except ModelUnavailable:
+                raise
             except Exception as e:
                 logger.error(f"Error predicting boolean answer: {e}")
                 output.append("False")
 
         return jsonify({"output": output}), 200
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in get_boolean_answer: {e}")
         return jsonify({"error": "Failed to process boolean questions"}), 500
@@ -534,7 +802,8 @@ def get_content():
             logger.warning("Document returned empty content")
             return jsonify({'content': ''})
         
-        return jsonify({'content': text}), 200
+        document = document_store.register(text)
+        return jsonify({'content': text, 'doc_id': document.doc_id}), 200
     except ValueError as e:
         logger.warning(f"Invalid document URL: {e}")
         return jsonify({'error': str(e)}), 400
@@ -761,31 +1030,37 @@ def get_shortq_hard():
         if not data:
             return jsonify({"error": "No JSON provided"}), 400
         
-        input_text = data.get("input_text", "")
         use_mediawiki = data.get("use_mediawiki", 0)
         max_questions = data.get("max_questions", 4)
         
         try:
-            input_text = validate_input(input_text)
+            document = resolve_document(data)
+            seed = request_seed(data, document)
         except ValueError as e:
             return jsonify({"error": str(e)}), 400
         
-        input_text = process_input_text(input_text, use_mediawiki)
+        def generate():
+            enriched = enrich_document(document, use_mediawiki)
 
-        output = qg.generate(
-            article=input_text, num_questions=max_questions, answer_style="sentences"
-        )
+            output = qg.generate(
+                article=enriched.text, num_questions=max_questions, answer_style="sentences",
+                document=enriched, seed=seed
+            )
 
-        for item in output:
-            try:
-                item["question"] = make_question_harder(item["question"])
-            except Exception as e:
-                logger.warning(f"Failed to make question harder: {e}")
+            # One tokenizing and tagging pass for the whole quiz; failures keep the original question
+            for item, harder in zip(output, make_questions_harder(output, seed)):
+                item["question"] = harder
+            return output
+
+        output = coalesce("get_shortq_hard", document, generate, max_questions=max_questions,
+                          use_mediawiki=use_mediawiki, seed=seed)
 
         return jsonify({"output": output}), 200
     except ValueError as e:
         logger.warning(f"Validation error in /get_shortq_hard: {e}")
         return jsonify({"error": str(e)}), 400
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in /get_shortq_hard: {e}")
         return jsonify({"error": "Failed to generate hard short questions"}), 500
@@ -802,27 +1077,32 @@ def get_mcq_hard():
         if not data:
             return jsonify({"error": "No JSON provided"}), 400
         
-        input_text = data.get("input_text", "")
         use_mediawiki = data.get("use_mediawiki", 0)
         max_questions = data.get("max_questions", 4)
         
         try:
-            input_text = validate_input(input_text)
+            document = resolve_document(data)
+            seed = request_seed(data, document)
         except ValueError as e:
             return jsonify({"error": str(e)}), 400
         
-        input_text = process_input_text(input_text, use_mediawiki)
-        output = qg.generate(
-            article=input_text, num_questions=max_questions, answer_style="multiple_choice"
-        )
-        
-        for q in output:
-            try:
-                q["question"] = make_question_harder(q["question"])
-            except Exception as e:
-                logger.warning(f"Failed to make MCQ harder: {e}")
+        def generate():
+            enriched = enrich_document(document, use_mediawiki)
+            output = qg.generate(
+                article=enriched.text, num_questions=max_questions, answer_style="multiple_choice",
+                document=enriched, seed=seed
+            )
+
+            for q, harder in zip(output, make_questions_harder(output, seed)):
+                q["question"] = harder
+            return output
+
+        output = coalesce("get_mcq_hard", document, generate, max_questions=max_questions,
+                          use_mediawiki=use_mediawiki, seed=seed)
         
         return jsonify({"output": output}), 200
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in /get_mcq_hard: {e}")
         return jsonify({"error": "Failed to generate hard MCQ questions"}), 500
@@ -838,7 +1118,11 @@ def make_harder():
         if not question_text:
             return jsonify({"error": "No question provided"}), 400
         
-        harder_text = make_question_harder(question_text)
+        try:
+            seed = derive_seed(data.get("seed"), question_text)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        harder_text = make_question_harder(question_text, seed)
         return jsonify({"harder_question": harder_text}), 200
     except Exception as e:
         logger.error(f"Error in /make_harder: {e}")
@@ -900,36 +1184,38 @@ def get_boolq_hard():
         if not data:
             return jsonify({"error": "No JSON provided"}), 400
         
-        input_text = data.get("input_text", "")
         max_questions = validate_max_questions(data.get("max_questions", 4))
         use_mediawiki = data.get("use_mediawiki", 0)
         
         try:
-            input_text = validate_input(input_text)
+            document = resolve_document(data)
+            seed = request_seed(data, document)
         except ValueError as e:
             return jsonify({"error": str(e)}), 400
 
-        input_text = process_input_text(input_text, use_mediawiki)
+        def generate():
+            enriched = enrich_document(document, use_mediawiki)
 
-        output = BoolQGen.generate_boolq({
-            "input_text": input_text,
-            "max_questions": max_questions
-        })
+            output = BoolQGen.generate_boolq({
+                "input_text": enriched.text,
+                "max_questions": max_questions,
+                "document": enriched,
+                "seed": seed
+            })
 
-        generated = output.get("Boolean_Questions", [])
+            generated = output.get("Boolean_Questions", [])
 
-        harder_questions = []
-        for q in generated:
-            try:
-                harder_questions.append(make_question_harder(q))
-            except Exception as e:
-                logger.warning(f"Failed to make question harder: {e}")
-                harder_questions.append(q)
+            return make_questions_harder(generated, seed)
+
+        harder_questions = coalesce("get_boolq_hard", document, generate, max_questions=max_questions,
+                                    use_mediawiki=use_mediawiki, seed=seed)
 
         return jsonify({"output": harder_questions}), 200
     except ValueError as e:
         logger.warning(f"Validation error in /get_boolq_hard: {e}")
         return jsonify({"error": str(e)}), 400
+    except ModelUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error in /get_boolq_hard: {e}")
         return jsonify({"error": "Failed to generate hard boolean questions"}), 500
@@ -976,11 +1262,20 @@ def upload_file():
             logger.error("FileProcessor not available")
             return jsonify({"error": "File processing service unavailable"}), 503
 
-        content = file_processor.process_file(file)
+        # Optional 1-based page range for PDFs, e.g. "1-50"
+        try:
+            page_range = parse_page_range(request.form.get("page_range") or request.args.get("page_range"))
+        except ValueError as e:
+            logger.warning(f"Invalid page range: {e}")
+            return jsonify({"error": str(e)}), 400
+
+        document_id, content = file_processor.process_upload(file, page_range)
 
         if content:
             logger.info(f"File processed successfully: {file.filename}")
-            return jsonify({"content": content}), 200
+            # A page range's document_id names the range, so it resolves to the same text later
+            document = document_store.register(content, document_id)
+            return jsonify({"content": content, "document_id": document_id, "doc_id": document.doc_id}), 200
         else:
             logger.warning(f"No content extracted from file: {file.filename}")
             return jsonify({"error": "Could not extract content from file"}), 400
@@ -992,38 +1287,6 @@ def upload_file():
 def hello():
     return "The server is working fine"
 
-def clean_transcript(file_path):
-    """Extracts and cleans transcript from a VTT file."""
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-    except (IOError, OSError) as e:
-        logger.error(f"Failed to read transcript file: {e}")
-        return ""
-
-    transcript_lines = []
-    skip_metadata = True
-
-    for line in lines:
-        line = line.strip()
-
-        # Skip metadata lines
-        if line.lower().startswith(("kind:", "language:", "webvtt")):
-            continue
-        
-        # Detect timestamps
-        if "-->" in line:
-            skip_metadata = False
-            continue
-        
-        if not skip_metadata:
-            # Remove formatting tags
-            line = re.sub(r"<[^>]+>", "", line)
-            if line:
-                transcript_lines.append(line)
-
-    return " ".join(transcript_lines).strip()
-
 @app.route('/getTranscript', methods=['GET'])
 def get_transcript():
     """Get YouTube video transcript with input sanitization."""
@@ -1033,69 +1296,32 @@ def get_transcript():
             return jsonify({"error": "No video ID provided"}), 400
         
         # Sanitize video ID - YouTube IDs are alphanumeric with hyphens and underscores
-        if not re.match(r'^[a-zA-Z0-9_-]{6,20}$', video_id):
+        if not VIDEO_ID_RE.match(video_id):
             logger.warning(f"Invalid video ID format: {video_id[:30]}")
             return jsonify({"error": "Invalid video ID format"}), 400
         
-        # Ensure subtitles directory exists
-        subtitles_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "subtitles")
-        os.makedirs(subtitles_dir, exist_ok=True)
-        
-        # Use safe path construction to prevent path traversal
-        output_path = os.path.join(subtitles_dir, f"{video_id}.vtt")
-        
         try:
-            result = subprocess.run(
-                ["yt-dlp", "--write-auto-sub", "--sub-lang", "en", "--skip-download",
-                 "--sub-format", "vtt", "-o", output_path,
-                 f"https://www.youtube.com/watch?v={video_id}"],
-                check=True, capture_output=True, text=True, timeout=60
-            )
-            if result.stdout:
-                logger.debug(f"yt-dlp stdout: {result.stdout[:500]}")
-            if result.stderr:
-                logger.debug(f"yt-dlp stderr: {result.stderr[:500]}")
-        except subprocess.TimeoutExpired:
-            logger.error(f"Transcript download timed out for video: {video_id}")
+            transcript_text = transcript_service.get(video_id)
+        except TranscriptTimeout as e:
+            logger.error(str(e))
             return jsonify({"error": "Transcript download timed out"}), 504
-        except subprocess.CalledProcessError as e:
-            logger.error(f"yt-dlp failed for video {video_id}: {e.stderr[:200]}")
-            return jsonify({"error": "Failed to download transcript"}), 500
-        except FileNotFoundError:
-            logger.error("yt-dlp is not installed or not in PATH")
+        except TranscriptUnavailable as e:
+            logger.error(str(e))
             return jsonify({"error": "Transcript service unavailable (yt-dlp not found)"}), 503
-
-        # Find the VTT file for this specific video
-        subtitle_files = glob.glob(os.path.join(subtitles_dir, f"{video_id}*.vtt"))
-        if not subtitle_files:
-            logger.warning(f"No subtitles found for video: {video_id}")
+        except TranscriptNotFound as e:
+            logger.warning(str(e))
             return jsonify({"error": "No subtitles found for this video"}), 404
-
-        latest_subtitle = max(subtitle_files, key=os.path.getctime)
-        
-        # Ensure the file is within the subtitles directory (path traversal prevention)
-        if not os.path.abspath(latest_subtitle).startswith(os.path.abspath(subtitles_dir)):
-            logger.error("Path traversal attempt detected in subtitle file")
-            return jsonify({"error": "Security error"}), 403
-        
-        transcript_text = clean_transcript(latest_subtitle)
-
-        # Clean up the file after reading
-        try:
-            os.remove(latest_subtitle)
-        except OSError as e:
-            logger.warning(f"Failed to clean up subtitle file: {e}")
-
-        if not transcript_text:
-            return jsonify({"error": "Could not extract transcript text"}), 404
+        except TranscriptError as e:
+            logger.error(str(e))
+            return jsonify({"error": "Failed to download transcript"}), 500
 
         return jsonify({"transcript": transcript_text}), 200
     except Exception as e:
         logger.error(f"Error in get_transcript: {e}")
         return jsonify({"error": "Failed to get transcript"}), 500
 
+startup.report()
+
 if __name__ == "__main__":
-    subtitles_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "subtitles")
-    os.makedirs(subtitles_dir, exist_ok=True)
     logger.info("Starting EduAid backend server")
     app.run()
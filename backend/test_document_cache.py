@@ -0,0 +1,55 @@
+import os
+
+from Generator.document_cache import ExtractedDocument, ExtractedTextCache, content_hash, page_range_id
+
+document = ExtractedDocument.from_pages(["page one. ", "page two. ", "page three."])
+
+
+def test_page_text():
+    assert document.page_text() == "page one. page two. page three."
+    assert document.page_text((2, 3)) == "page two. page three."
+    assert document.page_text((3, None)) == "page three."
+
+
+def test_round_trip(tmp_path):
+    cache = ExtractedTextCache(str(tmp_path))
+    key = content_hash(b"%PDF")
+    cache.put(key, document)
+    cached = ExtractedTextCache(str(tmp_path)).get(key)
+    assert cached.text == document.text
+    assert cached.page_offsets == document.page_offsets
+
+
+def test_rejects_keys_that_are_not_digests(tmp_path):
+    cache = ExtractedTextCache(str(tmp_path))
+    key = content_hash(b"%PDF")
+    cache.put(key, document)
+    (tmp_path.parent / "outside.json.z").write_bytes(b"")
+    for bad in ("../outside", key.upper(), key[:-1], key + "0", page_range_id(key, (1, 2)), ""):
+        assert cache.get(bad) is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    keys = [content_hash(bytes([i])) for i in range(3)]
+    big = ExtractedDocument.from_pages([os.urandom(2000).hex()])
+    probe = ExtractedTextCache(str(tmp_path / "probe"))
+    probe.put(keys[0], big)
+    entry_bytes = os.path.getsize(probe._path(keys[0]))
+
+    cache = ExtractedTextCache(str(tmp_path / "cache"), max_bytes=2 * entry_bytes + 100)
+    cache.put(keys[0], big)
+    cache.put(keys[1], big)
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], big)
+    assert keys[1] not in cache and not os.path.exists(cache._path(keys[1]))
+    assert keys[0] in cache and keys[2] in cache
+
+
+if __name__ == '__main__':
+    import tempfile
+    from pathlib import Path
+
+    test_page_text()
+    for test in (test_round_trip, test_rejects_keys_that_are_not_digests, test_evicts_least_recently_used):
+        with tempfile.TemporaryDirectory() as directory:
+            test(Path(directory) / "cache")
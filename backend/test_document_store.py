@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("nltk")
+
+from Generator.document_store import DocumentStore, text_doc_id
+
+
+def test_register_returns_the_shared_document():
+    store = DocumentStore()
+    first = store.register("Some text.")
+    assert first.doc_id == text_doc_id("Some text.")
+    assert store.register("Some text.") is first
+    assert store.get(first.doc_id) is first
+
+
+def test_evicts_least_recently_used_by_count():
+    store = DocumentStore(capacity=2, max_bytes=0)
+    a, b = store.register("a"), store.register("b")
+    store.get(a.doc_id)
+    store.register("c")
+    assert store.get(b.doc_id) is None
+    assert store.get(a.doc_id) is a
+    assert len(store) == 2
+
+
+def test_evicts_by_memory():
+    store = DocumentStore(capacity=100, max_bytes=250)
+    documents = [store.register(str(i) * 100) for i in range(3)]
+    assert store.get(documents[0].doc_id) is None
+    assert store.nbytes() == 200
+
+
+def test_artifacts_count_towards_memory():
+    store = DocumentStore(capacity=100, max_bytes=500)
+    a = store.register("a" * 100)
+    b = store.register("b" * 100)
+    calls = []
+    a.artifact("summary", lambda: calls.append(1) or "x" * 250)
+    a.artifact("summary", lambda: calls.append(1) or "")
+    assert calls == [1]
+    assert a.nbytes == 350
+    # A request resolving a makes it the most recently used, so growing it past the budget evicts b
+    store.get(a.doc_id)
+    a.artifact("extra", lambda: "y" * 100)
+    assert store.get(b.doc_id) is None
+    assert store.get(a.doc_id) is a
+
+
+if __name__ == '__main__':
+    test_register_returns_the_shared_document()
+    test_evicts_least_recently_used_by_count()
+    test_evicts_by_memory()
+    test_artifacts_count_towards_memory()
@@ -0,0 +1,59 @@
+import random
+from types import SimpleNamespace
+
+from Generator.entity_pool import EntityPool
+
+
+def doc(*entities):
+    return SimpleNamespace(ents=[SimpleNamespace(text=text, label_=label) for text, label in entities])
+
+
+people = [f"Person {i}" for i in range(8)]
+places = ["Paris", "Rome", "Oslo"]
+pool = EntityPool([
+    doc(*((p, "PERSON") for p in people)),
+    doc(*((p, "GPE") for p in places), ("Person 0", "PERSON")),
+])
+
+
+def test_distinct_entries():
+    assert len(pool) == len(people) + len(places)
+
+
+def test_same_label_without_replacement():
+    rng = random.Random(0)
+    for _ in range(200):
+        picks = pool.distractors("Person 3", "PERSON", 5, rng)
+        assert len(picks) == len(set(picks)) == 5
+        assert "Person 3" not in picks
+        assert all(p in people for p in picks)
+
+
+def test_every_candidate_can_be_drawn():
+    rng = random.Random(1)
+    drawn = set()
+    for _ in range(200):
+        drawn.update(pool.distractors("Person 7", "PERSON", 3, rng))
+    assert drawn == set(people) - {"Person 7"}
+
+
+def test_shortfall_filled_from_other_labels():
+    rng = random.Random(2)
+    for _ in range(100):
+        picks = pool.distractors("Rome", "GPE", 4, rng)
+        assert len(picks) == len(set(picks)) == 4
+        assert "Rome" not in picks
+        assert {"Paris", "Oslo"} <= set(picks)
+
+
+def test_fewer_entities_than_requested():
+    picks = pool.distractors("Paris", "GPE", 50, random.Random(3))
+    assert sorted(picks) == sorted(set(people + places) - {"Paris"})
+
+
+if __name__ == '__main__':
+    test_distinct_entries()
+    test_same_label_without_replacement()
+    test_every_candidate_can_be_drawn()
+    test_shortfall_filled_from_other_labels()
+    test_fewer_entities_than_requested()
@@ -0,0 +1,40 @@
+import pytest
+
+from Generator.seeding import derive_seed, make_rng
+
+
+def test_integer_seed_is_used_as_is():
+    assert derive_seed(42, "ignored") == 42
+
+
+def test_derived_seeds_are_stable():
+    assert derive_seed(None, "get_mcq", "doc") == derive_seed(None, "get_mcq", "doc")
+    assert derive_seed("class-7") == derive_seed("class-7", "other", "parts")
+    assert derive_seed(None, "get_mcq", "doc") != derive_seed(None, "get_shortq", "doc")
+    assert derive_seed("7") != 7
+    assert 0 <= derive_seed(None, "x") < 2 ** 63
+
+
+def test_derived_seed_value():
+    # A fixed value: a change here would change the output of every seeded request
+    assert derive_seed("class-7") == 3796722515858470822
+
+
+def test_invalid_seeds():
+    for seed in (True, 1.5, ["a"]):
+        with pytest.raises(ValueError):
+            derive_seed(seed)
+
+
+def test_make_rng_is_scoped():
+    first = [make_rng(1, "boolq").random() for _ in range(2)]
+    assert first[0] == first[1]
+    assert make_rng(1, "boolq").random() != make_rng(1, "mcq").random()
+
+
+if __name__ == '__main__':
+    test_integer_seed_is_used_as_is()
+    test_derived_seeds_are_stable()
+    test_derived_seed_value()
+    test_invalid_seeds()
+    test_make_rng_is_scoped()
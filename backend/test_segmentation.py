@@ -0,0 +1,78 @@
+import random
+import re
+
+import pytest
+
+from Generator.segmentation import segment_spans, sentence_spans, split_into_segments
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class WordTokenizer:
+    """Stand-in for a fast tokenizer: one token per word or punctuation mark."""
+
+    def __call__(self, text, add_special_tokens=True, return_offsets_mapping=False, verbose=True):
+        offsets = [match.span() for match in _TOKEN.finditer(text)]
+        return {"input_ids": list(range(len(offsets))), "offset_mapping": offsets}
+
+
+tokenizer = WordTokenizer()
+
+
+def make_text(sentences, seed=0):
+    rng = random.Random(seed)
+    words = ["photosynthesis", "converts", "light", "energy", "into", "chemical", "plants", "cells", "water"]
+    return " ".join(
+        " ".join(rng.choice(words) for _ in range(rng.randint(3, 25))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def joined_sentences(text, max_tokens):
+    """Greedy packing by joining whole sentences, each tokenized on its own."""
+    segments, current, tokens = [], [], 0
+    for start, end in sentence_spans(text):
+        sentence = text[start:end]
+        count = len(tokenizer(sentence)["offset_mapping"])
+        if current and tokens + count > max_tokens:
+            segments.append(" ".join(current))
+            current, tokens = [], 0
+        current.append(sentence)
+        tokens += count
+    if current:
+        segments.append(" ".join(current))
+    return segments
+
+
+# Sentences have at most 26 tokens, so none is cut and both packings must agree exactly
+@pytest.mark.parametrize("max_tokens", [30, 64, 490])
+def test_matches_sentence_joining(max_tokens):
+    text = make_text(60)
+    assert split_into_segments(text, tokenizer, max_tokens) == joined_sentences(text, max_tokens)
+
+
+def test_segments_stay_within_budget():
+    text = make_text(60, seed=1)
+    for start, end in segment_spans(text, tokenizer, max_tokens=10):
+        assert len(tokenizer(text[start:end])["offset_mapping"]) <= 10
+
+
+def test_overlap_repeats_trailing_sentences():
+    text = "One two three. Four five six. Seven eight nine. Ten eleven twelve."
+    assert split_into_segments(text, tokenizer, max_tokens=8, overlap_tokens=4) == [
+        "One two three. Four five six.",
+        "Four five six. Seven eight nine.",
+        "Seven eight nine. Ten eleven twelve.",
+    ]
+
+
+def test_line_breaks_end_sentences():
+    assert sentence_spans("Heading\nA sentence. Another one") == [(0, 7), (8, 19), (20, 31)]
+
+
+if __name__ == '__main__':
+    for max_tokens in (30, 64, 490):
+        test_matches_sentence_joining(max_tokens)
+    test_segments_stay_within_budget()
+    test_overlap_repeats_trailing_sentences()
+    test_line_breaks_end_sentences()
@@ -0,0 +1,56 @@
+import pytest
+
+from Generator.sentence_index import SentenceIndex
+
+sentences = [
+    "Machine learning is a subset of artificial intelligence.",
+    "A machine can learn from data without explicit rules.",
+    "Deep learning, a technique within machine learning, uses neural networks.",
+    "Neural networks with many layers enable deep learning.",
+    "Artificial intelligence raises questions of bias and privacy.",
+    "Machine vision and robotics are applications of AI.",
+    "Learning rates control how fast networks learn.",
+]
+
+keywords = ["machine learning", "machine", "learning", "deep learning", "neural networks", "AI", "privacy", "robots"]
+
+
+def flashtext_sentences(keywords, sentences):
+    """The keyword matching find_sentences_with_keywords did with flashtext."""
+    flashtext = pytest.importorskip("flashtext")
+    keyword_processor = flashtext.KeywordProcessor()
+    keyword_sentences = {}
+    for word in keywords:
+        word = word.strip()
+        keyword_sentences[word] = []
+        keyword_processor.add_keyword(word)
+    for sentence in sentences:
+        for key in keyword_processor.extract_keywords(sentence):
+            if sentence not in keyword_sentences[key]:
+                keyword_sentences[key].append(sentence)
+    return {k: sorted(v, key=len, reverse=True) for k, v in keyword_sentences.items() if v}
+
+
+def test_matches_flashtext():
+    assert SentenceIndex(sentences).keyword_sentences(keywords) == flashtext_sentences(keywords, sentences)
+
+
+def test_longest_match_wins():
+    mapping = SentenceIndex(sentences).keyword_sentences(["machine", "machine learning"])
+    assert sentences[0] not in mapping["machine"]
+    assert sentences[1] in mapping["machine"]
+
+
+def test_unicode_keywords():
+    index = SentenceIndex(["Die Straße führt nach München.", "Tokyo heißt auf Japanisch 東京."])
+    assert index.keyword_sentences(["München", "東京", "Straße"]) == {
+        "München": ["Die Straße führt nach München."],
+        "東京": ["Tokyo heißt auf Japanisch 東京."],
+        "Straße": ["Die Straße führt nach München."],
+    }
+
+
+if __name__ == '__main__':
+    test_matches_flashtext()
+    test_longest_match_wins()
+    test_unicode_keywords()
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from Generator.singleflight import SingleFlight, canonical_key
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Calls flight.do(key, fn) from callers threads; returns their results or exceptions."""
+    outcomes = [None] * callers
+
+    def call(i):
+        try:
+            outcomes[i] = flight.do(key, fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def wait_for_waiters(flight, waiters):
+    while flight.stats()["coalesced"] < waiters:
+        threading.Event().wait(0.001)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"questions": [1, 2]}
+
+    threads, outcomes = run_concurrently(flight, "key", compute, 5)
+    wait_for_waiters(flight, 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(outcome is outcomes[0] for outcome in outcomes)
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise RuntimeError("model failed")
+
+    threads, outcomes = run_concurrently(flight, "key", compute, 4)
+    wait_for_waiters(flight, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    # The key is forgotten, so the next call runs again
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+def test_sequential_calls_are_not_cached():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: int("x"))
+
+
+def test_canonical_key_ignores_param_order():
+    assert canonical_key("get_mcq", "doc", a=1, b=2) == canonical_key("get_mcq", "doc", b=2, a=1)
+    assert canonical_key("get_mcq", "doc", a=1) != canonical_key("get_shortq", "doc", a=1)
+
+
+if __name__ == '__main__':
+    test_concurrent_calls_share_one_execution()
+    test_error_reaches_every_waiter()
+    test_sequential_calls_are_not_cached()
+    test_canonical_key_ignores_param_order()
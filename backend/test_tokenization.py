@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("transformers")
+
+from benchmarks.corpus import synthetic_document
+from benchmarks.tokenization import CHECKPOINTS, load_pair, prompts
+
+singles, pairs = prompts(synthetic_document(5000, seed=0))
+
+
+def encode(tokenizer, texts, use_pairs):
+    if use_pairs:
+        return tokenizer([a for a, _ in texts], [b for _, b in texts], padding=True)
+    return tokenizer(texts, padding=True)
+
+
+@pytest.mark.parametrize("name", list(CHECKPOINTS))
+def test_fast_tokenizer_matches_slow(name):
+    try:
+        slow, fast = load_pair(name)
+    except Exception as e:
+        pytest.skip(f"{name} not available locally: {e}")
+    texts, use_pairs = (pairs, True) if CHECKPOINTS[name] else (singles, False)
+    expected, actual = encode(slow, texts, use_pairs), encode(fast, texts, use_pairs)
+    assert actual["input_ids"] == expected["input_ids"]
+    assert actual["attention_mask"] == expected["attention_mask"]
+
+
+if __name__ == '__main__':
+    for name in CHECKPOINTS:
+        test_fast_tokenizer_matches_slow(name)